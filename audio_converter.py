@@ -3,31 +3,93 @@ audio_converter.py
 Conversão e otimização de áudio com pydub
 """
 
+import itertools
 import logging
 from pydub import AudioSegment
-from pydub.effects import normalize, compress_dynamic_range
-from pydub.silence import detect_leading_silence
+from pydub.effects import compress_dynamic_range
+import math
 import os
 
+import numpy as np
+
+from audio_stream import (
+    PCM16_SCALE, AudioEncoder, PcmPipeSource, WavFileSource, array_to_segment,
+    read_wav_blocks, read_wav_range, segment_blocks, segment_to_array, splice_segments,
+    wav_info
+)
+from audio_graph import Downmix, ProcessingGraph
+from bitrate_selector import BitrateSelector
+from dsp import (
+    Compressor, LoudnessMeter, Resampler, StereoCorrelation, design_filter, rms_envelope,
+    silence_edges, silent_runs
+)
+from ffmpeg_utils import OUTPUT_FORMATS
+from media_probe import MediaProbe
+
 
 class AudioConverter:
     """Converte e otimiza áudio com perfis configuráveis"""
     
+    # Tolerância entre bitrate de origem e do perfil para cópia direta
+    STREAM_COPY_BITRATE_TOLERANCE = 0.1
+    
+    # Granularidade da deteção de silêncio (igual ao chunk_size do pydub)
+    SILENCE_CHUNK_MS = 10
+    
+    # Sem passagem de análise, o mono automático decide com os primeiros
+    # segundos da passagem de codificação (retidos em memória)
+    MONO_LOOKAHEAD_SECONDS = 30
+    
     def __init__(self, config):
         self.config = config
         self.profile = config.get_profile_settings()
+        self.output_format = config.get_output_format()
+        self.streaming = config.get_streaming_enabled()
+        self.block_seconds = config.get_stream_block_seconds()
+        
+        # Perfil auto: bitrate escolhido por ficheiro a partir do conteúdo
+        self.bitrate_selector = BitrateSelector.for_config(config) if self.profile['bitrate'] == 'auto' else None
+        
+        # Correlação mínima para converter canais iguais para mono (None = desativado)
+        self.mono_correlation = config.get_mono_correlation() if config.get_auto_mono_enabled() else None
+        
+        # Reamostragem: numpy (no grafo, a partir da frequência original) ou ffmpeg
+        self.resampler = config.get_resampler()
+        self.resample_quality = config.get_resample_quality()
+        self.probe = MediaProbe.for_config(config)
+        
+        # Tempos por etapa da última conversão ({passagem: {etapa: segundos}})
+        self.stage_timings = {}
+        
+        # Estatísticas do áudio de origem da última conversão em streaming (pipe ou WAV)
+        self.source_stats = None
+        
+        # Estatísticas do áudio codificado na última conversão (duração,
+        # sample_rate, channels, dBFS, max_dBFS), medidas durante a conversão
+        self.output_stats = None
     
-    def convert_audio(self, input_audio_path, output_audio_path):
+    def convert_audio(self, input_audio_path, output_audio_path, reference_path=None):
         """
         Converte áudio aplicando todas as otimizações configuradas
         
         Args:
             input_audio_path (str): Caminho do áudio de entrada (WAV)
-            output_audio_path (str): Caminho do áudio de saída (MP3)
+            output_audio_path (str): Caminho do áudio de saída (MP3/M4A/AAC)
+            reference_path (str): Cópia do PCM processado para as métricas
+                                  de qualidade (ver output_stats)
             
         Returns:
             tuple: (sucesso, mensagem)
         """
+        self.stage_timings = {}
+        self.source_stats = None
+        self.output_stats = None
+        
+        if self.streaming:
+            if self._streaming_supported():
+                return self._convert_audio_streaming(input_audio_path, output_audio_path, reference_path)
+            logging.info("Filtros ativos não suportam streaming. Processando em memória")
+        
         try:
             logging.info(f"Carregando áudio: {os.path.basename(input_audio_path)}")
             
@@ -41,23 +103,889 @@ class AudioConverter:
             # Aplicar processamentos
             audio = self._apply_segment_removal(audio)
             audio = self._apply_silence_removal(audio)
+            
+            # Canais iguais: mono antes dos filtros (metade do processamento)
+            mono = self._identical_channels(audio)
+            if mono:
+                audio = audio.set_channels(1)
+            
             audio = self._apply_filters(audio)
-            audio = self._apply_normalization(audio)
-            audio = self._apply_profile_settings(audio)
+            analyzer = self._create_analyzer(audio.frame_rate, audio.channels, mono)
+            gain_db = self._measure_normalization(audio, analyzer)
+            bitrate = self._select_bitrate(analyzer, mono)
+            audio = self._apply_profile_settings(audio, 'mono' if mono else None)
+            
+            # Exportar no formato de saída (ganho de normalização aplicado no encoder)
+            logging.info(f"Exportando {self.output_format.upper()}: {os.path.basename(output_audio_path)}")
+            self._export_audio(audio, output_audio_path, gain_db, bitrate, self._vbr_encoding(mono))
             
-            # Exportar MP3
-            logging.info(f"Exportando MP3: {os.path.basename(output_audio_path)}")
-            self._export_mp3(audio, output_audio_path)
+            if reference_path:
+                self._write_reference(audio, gain_db, reference_path)
             
             final_duration = len(audio) / 1000.0
             logging.info(f"Conversão concluída. Duração final: {final_duration:.2f}s")
             
+            self.output_stats = {
+                'duration': final_duration,
+                'sample_rate': audio.frame_rate,
+                'channels': audio.channels,
+                'dBFS': round(audio.dBFS + gain_db, 2),
+                'max_dBFS': min(round(audio.max_dBFS + gain_db, 2), 0.0)
+            }
+            if reference_path:
+                self.output_stats['reference'] = {
+                    'path': reference_path,
+                    'sample_rate': audio.frame_rate,
+                    'channels': audio.channels
+                }
+            
+            return True, "Conversão concluída"
+            
+        except Exception as e:
+            logging.error(f"Erro na conversão: {str(e)}")
+            return False, str(e)
+    
+    def _streaming_supported(self):
+        """
+        Verifica se as etapas ativas podem ser processadas em blocos
+        
+        Returns:
+            bool: True se nenhum filtro do pydub (sinal completo) está ativo
+        """
+        if self.config.get_filter_engine() == 'numpy':
+            return True
+        
+        return not any([
+            self.config.get_highpass_filter_enabled(),
+            self.config.get_lowpass_filter_enabled(),
+            self.config.get_compression_enabled()
+        ])
+    
+    def _build_graph(self, sample_rate, channels, output_channels=None, verbose=True, downmix_first=False,
+                     output_rate=None):
+        """
+        Planeia o grafo de processamento a partir da configuração
+        
+        Apenas as etapas ativas são incluídas (reamostragem, passa-alta,
+        passa-baixa, compressor e downmix). Cortes e silêncios são resolvidos
+        na leitura; o ganho (e o sample rate, com resampler = ffmpeg) é
+        aplicado pelo encoder.
+        
+        Args:
+            sample_rate (int): Sample rate do áudio
+            channels (int): Número de canais
+            output_channels (int): Canais finais (downmix se menor que channels)
+            verbose (bool): Registar etapas no log
+            downmix_first (bool): Downmix antes dos filtros (canais iguais:
+                                  o resultado é o mesmo com metade do trabalho)
+            output_rate (int): Sample rate final (None = sem reamostragem)
+            
+        Returns:
+            ProcessingGraph: Grafo pronto a executar
+        """
+        graph = ProcessingGraph()
+        order = self.config.get_filter_order()
+        
+        if downmix_first and channels > 1:
+            graph.add('downmix', Downmix())
+            channels = 1
+        
+        # Reamostragem antes dos filtros, que são desenhados para o sample rate final
+        if output_rate and output_rate != sample_rate and self.resampler == 'numpy':
+            graph.add('reamostragem', Resampler(sample_rate, output_rate, channels, self.resample_quality))
+            if verbose:
+                logging.info(f"Sample rate ajustado: {sample_rate}Hz → {output_rate}Hz "
+                             f"(qualidade {self.resample_quality})")
+            sample_rate = output_rate
+        
+        if self.config.get_highpass_filter_enabled():
+            freq = self.config.get_highpass_freq()
+            graph.add('passa-alta', design_filter('highpass', freq, sample_rate, channels, order))
+            if verbose:
+                logging.info(f"Filtro passa-alta aplicado: {freq}Hz (ordem {order})")
+        
+        if self.config.get_lowpass_filter_enabled():
+            freq = self.config.get_lowpass_freq()
+            if order > 1 and freq >= sample_rate / 2:
+                if verbose:
+                    logging.warning(f"Passa-baixa de {freq}Hz acima de Nyquist ({sample_rate}Hz). Ignorado.")
+            else:
+                graph.add('passa-baixa', design_filter('lowpass', freq, sample_rate, channels, order))
+                if verbose:
+                    logging.info(f"Filtro passa-baixa aplicado: {freq}Hz (ordem {order})")
+        
+        if self.config.get_compression_enabled():
+            threshold = self.config.get_compression_threshold()
+            ratio = self.config.get_compression_ratio()
+            graph.add('compressor', Compressor(
+                sample_rate,
+                channels,
+                threshold=threshold,
+                ratio=ratio,
+                attack_ms=self.config.get_compression_attack(),
+                release_ms=self.config.get_compression_release(),
+                knee_db=self.config.get_compression_knee(),
+                makeup_db=self.config.get_compression_makeup(),
+                lookahead_ms=self.config.get_compression_lookahead()
+            ))
+            if verbose:
+                logging.info(f"Compressão aplicada: threshold={threshold}dBFS, ratio={ratio}:1")
+        
+        if output_channels == 1 and channels > 1:
+            graph.add('downmix', Downmix())
+        
+        return graph
+    
+    def _convert_audio_streaming(self, input_audio_path, output_audio_path, reference_path=None):
+        """
+        Converte áudio em blocos de tamanho fixo, do WAV até ao encoder
+        
+        O sinal nunca é carregado por inteiro: os silêncios são procurados
+        lendo apenas o início e o fim do ficheiro (ou numa passagem de
+        envolvente, no modo internal), o ganho de normalização numa
+        passagem de análise (apenas energia), e ambos são aplicados na
+        passagem de codificação.
+        
+        Args:
+            input_audio_path (str): Caminho do áudio de entrada (WAV)
+            output_audio_path (str): Caminho do áudio de saída
+            reference_path (str): Cópia do PCM processado (ver output_stats)
+            
+        Returns:
+            tuple: (sucesso, mensagem)
+        """
+        try:
+            logging.info(f"Processando áudio em streaming: {os.path.basename(input_audio_path)}")
+            
+            info = wav_info(input_audio_path)
+            rate = info['sample_rate']
+            channels = info['channels']
+            
+            logging.info(f"Áudio original: {info['frames'] / rate:.2f}s, "
+                        f"{rate}Hz, {channels} canal(is)")
+            
+            chunk_frames, block_frames = self._stream_block_sizes(rate)
+            
+            # Planeamento: cortes, filtros e ganho
+            start, end = self._plan_segment_removal(info['frames'], rate)
+            segments = [(start, end)]
+            
+            if self.config.get_silence_removal_enabled():
+                if self.config.get_silence_mode() == 'internal':
+                    envelope = np.concatenate([np.zeros(0)] + [
+                        rms_envelope(block, chunk_frames)
+                        for block in read_wav_blocks(input_audio_path, block_frames, start, end)
+                    ])
+                    segments = self._plan_silence_cuts(envelope, chunk_frames, start, end, rate)
+                else:
+                    segments = [self._find_stream_silence(
+                        input_audio_path, start, end, rate, chunk_frames, block_frames
+                    )]
+            
+            sources = []
+            
+            def open_source():
+                sources.append(WavFileSource(input_audio_path, block_frames))
+                return sources[-1]
+            
+            self._run_stream(open_source, segments, rate, channels, output_audio_path, reference_path)
+            
+            # Estatísticas do WAV completo a partir da primeira passagem
+            sources[0].consume()
+            self.source_stats = self._pcm_stats(sources[0], rate, channels)
+            
             return True, "Conversão concluída"
             
         except Exception as e:
             logging.error(f"Erro na conversão: {str(e)}")
             return False, str(e)
     
+    def convert_media(self, media_path, output_audio_path, reference_path=None):
+        """
+        Converte diretamente a partir do vídeo, sem WAV temporário em disco
+        
+        O áudio é descodificado pelo ffmpeg para um pipe em cada passagem
+        (planeamento de cortes, medição e codificação, conforme as etapas
+        ativas); apenas o ficheiro final é escrito em disco.
+        
+        Args:
+            media_path (str): Caminho do vídeo (ou áudio) de origem
+            output_audio_path (str): Caminho do áudio de saída
+            reference_path (str): Cópia do PCM processado (ver output_stats)
+            
+        Returns:
+            tuple: (sucesso, duração do áudio em segundos, mensagem)
+        """
+        self.stage_timings = {}
+        self.source_stats = None
+        self.output_stats = None
+        
+        try:
+            logging.info(f"Processando áudio em pipe: {os.path.basename(media_path)}")
+            
+            rate = self._decode_rate(media_path)
+            channels = 1 if self.profile['channels'] == 'mono' else 2
+            chunk_frames, block_frames = self._stream_block_sizes(rate)
+            
+            sources = []
+            
+            def open_source():
+                sources.append(PcmPipeSource(media_path, rate, channels, block_frames))
+                return sources[-1]
+            
+            segments = [(0, None)]
+            if self.config.get_silence_removal_enabled() or self.config.get_segment_removal_enabled():
+                segments = self._plan_pipe_segments(open_source, rate, chunk_frames)
+            
+            self._run_stream(open_source, segments, rate, channels, output_audio_path, reference_path)
+            
+            # A primeira passagem lê sempre o áudio completo
+            self.source_stats = self._pcm_stats(sources[0], rate, channels)
+            duration = self.source_stats['duration']
+            
+            return True, duration, "Conversão concluída"
+            
+        except Exception as e:
+            logging.error(f"Erro na conversão: {str(e)}")
+            return False, 0, str(e)
+    
+    def _decode_rate(self, media_path):
+        """
+        Sample rate da descodificação por pipe
+        
+        Com resampler = numpy o áudio é lido na frequência original e
+        reamostrado uma única vez no grafo; com ffmpeg é o descodificador
+        que entrega já a frequência do perfil.
+        
+        Args:
+            media_path (str): Caminho do vídeo (ou áudio) de origem
+            
+        Returns:
+            int: Sample rate em Hz
+        """
+        if self.resampler == 'numpy':
+            record = self.probe.probe(media_path)
+            if record and record['audio'] and record['audio']['sample_rate']:
+                return record['audio']['sample_rate']
+        
+        return self.profile['sample_rate']
+    
+    def pipe_allowed(self):
+        """
+        Verifica se a conversão pode ler o vídeo diretamente por pipe
+        
+        Returns:
+            bool: True se pipe ativo e todas as etapas suportam streaming
+        """
+        return self.config.get_pipe_enabled() and self.streaming and self._streaming_supported()
+    
+    def _stream_block_sizes(self, rate):
+        """
+        Calcula janela de deteção de silêncio e tamanho dos blocos
+        
+        Returns:
+            tuple: (frames por janela, frames por bloco múltiplo da janela)
+        """
+        chunk_frames = max(1, rate * self.SILENCE_CHUNK_MS // 1000)
+        block_frames = chunk_frames * max(1, int(self.block_seconds * 1000 / self.SILENCE_CHUNK_MS))
+        return chunk_frames, block_frames
+    
+    def _plan_pipe_segments(self, open_source, rate, chunk_frames):
+        """
+        Passagem de planeamento por pipe: duração total e envolvente RMS
+        
+        Args:
+            open_source (callable): Abre nova descodificação do áudio
+            rate (int): Sample rate
+            chunk_frames (int): Frames por janela de deteção
+            
+        Returns:
+            list: Pares (frame inicial, frame final exclusivo) a manter
+        """
+        silence = self.config.get_silence_removal_enabled()
+        pieces = [np.zeros(0)]
+        
+        source = open_source()
+        try:
+            for block in source.read_blocks():
+                if silence:
+                    pieces.append(rms_envelope(block, chunk_frames))
+        finally:
+            source.close()
+        
+        total_frames = source.position
+        logging.info(f"Áudio original: {total_frames / rate:.2f}s, "
+                     f"{rate}Hz, {source.channels} canal(is)")
+        
+        start, end = self._plan_segment_removal(total_frames, rate)
+        if not silence:
+            return [(start, end)]
+        
+        # Envolvente alinhada a janelas inteiras a partir do início do áudio
+        base = start - start % chunk_frames
+        envelope = np.concatenate(pieces)[base // chunk_frames:-(-end // chunk_frames)]
+        internal = self.config.get_silence_mode() == 'internal'
+        
+        segments = self._plan_silence_cuts(envelope, chunk_frames, base, end, rate, internal)
+        segments[0] = (max(segments[0][0], start), segments[0][1])
+        return segments
+    
+    def _run_stream(self, open_source, segments, rate, channels, output_audio_path, reference_path=None):
+        """
+        Passagens de medição e codificação sobre os trechos planeados
+        
+        Args:
+            open_source (callable): Abre nova leitura do áudio (WavFileSource
+                                    ou PcmPipeSource)
+            segments (list): Pares (frame inicial, frame final exclusivo)
+            rate (int): Sample rate
+            channels (int): Número de canais
+            output_audio_path (str): Caminho do áudio de saída
+            reference_path (str): Cópia do PCM enviado ao encoder (None = sem cópia)
+        """
+        crossfade_frames = int(self.config.get_silence_crossfade() * rate / 1000)
+        
+        def read_source(source):
+            return splice_segments(source.read_blocks, segments, crossfade_frames)
+        
+        # Configurações do perfil: downmix no grafo, restantes no encoder
+        target_channels = 1 if self.profile['channels'] == 'mono' else 2
+        target_rate = self.profile['sample_rate']
+        
+        # Passagem de análise: nível (normalização), conteúdo (perfil auto)
+        # e correlação entre canais (mono automático)
+        gain_db = 0.0
+        analyzers = []
+        
+        # Correlação entre canais na passagem de análise ou, sem esta, no
+        # início da codificação (sem descodificar o áudio mais uma vez)
+        correlation = None
+        if self.mono_correlation and channels == 2 and target_channels == 2:
+            correlation = StereoCorrelation()
+        
+        analyzer = self._create_analyzer(rate, channels, correlation is not None)
+        if analyzer:
+            analyzers.append(analyzer)
+        measure_pass = self.config.get_normalization_enabled() or analyzer is not None
+        if correlation is not None and measure_pass:
+            analyzers.append(correlation)
+        
+        if measure_pass:
+            source = open_source()
+            try:
+                gain_db = self._measure_stream_gain(lambda: read_source(source), rate, channels, analyzers)
+            finally:
+                source.close()
+        
+        source = open_source()
+        try:
+            blocks = read_source(source)
+            if correlation is not None and not measure_pass:
+                blocks = self._lookahead_correlation(blocks, correlation, rate)
+            
+            # Canais iguais: downmix no início do grafo e bitrate para um canal
+            mono = correlation is not None and self._is_mono(correlation.value())
+            if mono:
+                target_channels = 1
+            bitrate = self._select_bitrate(analyzer, mono)
+            
+            graph = self._build_graph(rate, channels, target_channels, downmix_first=mono, output_rate=target_rate)
+            graph_channels = 1 if 'downmix' in graph.names() else channels
+            graph_rate = target_rate if 'reamostragem' in graph.names() else rate
+            
+            if target_channels != channels and not mono:
+                logging.info(f"Convertido para {self.profile['channels']}")
+            if target_rate != graph_rate:
+                logging.info(f"Sample rate ajustado pelo encoder: {graph_rate}Hz → {target_rate}Hz")
+            
+            # Codificação
+            logging.info(f"Exportando {self.output_format.upper()}: {os.path.basename(output_audio_path)}")
+            encoder = AudioEncoder(
+                output_audio_path,
+                graph_rate,
+                graph_channels,
+                self.output_format,
+                bitrate,
+                output_sample_rate=target_rate,
+                output_channels=target_channels,
+                gain_db=gain_db,
+                reference_path=reference_path,
+                vbr=self._vbr_encoding(mono)
+            )
+            
+            try:
+                graph.drain(blocks, encoder.write, 'codificação')
+                encoder.close()
+            except Exception:
+                encoder.abort()
+                raise
+        finally:
+            source.close()
+        
+        final_duration = encoder.frames_written / float(graph_rate)
+        
+        # Níveis do sinal enviado ao encoder (sample rate e canais finais
+        # são aplicados pelo ffmpeg e não alteram os níveis)
+        rms_dbfs, peak_dbfs = encoder.meter.levels()
+        self.output_stats = {
+            'duration': final_duration,
+            'sample_rate': target_rate,
+            'channels': target_channels,
+            'dBFS': rms_dbfs,
+            'max_dBFS': peak_dbfs
+        }
+        if reference_path:
+            self.output_stats['reference'] = {
+                'path': reference_path,
+                'sample_rate': graph_rate,
+                'channels': graph_channels
+            }
+        
+        self.stage_timings['codificação'] = dict(graph.timings)
+        logging.info(f"Tempo por etapa: {graph.format_timings()}")
+        logging.info(f"{self.output_format.upper()} exportado: bitrate={bitrate}, "
+                     f"{target_channels} canal(is)")
+        logging.info(f"Conversão concluída. Duração final: {final_duration:.2f}s")
+    
+    def _pcm_stats(self, source, rate, channels):
+        """
+        Estatísticas do áudio descodificado, no formato da análise de qualidade
+        
+        Args:
+            source (PcmPipeSource): Leitura que mediu o áudio completo
+                                    (ou WavFileSource após consume)
+            rate (int): Sample rate
+            channels (int): Número de canais
+            
+        Returns:
+            dict: Estatísticas equivalentes às de um WAV de 16 bits
+        """
+        frames = source.position
+        size_bytes = frames * channels * 2
+        rms_dbfs, peak_dbfs = source.levels()
+        
+        return {
+            'duration': frames / float(rate),
+            'sample_rate': rate,
+            'channels': channels,
+            'sample_width': 16,
+            'dBFS': rms_dbfs,
+            'max_dBFS': peak_dbfs,
+            'size_bytes': size_bytes,
+            'size_mb': round(size_bytes / (1024 * 1024), 2),
+            'bitrate_kbps': rate * channels * 16 // 1000
+        }
+    
+    def _plan_segment_removal(self, total_frames, rate):
+        """
+        Calcula intervalo de frames após remoção de segmentos
+        
+        Args:
+            total_frames (int): Número de frames do áudio
+            rate (int): Sample rate
+            
+        Returns:
+            tuple: (frame inicial, frame final exclusivo)
+        """
+        if not self.config.get_segment_removal_enabled():
+            return 0, total_frames
+        
+        remove_start = self.config.get_remove_start()
+        remove_end = self.config.get_remove_end()
+        
+        if remove_start <= 0 and remove_end <= 0:
+            return 0, total_frames
+        
+        start_frames = int(remove_start * rate)
+        end_frames = int(remove_end * rate)
+        
+        # Validar limites
+        if start_frames >= total_frames:
+            logging.warning("Remoção do início maior que duração total. Pulando.")
+            return 0, total_frames
+        
+        if end_frames >= total_frames - start_frames:
+            logging.warning("Remoção total maior que duração. Ajustando.")
+            end_frames = 0
+        
+        logging.info(f"Segmentos removidos: início={remove_start}s, fim={remove_end}s")
+        
+        return start_frames, total_frames - end_frames
+    
+    def _find_stream_silence(self, wav_path, start, end, rate, chunk_frames, block_frames):
+        """
+        Procura silêncio no início e no fim sem ler o ficheiro completo
+        
+        O início é lido para a frente até à primeira janela audível; o fim
+        é lido por blocos do fim para trás (acesso direto ao WAV), com
+        janelas alinhadas ao fim do áudio.
+        
+        Args:
+            wav_path (str): Caminho do WAV
+            start (int): Frame inicial
+            end (int): Frame final (exclusivo)
+            rate (int): Sample rate
+            chunk_frames (int): Frames por janela de deteção
+            block_frames (int): Frames por bloco (múltiplo de chunk_frames)
+            
+        Returns:
+            tuple: (frame inicial, frame final) após remoção de silêncios
+        """
+        threshold = self.config.get_silence_threshold()
+        min_frames = int(self.config.get_silence_min_duration() * rate)
+        
+        # Início: primeira janela audível
+        start_trim = None
+        position = start
+        
+        for block in read_wav_blocks(wav_path, block_frames, start, end):
+            edges = silence_edges(rms_envelope(block, chunk_frames), threshold)
+            if edges:
+                start_trim = position - start + edges[0] * chunk_frames
+                break
+            position += block.shape[0]
+        
+        if start_trim is None:
+            logging.warning("Áudio sem trechos acima do limiar de silêncio. Mantendo completo.")
+            return start, end
+        
+        # Fim: última janela audível, lendo do fim para trás
+        end_trim = 0
+        position = end
+        
+        while position > start + start_trim:
+            block_start = max(start + start_trim, position - block_frames)
+            block = read_wav_range(wav_path, block_start, position)
+            envelope = rms_envelope(block, chunk_frames, align_end=True)
+            edges = silence_edges(envelope, threshold)
+            
+            if edges:
+                end_trim = (end - position) + (envelope.shape[0] - 1 - edges[1]) * chunk_frames
+                break
+            position = block_start
+        
+        # Aplicar apenas se maior que duração mínima
+        if start_trim > min_frames:
+            start += start_trim
+            logging.info(f"Silêncio removido do início: {start_trim / rate:.2f}s")
+        
+        if end_trim > min_frames:
+            end -= end_trim
+            logging.info(f"Silêncio removido do fim: {end_trim / rate:.2f}s")
+        
+        return start, end
+    
+    def _plan_silence_cuts(self, envelope, chunk_frames, start, end, rate, internal=True):
+        """
+        Planeia os trechos a manter a partir da envolvente RMS
+        
+        Silêncios no início e fim são removidos por inteiro; no modo
+        internal, pausas internas longas são encurtadas para max_gap
+        (já contando com o crossfade da junção).
+        
+        Args:
+            envelope (numpy.ndarray): dBFS por janela, a partir de start
+            chunk_frames (int): Frames por janela
+            start (int): Frame inicial
+            end (int): Frame final (exclusivo)
+            rate (int): Sample rate
+            internal (bool): Reduzir também pausas internas
+            
+        Returns:
+            list: Pares (frame inicial, frame final exclusivo) a manter
+        """
+        threshold = self.config.get_silence_threshold()
+        min_frames = int(self.config.get_silence_min_duration() * rate)
+        
+        runs = silent_runs(envelope, threshold)
+        if runs.size == 0:
+            return [(start, end)]
+        
+        if runs[0, 0] == 0 and runs[0, 1] == envelope.shape[0]:
+            logging.warning("Áudio sem trechos acima do limiar de silêncio. Mantendo completo.")
+            return [(start, end)]
+        
+        # Janelas → frames absolutos (última janela pode ser parcial)
+        runs = np.minimum(runs * chunk_frames, end - start) + start
+        keep_start, keep_end = start, end
+        
+        # Aplicar apenas se maior que duração mínima
+        if runs[0, 0] == start and runs[0, 1] - start > min_frames:
+            keep_start = int(runs[0, 1])
+            logging.info(f"Silêncio removido do início: {(keep_start - start) / rate:.2f}s")
+        
+        if runs[-1, 1] == end and end - runs[-1, 0] > min_frames:
+            keep_end = int(runs[-1, 0])
+            logging.info(f"Silêncio removido do fim: {(end - keep_end) / rate:.2f}s")
+        
+        if not internal:
+            return [(keep_start, keep_end)]
+        
+        # Pausas internas: manter metade de max_gap de cada lado
+        crossfade_frames = int(self.config.get_silence_crossfade() * rate / 1000)
+        half_gap = (int(self.config.get_silence_max_gap() * rate) + crossfade_frames) // 2
+        
+        runs = runs[(runs[:, 0] > start) & (runs[:, 1] < end)]
+        lengths = runs[:, 1] - runs[:, 0]
+        runs = runs[lengths > max(min_frames, 2 * half_gap)]
+        
+        if runs.shape[0]:
+            removed = int(np.sum(runs[:, 1] - runs[:, 0] - 2 * half_gap + crossfade_frames))
+            logging.info(f"Pausas internas reduzidas: {runs.shape[0]} ({removed / rate:.2f}s removidos)")
+        
+        firsts = [keep_start] + (runs[:, 1] - half_gap).tolist()
+        lasts = (runs[:, 0] + half_gap).tolist() + [keep_end]
+        return list(zip(firsts, lasts))
+    
+    def _measure_stream_gain(self, read_source, rate, channels, analyzers=()):
+        """
+        Passagem de análise do nível do áudio (após filtros, se ativos)
+        
+        Args:
+            read_source (callable): Devolve nova sequência de blocos do áudio
+            rate (int): Sample rate
+            channels (int): Número de canais
+            analyzers (list): Outras medições alimentadas na mesma passagem
+                              (ContentAnalyzer, StereoCorrelation)
+            
+        Returns:
+            float: Ganho de normalização em dB (0 se normalização desativada)
+        """
+        meters = list(analyzers)
+        meter = None
+        if self.config.get_normalization_enabled():
+            meter = LoudnessMeter(rate, channels, self.config.get_normalization_method() == 'lufs')
+            meters.append(meter)
+        
+        def measure(block):
+            for item in meters:
+                item.process(block)
+        
+        # Grafo novo: mesmo estado inicial da passagem de codificação
+        graph = self._build_graph(rate, channels, verbose=False)
+        graph.drain(read_source(), measure, 'medição')
+        
+        self.stage_timings['análise'] = dict(graph.timings)
+        logging.info(f"Tempo por etapa (análise): {graph.format_timings()}")
+        
+        return self._normalization_gain(meter) if meter else 0.0
+    
+    def _create_analyzer(self, rate, channels, mono=False):
+        """
+        Análise de conteúdo para o perfil auto
+        
+        Args:
+            rate (int): Sample rate do áudio analisado
+            channels (int): Canais do áudio analisado
+            mono (bool): A saída pode passar a mono (mono automático)
+        
+        Returns:
+            ContentAnalyzer: Análise a alimentar (None com bitrate fixo)
+        """
+        if self.bitrate_selector is None:
+            return None
+        return self.bitrate_selector.create_analyzer(rate, channels, mono)
+    
+    def _is_mono(self, correlation):
+        """
+        Verifica se os canais são praticamente iguais (mono automático)
+        
+        Args:
+            correlation (float): Correlação entre canais (None = canal em silêncio)
+            
+        Returns:
+            bool: True se a correlação atinge mono_correlation
+        """
+        if correlation is None or correlation < self.mono_correlation:
+            return False
+        logging.info(f"Canais praticamente iguais (correlação {correlation:.4f}): convertido para mono")
+        return True
+    
+    def _identical_channels(self, audio):
+        """
+        Correlação entre canais do áudio em memória (mono automático)
+        
+        Args:
+            audio (AudioSegment): Áudio carregado
+            
+        Returns:
+            bool: True se o perfil é stereo e os canais são praticamente iguais
+        """
+        if not self.mono_correlation or audio.channels != 2 or self.profile['channels'] != 'stereo':
+            return False
+        
+        correlation = StereoCorrelation()
+        if audio.sample_width == 2:
+            correlation.process(np.frombuffer(audio.raw_data, dtype='<i2').reshape(-1, 2))
+        else:
+            for block in segment_blocks(audio, audio.frame_rate):
+                correlation.process(block)
+        
+        return self._is_mono(correlation.value())
+    
+    def _mono_bitrate(self, bitrate):
+        """
+        Bitrate para o mesmo conteúdo num só canal
+        
+        Args:
+            bitrate (str): Bitrate stereo (ex: 128k)
+            
+        Returns:
+            str: Metade do bitrate, no mínimo 32k (codificado em CBR,
+                 ver _vbr_encoding)
+        """
+        kbps = max(32, int(bitrate.lower().rstrip('k')) // 2)
+        logging.info(f"Bitrate ajustado para mono: {bitrate} → {kbps}k")
+        return f"{kbps}k"
+    
+    def _vbr_encoding(self, mono=False):
+        """
+        Codificação MP3 em VBR de máxima qualidade (-q:a 0)?
+        
+        Com -q:a 0 o LAME ignora o bitrate; o perfil auto e o mono
+        automático (metade do bitrate) precisam de CBR no bitrate pedido.
+        
+        Args:
+            mono (bool): Canais iguais convertidos para mono
+            
+        Returns:
+            bool: True para VBR, False para CBR
+        """
+        return self.bitrate_selector is None and not mono
+    
+    def _lookahead_correlation(self, blocks, correlation, rate):
+        """
+        Mede a correlação entre canais nos primeiros segundos dos blocos
+        
+        Args:
+            blocks (iterator): Blocos (frames, canais) da codificação
+            correlation (StereoCorrelation): Medição a alimentar
+            rate (int): Sample rate
+            
+        Returns:
+            iterator: Os mesmos blocos, a começar pelos retidos
+        """
+        limit = self.MONO_LOOKAHEAD_SECONDS * rate
+        retained = []
+        for block in blocks:
+            correlation.process(block)
+            retained.append(block)
+            if correlation.frames >= limit:
+                break
+        
+        return itertools.chain(retained, blocks)
+    
+    def _select_bitrate(self, analyzer, mono=False):
+        """
+        Bitrate da codificação: o do perfil ou, no perfil auto, o escolhido
+        pela análise do conteúdo
+        
+        No perfil auto o mono automático é previsto pelo seletor (um canal);
+        com bitrate fixo usa-se metade do bitrate do perfil.
+        
+        Args:
+            analyzer (ContentAnalyzer): Análise completa (None com bitrate fixo)
+            mono (bool): Canais iguais convertidos para mono
+            
+        Returns:
+            str: Bitrate do encoder (ex: 128k)
+        """
+        if analyzer is None:
+            return self._mono_bitrate(self.profile['bitrate']) if mono else self.profile['bitrate']
+        return self.bitrate_selector.select(analyzer, 1 if mono else None)
+    
+    def _normalization_gain(self, meter):
+        """
+        Calcula ganho de normalização a partir de uma medição completa
+        
+        O ganho é limitado para que o pico real não ultrapasse
+        true_peak_limit.
+        
+        Args:
+            meter (LoudnessMeter): Medição do áudio
+            
+        Returns:
+            float: Ganho em dB (0 em silêncio)
+        """
+        if self.config.get_normalization_method() == 'lufs':
+            current = meter.integrated_loudness()
+            target = self.config.get_normalization_target_lufs()
+            unit = 'LUFS'
+        else:
+            current = meter.rms_level()
+            target = self.config.get_normalization_target()
+            unit = 'dBFS'
+        
+        if math.isinf(current):
+            logging.warning("Áudio em silêncio. Normalização ignorada.")
+            return 0.0
+        
+        gain_db = target - current
+        
+        peak_limit = self.config.get_true_peak_limit()
+        peak_after = meter.true_peak() + gain_db
+        if peak_after > peak_limit:
+            gain_db -= peak_after - peak_limit
+            logging.info(f"Ganho limitado pelo pico real: {meter.true_peak():.1f} dBTP → {peak_limit:.1f} dBTP")
+        
+        logging.info(f"Volume normalizado: {current:.1f} → {current + gain_db:.1f} {unit}")
+        
+        return gain_db
+    
+    def stream_copy_allowed(self):
+        """
+        Verifica se a configuração permite copiar o áudio sem recodificar
+        
+        Returns:
+            bool: True se nenhum processamento do sinal está ativo
+        """
+        if not self.config.get_stream_copy_enabled():
+            return False
+        
+        # Perfil auto: o bitrate só é conhecido depois de analisar o conteúdo
+        if self.bitrate_selector:
+            return False
+        
+        return not any([
+            self.config.get_segment_removal_enabled(),
+            self.config.get_silence_removal_enabled(),
+            self.config.get_highpass_filter_enabled(),
+            self.config.get_lowpass_filter_enabled(),
+            self.config.get_compression_enabled(),
+            self.config.get_normalization_enabled()
+        ])
+    
+    def can_stream_copy(self, stream_info):
+        """
+        Verifica se a faixa de áudio de origem já corresponde à saída pedida
+        
+        Args:
+            stream_info (dict): Características do áudio de origem
+            
+        Returns:
+            bool: True se a faixa pode ser copiada sem recodificar
+        """
+        if not stream_info or not self.stream_copy_allowed():
+            return False
+        
+        target_channels = 1 if self.profile['channels'] == 'mono' else 2
+        target_kbps = int(self.profile['bitrate'].lower().rstrip('k'))
+        source_kbps = stream_info['bitrate_kbps']
+        
+        if stream_info['codec'] != OUTPUT_FORMATS[self.output_format]['codec']:
+            return False
+        
+        if stream_info['sample_rate'] != self.profile['sample_rate']:
+            return False
+        
+        if stream_info['channels'] != target_channels:
+            return False
+        
+        if source_kbps is None:
+            return False
+        
+        return abs(source_kbps - target_kbps) <= target_kbps * self.STREAM_COPY_BITRATE_TOLERANCE
+    
     def _apply_segment_removal(self, audio):
         """Remove segmentos do início e fim"""
         if not self.config.get_segment_removal_enabled():
@@ -87,33 +1015,57 @@ class AudioConverter:
         return audio
     
     def _apply_silence_removal(self, audio):
-        """Remove silêncios do início e fim"""
+        """Remove silêncios do início e fim (e reduz pausas internas no modo internal)"""
         if not self.config.get_silence_removal_enabled():
             return audio
         
-        threshold = self.config.get_silence_threshold()
-        min_duration = int(self.config.get_silence_min_duration() * 1000)  # ms
+        rate = audio.frame_rate
+        internal = self.config.get_silence_mode() == 'internal'
         
-        # Detectar silêncio no início
-        start_trim = detect_leading_silence(audio, silence_threshold=threshold, chunk_size=10)
+        # Envolvente RMS em janelas de 10ms, calculada uma única vez
+        if audio.sample_width == 2:
+            samples = np.frombuffer(audio.raw_data, dtype='<i2').reshape(-1, audio.channels)
+            full_scale = PCM16_SCALE
+        else:
+            samples = segment_to_array(audio)
+            full_scale = 1.0
         
-        # Detectar silêncio no fim (reverter áudio)
-        end_trim = detect_leading_silence(audio.reverse(), silence_threshold=threshold, chunk_size=10)
+        total_frames = samples.shape[0]
+        chunk_frames = max(1, rate * self.SILENCE_CHUNK_MS // 1000)
+        envelope = rms_envelope(samples, chunk_frames, full_scale=full_scale)
+        segments = self._plan_silence_cuts(envelope, chunk_frames, 0, total_frames, rate, internal)
         
-        # Aplicar apenas se maior que duração mínima
-        if start_trim > min_duration:
-            audio = audio[start_trim:]
-            logging.info(f"Silêncio removido do início: {start_trim/1000:.2f}s")
+        if len(segments) == 1:
+            start, end = segments[0]
+            if start == 0 and end == total_frames:
+                return audio
+            return audio.get_sample_slice(start, end)
         
-        if end_trim > min_duration:
-            audio = audio[:-end_trim]
-            logging.info(f"Silêncio removido do fim: {end_trim/1000:.2f}s")
+        # Pausas internas: juntar trechos com crossfade
+        def read_blocks(first, last):
+            yield samples[first:last].astype(np.float32) / np.float32(full_scale)
         
-        return audio
+        crossfade_frames = int(self.config.get_silence_crossfade() * rate / 1000)
+        spliced = np.concatenate(list(splice_segments(read_blocks, segments, crossfade_frames)))
+        return array_to_segment(spliced, audio)
     
     def _apply_filters(self, audio):
         """Aplica filtros de áudio (passa-alta, passa-baixa, compressão)"""
         
+        if self.config.get_filter_engine() == 'numpy':
+            graph = self._build_graph(audio.frame_rate, audio.channels)
+            if graph.stages:
+                # Filtrar por blocos para limitar memória temporária
+                step = max(1, int(self.block_seconds * audio.frame_rate))
+                filtered = list(graph.run(segment_blocks(audio, step)))
+                audio = array_to_segment(np.concatenate(filtered), audio)
+                self.stage_timings['filtros'] = dict(graph.timings)
+                logging.info(f"Tempo por etapa: {graph.format_timings()}")
+            return audio
+        
+        if self.config.get_filter_order() > 1:
+            logging.warning("Motor pydub suporta apenas filtros de ordem 1")
+        
         # Filtro passa-alta (remove frequências baixas/ruído)
         if self.config.get_highpass_filter_enabled():
             freq = self.config.get_highpass_freq()
@@ -130,35 +1082,59 @@ class AudioConverter:
         if self.config.get_compression_enabled():
             threshold = self.config.get_compression_threshold()
             ratio = self.config.get_compression_ratio()
-            audio = compress_dynamic_range(audio, threshold=threshold, ratio=ratio)
+            audio = compress_dynamic_range(
+                audio,
+                threshold=threshold,
+                ratio=ratio,
+                attack=self.config.get_compression_attack(),
+                release=self.config.get_compression_release()
+            )
             logging.info(f"Compressão aplicada: threshold={threshold}dBFS, ratio={ratio}:1")
         
         return audio
     
-    def _apply_normalization(self, audio):
-        """Normaliza volume do áudio"""
-        if not self.config.get_normalization_enabled():
-            return audio
+    def _measure_normalization(self, audio, analyzer=None):
+        """
+        Mede o volume numa única passagem e calcula o ganho de normalização
         
-        target_level = self.config.get_normalization_target()
+        O ganho não é aplicado aqui: é passado ao encoder na exportação.
         
-        # Normalizar para nível padrão
-        audio = normalize(audio, headroom=0.1)
+        Args:
+            audio (AudioSegment): Áudio processado
+            analyzer (ContentAnalyzer): Análise de conteúdo alimentada na
+                                        mesma passagem (perfil auto)
         
-        # Ajustar para nível alvo
-        current_dBFS = audio.dBFS
-        gain_needed = target_level - current_dBFS
-        audio = audio + gain_needed
+        Returns:
+            float: Ganho em dB (0 se normalização desativada)
+        """
+        meter = None
+        if self.config.get_normalization_enabled():
+            meter = LoudnessMeter(
+                audio.frame_rate,
+                audio.channels,
+                self.config.get_normalization_method() == 'lufs'
+            )
         
-        logging.info(f"Volume normalizado: {current_dBFS:.1f} → {target_level:.1f} dBFS")
+        if meter or analyzer:
+            for block in segment_blocks(audio, audio.frame_rate):
+                if meter:
+                    meter.process(block)
+                if analyzer:
+                    analyzer.process(block)
         
-        return audio
+        return self._normalization_gain(meter) if meter else 0.0
     
-    def _apply_profile_settings(self, audio):
-        """Aplica configurações do perfil (canais, sample rate)"""
+    def _apply_profile_settings(self, audio, channels=None):
+        """
+        Aplica configurações do perfil (canais, sample rate)
+        
+        Args:
+            audio (AudioSegment): Áudio processado
+            channels (str): mono ou stereo (None = do perfil)
+        """
         
         # Converter para mono ou stereo
-        channels = self.profile['channels']
+        channels = channels or self.profile['channels']
         if channels == 'mono' and audio.channels > 1:
             audio = audio.set_channels(1)
             logging.info("Convertido para mono")
@@ -169,30 +1145,63 @@ class AudioConverter:
         # Ajustar sample rate
         target_rate = self.profile['sample_rate']
         if audio.frame_rate != target_rate:
-            audio = audio.set_frame_rate(target_rate)
             logging.info(f"Sample rate ajustado: {audio.frame_rate}Hz → {target_rate}Hz")
+            if self.resampler == 'numpy':
+                resampler = Resampler(audio.frame_rate, target_rate, audio.channels, self.resample_quality)
+                step = max(1, int(self.block_seconds * audio.frame_rate))
+                blocks = [resampler.process(block) for block in segment_blocks(audio, step)]
+                blocks.append(resampler.flush())
+                audio = array_to_segment(np.concatenate(blocks), audio, target_rate)
+            else:
+                audio = audio.set_frame_rate(target_rate)
         
         return audio
     
-    def _export_mp3(self, audio, output_path):
+    def _export_audio(self, audio, output_path, gain_db=0.0, bitrate=None, vbr=True):
         """
-        Exporta áudio para MP3
+        Exporta áudio no formato de saída configurado
         
         Args:
             audio (AudioSegment): Áudio processado
             output_path (str): Caminho de saída
+            gain_db (float): Ganho aplicado pelo ffmpeg durante a codificação
+            bitrate (str): Bitrate do encoder (None = o do perfil)
+            vbr (bool): MP3 em VBR de máxima qualidade (ver _vbr_encoding)
         """
-        bitrate = self.profile['bitrate']
+        bitrate = bitrate or self.profile['bitrate']
+        output = OUTPUT_FORMATS[self.output_format]
+        parameters = []
+        
+        if gain_db:
+            parameters += ["-af", f"volume={gain_db:.4f}dB"]
+        
+        # Melhor qualidade de encoding (apenas LAME; CBR no perfil auto e no mono automático)
+        if self.output_format == 'mp3' and vbr:
+            parameters += ["-q:a", "0"]
         
         # Exportar com configurações do perfil
         audio.export(
             output_path,
-            format='mp3',
+            format=output['muxer'],
+            codec=output['encoder'],
             bitrate=bitrate,
-            parameters=["-q:a", "0"]  # Melhor qualidade de encoding
+            parameters=parameters or None
         )
         
-        logging.info(f"MP3 exportado: bitrate={bitrate}, {audio.channels} canal(is)")
+        logging.info(f"{self.output_format.upper()} exportado: bitrate={bitrate}, {audio.channels} canal(is)")
+    
+    def _write_reference(self, audio, gain_db, reference_path):
+        """
+        Guarda o PCM processado (com o ganho da codificação) para as métricas de qualidade
+        
+        Args:
+            audio (AudioSegment): Áudio processado
+            gain_db (float): Ganho aplicado pelo ffmpeg na codificação
+            reference_path (str): Ficheiro PCM 16 bits intercalado
+        """
+        samples = segment_to_array(audio) * np.float32(10 ** (gain_db / 20.0) * PCM16_SCALE)
+        np.clip(samples, -PCM16_SCALE, PCM16_SCALE - 1, out=samples)
+        samples.astype('<i2').tofile(reference_path)
     
     def get_audio_stats(self, audio_path):
         """
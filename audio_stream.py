@@ -0,0 +1,602 @@
+"""
+audio_stream.py
+Leitura, processamento e codificação de áudio em blocos (memória limitada)
+"""
+
+import logging
+import math
+import subprocess
+import tempfile
+import wave
+
+import numpy as np
+
+from ffmpeg_utils import OUTPUT_FORMATS, get_ffmpeg_exe, last_error_line
+
+
+# Amplitude máxima de uma amostra de 16 bits (referência para dBFS)
+PCM16_SCALE = 32768.0
+
+
+def wav_info(wav_path):
+    """
+    Lê cabeçalho de um WAV PCM
+    
+    Args:
+        wav_path (str): Caminho do WAV
+    
+    Returns:
+        dict: sample_rate, channels, sample_width (bytes) e frames
+    """
+    with wave.open(wav_path, 'rb') as wav_file:
+        return {
+            'sample_rate': wav_file.getframerate(),
+            'channels': wav_file.getnchannels(),
+            'sample_width': wav_file.getsampwidth(),
+            'frames': wav_file.getnframes()
+        }
+
+
+def read_wav_blocks(wav_path, block_frames, start_frame=0, end_frame=None):
+    """
+    Lê um WAV de 16 bits em blocos de tamanho fixo
+    
+    Args:
+        wav_path (str): Caminho do WAV
+        block_frames (int): Frames por bloco
+        start_frame (int): Primeiro frame a ler
+        end_frame (int): Frame final (exclusivo); None = até ao fim
+    
+    Yields:
+        numpy.ndarray: Bloco float32 (frames, canais) em [-1, 1)
+    """
+    with wave.open(wav_path, 'rb') as wav_file:
+        if wav_file.getsampwidth() != 2:
+            raise ValueError("Apenas WAV PCM de 16 bits é suportado em modo streaming")
+        
+        channels = wav_file.getnchannels()
+        total = wav_file.getnframes()
+        end_frame = total if end_frame is None else min(end_frame, total)
+        
+        wav_file.setpos(start_frame)
+        position = start_frame
+        
+        while position < end_frame:
+            count = min(block_frames, end_frame - position)
+            data = wav_file.readframes(count)
+            if not data:
+                break
+            
+            samples = np.frombuffer(data, dtype='<i2').reshape(-1, channels)
+            position += samples.shape[0]
+            
+            yield samples.astype(np.float32) / PCM16_SCALE
+
+
+def read_wav_range(wav_path, start_frame, end_frame):
+    """
+    Lê um intervalo de um WAV de 16 bits (acesso direto, sem ler o início)
+    
+    Args:
+        wav_path (str): Caminho do WAV
+        start_frame (int): Primeiro frame
+        end_frame (int): Frame final (exclusivo)
+    
+    Returns:
+        numpy.ndarray: Amostras float32 (frames, canais)
+    """
+    count = max(0, end_frame - start_frame)
+    return next(read_wav_blocks(wav_path, max(1, count), start_frame, end_frame),
+                np.zeros((0, wav_info(wav_path)['channels']), dtype=np.float32))
+
+
+def crossfade(tail, head):
+    """
+    Junta dois trechos com crossfade de potência constante
+    
+    Args:
+        tail (numpy.ndarray): Fim do trecho anterior (frames, canais)
+        head (numpy.ndarray): Início do trecho seguinte (mesma forma)
+    
+    Returns:
+        numpy.ndarray: Trecho misturado float32
+    """
+    position = (np.arange(tail.shape[0], dtype=np.float32) + 0.5) / tail.shape[0]
+    fade_out = np.cos(position * (np.pi / 2))[:, None]
+    fade_in = np.sin(position * (np.pi / 2))[:, None]
+    return (tail * fade_out + head * fade_in).astype(np.float32)
+
+
+def splice_segments(read_blocks, segments, crossfade_frames=0):
+    """
+    Encadeia trechos de um áudio, com crossfade em cada junção
+    
+    Cada junção consome crossfade_frames do fim de um trecho e do início
+    do seguinte (limitado a metade do trecho mais curto).
+    
+    Args:
+        read_blocks (callable): read_blocks(início, fim) -> blocos float32
+        segments (list): Pares (frame inicial, frame final exclusivo);
+                         fim None = até ao fim do áudio (trecho único)
+        crossfade_frames (int): Frames de cada crossfade
+    
+    Yields:
+        numpy.ndarray: Blocos float32 (frames, canais)
+    """
+    fades = [
+        min(crossfade_frames, (a_end - a_start) // 2, (b_end - b_start) // 2)
+        for (a_start, a_end), (b_start, b_end) in zip(segments, segments[1:])
+    ]
+    
+    for index, (start, end) in enumerate(segments):
+        head = fades[index - 1] if index > 0 else 0
+        tail = fades[index] if index < len(fades) else 0
+        
+        if head:
+            previous_end = segments[index - 1][1]
+            yield crossfade(
+                np.concatenate(list(read_blocks(previous_end - head, previous_end))),
+                np.concatenate(list(read_blocks(start, start + head)))
+            )
+        
+        yield from read_blocks(start + head, None if end is None else end - tail)
+
+
+def segment_to_array(audio):
+    """
+    Converte AudioSegment (pydub) em array float32 (frames, canais)
+    
+    Args:
+        audio (AudioSegment): Áudio
+    
+    Returns:
+        numpy.ndarray: Amostras em [-1, 1)
+    """
+    if audio.sample_width != 2:
+        audio = audio.set_sample_width(2)
+    
+    samples = np.frombuffer(audio.raw_data, dtype='<i2').reshape(-1, audio.channels)
+    return samples.astype(np.float32) / PCM16_SCALE
+
+
+def segment_blocks(audio, block_frames):
+    """
+    Percorre um AudioSegment em blocos float32 sem copiar o áudio inteiro
+    
+    Args:
+        audio (AudioSegment): Áudio
+        block_frames (int): Frames por bloco
+    
+    Yields:
+        numpy.ndarray: Blocos float32 (frames, canais) em [-1, 1)
+    """
+    if audio.sample_width != 2:
+        audio = audio.set_sample_width(2)
+    
+    samples = np.frombuffer(audio.raw_data, dtype='<i2').reshape(-1, audio.channels)
+    
+    for start in range(0, samples.shape[0], block_frames):
+        yield samples[start:start + block_frames].astype(np.float32) / PCM16_SCALE
+
+
+def array_to_segment(samples, template, sample_rate=None):
+    """
+    Cria AudioSegment de 16 bits a partir de array float32
+    
+    Args:
+        samples (numpy.ndarray): Amostras (frames, canais)
+        template (AudioSegment): Áudio com sample rate e canais de referência
+        sample_rate (int): Sample rate das amostras (None = o do template)
+    
+    Returns:
+        AudioSegment: Novo áudio
+    """
+    overrides = {'sample_width': 2, 'channels': samples.shape[1]}
+    if sample_rate:
+        overrides['frame_rate'] = sample_rate
+    return template._spawn(to_pcm16(samples), overrides=overrides)
+
+
+def to_pcm16(block):
+    """
+    Converte bloco float32 em bytes PCM 16 bits (com saturação)
+    
+    Args:
+        block (numpy.ndarray): Bloco float32 em [-1, 1)
+    
+    Returns:
+        bytes: Amostras intercaladas little-endian
+    """
+    scaled = np.clip(block * PCM16_SCALE, -PCM16_SCALE, PCM16_SCALE - 1)
+    return scaled.astype('<i2').tobytes()
+
+
+class LevelMeter:
+    """
+    Acumula energia e pico de amostras à medida que passam (sem guardar o sinal)
+    
+    As amostras estão na escala de 16 bits (int16 ou float em
+    [-32768, 32767]).
+    """
+    
+    def __init__(self, channels):
+        """
+        Args:
+            channels (int): Número de canais
+        """
+        self.channels = channels
+        self.frames = 0
+        self.energy = 0.0
+        self.peak = 0.0
+    
+    def add(self, samples):
+        """
+        Acrescenta um bloco
+        
+        Args:
+            samples (numpy.ndarray): Amostras (frames, canais)
+        """
+        if samples.size == 0:
+            return
+        
+        wide = samples.astype(np.float64)
+        self.energy += np.einsum('ij,ij->', wide, wide)
+        self.peak = max(self.peak, float(np.max(np.abs(wide))))
+        self.frames += samples.shape[0]
+    
+    def levels(self):
+        """
+        Níveis das amostras acumuladas
+        
+        Returns:
+            tuple: (RMS em dBFS, pico em dBFS); -inf se não houver sinal
+        """
+        samples = self.frames * self.channels
+        rms = math.sqrt(self.energy / samples) if samples else 0.0
+        
+        def to_dbfs(level):
+            return round(20 * math.log10(level / PCM16_SCALE), 2) if level > 0 else float('-inf')
+        
+        return to_dbfs(rms), to_dbfs(self.peak)
+
+
+def wav_levels(wav_path, block_frames=65536):
+    """
+    Mede os níveis de um WAV de 16 bits lendo-o em blocos (sem descodificar)
+    
+    Args:
+        wav_path (str): Caminho do WAV
+        block_frames (int): Frames por bloco
+    
+    Returns:
+        LevelMeter: Níveis e número de frames lidos
+    """
+    meter = LevelMeter(wav_info(wav_path)['channels'])
+    for block in read_wav_blocks(wav_path, block_frames):
+        meter.add(block * PCM16_SCALE)
+    return meter
+
+
+class AudioEncoder:
+    """Codifica blocos PCM enviando-os para o stdin de um processo ffmpeg"""
+    
+    def __init__(self, output_path, sample_rate, channels, output_format, bitrate,
+                 output_sample_rate=None, output_channels=None, gain_db=0.0, reference_path=None,
+                 vbr=True):
+        """
+        Inicia processo ffmpeg de codificação
+        
+        Args:
+            output_path (str): Ficheiro de saída
+            sample_rate (int): Sample rate dos blocos recebidos
+            channels (int): Canais dos blocos recebidos
+            output_format (str): Formato de saída (mp3, m4a, aac)
+            bitrate (str): Bitrate do encoder (ex: 128k)
+            output_sample_rate (int): Sample rate final (None = igual à entrada)
+            output_channels (int): Canais finais (None = igual à entrada)
+            gain_db (float): Ganho aplicado na conversão para PCM (normalização)
+            reference_path (str): Cópia do PCM enviado ao encoder (16 bits
+                                  intercalado, sem cabeçalho), para as
+                                  métricas de qualidade; None = sem cópia
+            vbr (bool): MP3 em VBR de máxima qualidade (-q:a 0, o LAME
+                        ignora o bitrate); False = CBR no bitrate pedido
+        """
+        output = OUTPUT_FORMATS[output_format]
+        
+        cmd = [
+            get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-v', 'error', '-y',
+            '-f', 's16le', '-ar', str(sample_rate), '-ac', str(channels),
+            '-i', 'pipe:0',
+            '-acodec', output['encoder'],
+            '-b:a', bitrate
+        ]
+        
+        if output_sample_rate and output_sample_rate != sample_rate:
+            cmd += ['-ar', str(output_sample_rate)]
+        
+        if output_channels and output_channels != channels:
+            cmd += ['-ac', str(output_channels)]
+        
+        # Melhor qualidade de encoding (apenas LAME)
+        if output_format == 'mp3' and vbr:
+            cmd += ['-q:a', '0']
+        
+        cmd += ['-f', output['muxer'], output_path]
+        logging.debug(f"Encoder: {' '.join(cmd)}")
+        
+        # stderr em ficheiro para nunca bloquear o pipe
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=self._stderr
+        )
+        self.scale = np.float32(PCM16_SCALE * 10 ** (gain_db / 20.0))
+        self.frames_written = 0
+        
+        # Níveis do sinal codificado (após ganho e saturação)
+        self.meter = LevelMeter(channels)
+        self._reference = open(reference_path, 'wb') if reference_path else None
+        
+        # Buffers de conversão reutilizados entre blocos
+        self._scaled = np.empty((0, channels), dtype=np.float32)
+        self._pcm = np.empty((0, channels), dtype='<i2')
+    
+    def write(self, block):
+        """
+        Envia um bloco para o encoder
+        
+        Args:
+            block (numpy.ndarray): Bloco float32 (frames, canais)
+        """
+        if self._scaled.shape != block.shape:
+            self._scaled = np.empty(block.shape, dtype=np.float32)
+            self._pcm = np.empty(block.shape, dtype='<i2')
+        
+        # Ganho e saturação no mesmo buffer, conversão para 16 bits sem cópias
+        np.multiply(block, self.scale, out=self._scaled)
+        np.clip(self._scaled, -PCM16_SCALE, PCM16_SCALE - 1, out=self._scaled)
+        np.copyto(self._pcm, self._scaled, casting='unsafe')
+        self.meter.add(self._pcm)
+        
+        self.process.stdin.write(memoryview(self._pcm).cast('B'))
+        if self._reference:
+            self._reference.write(memoryview(self._pcm).cast('B'))
+        self.frames_written += block.shape[0]
+    
+    def close(self):
+        """
+        Termina a codificação e aguarda o ffmpeg
+        
+        Raises:
+            RuntimeError: Se o ffmpeg terminar com erro
+        """
+        try:
+            self.process.stdin.close()
+            returncode = self.process.wait()
+            
+            if returncode != 0:
+                self._stderr.seek(0)
+                stderr = self._stderr.read().decode('utf-8', errors='replace')
+                raise RuntimeError(f"Erro no encoder: {last_error_line(stderr)}")
+        finally:
+            self._stderr.close()
+            if self._reference:
+                self._reference.close()
+    
+    def abort(self):
+        """Interrompe o encoder (ficheiro de saída fica incompleto)"""
+        try:
+            self.process.kill()
+            self.process.wait()
+        finally:
+            self._stderr.close()
+            if self._reference:
+                self._reference.close()
+
+
+class WavFileSource:
+    """
+    Leitura de intervalos de um WAV (mesma interface que PcmPipeSource)
+    
+    Como na descodificação por pipe, cada frame é medido da primeira vez
+    que passa pela leitura, incluindo os saltados entre intervalos
+    (silêncios e segmentos removidos): depois de consume(), levels() e
+    position descrevem o WAV completo sem uma passagem adicional.
+    """
+    
+    def __init__(self, wav_path, block_frames):
+        self.wav_path = wav_path
+        self.block_frames = block_frames
+        self.channels = wav_info(wav_path)['channels']
+        self.position = 0
+        self.meter = LevelMeter(self.channels)
+    
+    def read_blocks(self, start_frame=0, end_frame=None):
+        """Lê um intervalo do WAV em blocos float32 (ver read_wav_blocks)"""
+        # Frames saltados: lidos apenas para as estatísticas
+        if start_frame > self.position:
+            for _ in self._measured(self.position, start_frame):
+                pass
+        return self._measured(start_frame, end_frame)
+    
+    def _measured(self, start_frame, end_frame):
+        """Blocos do intervalo, medindo os frames ainda não lidos"""
+        cursor = start_frame
+        for block in read_wav_blocks(self.wav_path, self.block_frames, start_frame, end_frame):
+            new = block[max(0, self.position - cursor):]
+            if new.shape[0]:
+                self.meter.add(new * PCM16_SCALE)
+                self.position = cursor + block.shape[0]
+            cursor += block.shape[0]
+            yield block
+    
+    def consume(self):
+        """Lê o resto do WAV apenas para as estatísticas"""
+        for _ in self._measured(self.position, None):
+            pass
+    
+    def levels(self):
+        """
+        Níveis do áudio lido até agora
+        
+        Returns:
+            tuple: (RMS em dBFS, pico em dBFS); -inf se não houver sinal
+        """
+        return self.meter.levels()
+    
+    def close(self):
+        """Nada a libertar: cada leitura abre e fecha o ficheiro"""
+
+
+class PcmPipeSource:
+    """
+    Descodifica o áudio de um ficheiro multimédia para um pipe (sem WAV em disco)
+    
+    Os intervalos pedidos têm de ser crescentes: o pipe só avança.
+    """
+    
+    def __init__(self, media_path, sample_rate, channels, block_frames, start_seconds=0.0,
+                 duration_seconds=None):
+        """
+        Inicia processo ffmpeg de descodificação
+        
+        Args:
+            media_path (str): Vídeo ou áudio de origem
+            sample_rate (int): Sample rate pretendido
+            channels (int): Canais pretendidos
+            block_frames (int): Frames por bloco lido
+            start_seconds (float): Início da descodificação (seek do ffmpeg;
+                                   o frame 0 passa a ser este instante)
+            duration_seconds (float): Duração máxima descodificada (None = até ao fim)
+        """
+        self.channels = channels
+        self.block_frames = block_frames
+        self.position = 0
+        
+        # Estatísticas do áudio descodificado (para a análise de qualidade)
+        self.meter = LevelMeter(channels)
+        
+        cmd = [get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-v', 'error']
+        if start_seconds:
+            cmd += ['-ss', f"{start_seconds:.6f}"]
+        cmd += ['-i', media_path]
+        if duration_seconds:
+            cmd += ['-t', f"{duration_seconds:.6f}"]
+        cmd += [
+            '-map', '0:a:0',
+            '-vn', '-sn', '-dn',
+            '-acodec', 'pcm_s16le',
+            '-ar', str(sample_rate),
+            '-ac', str(channels),
+            '-f', 's16le', 'pipe:1'
+        ]
+        logging.debug(f"Descodificador: {' '.join(cmd)}")
+        
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr
+        )
+        self._buffer = bytearray(block_frames * channels * 2)
+        self._eof = False
+    
+    def read_blocks(self, start_frame=0, end_frame=None):
+        """
+        Lê um intervalo do áudio descodificado
+        
+        Args:
+            start_frame (int): Primeiro frame (>= fim do intervalo anterior)
+            end_frame (int): Frame final (exclusivo); None = até ao fim
+        
+        Yields:
+            numpy.ndarray: Blocos float32 (frames, canais) em [-1, 1)
+        """
+        if start_frame < self.position:
+            raise ValueError("PcmPipeSource só permite leitura para a frente")
+        
+        # Descartar frames até ao início do intervalo
+        while self.position < start_frame:
+            if self._read(start_frame - self.position) is None:
+                return
+        
+        while end_frame is None or self.position < end_frame:
+            count = self.block_frames if end_frame is None else min(self.block_frames, end_frame - self.position)
+            samples = self._read(count)
+            if samples is None:
+                return
+            yield samples.astype(np.float32) / PCM16_SCALE
+    
+    def _read(self, frames):
+        """
+        Lê até frames do pipe
+        
+        Returns:
+            numpy.ndarray: Amostras int16 (frames, canais) ou None no fim
+        """
+        if self._eof:
+            return None
+        
+        frames = min(frames, self.block_frames)
+        view = memoryview(self._buffer)[:frames * self.channels * 2]
+        filled = 0
+        
+        while filled < len(view):
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                self._eof = True
+                break
+            filled += count
+        
+        filled -= filled % (self.channels * 2)
+        if filled == 0:
+            return None
+        
+        samples = np.frombuffer(self._buffer, dtype='<i2', count=filled // 2).reshape(-1, self.channels)
+        self.position += samples.shape[0]
+        
+        self.meter.add(samples)
+        
+        return samples
+    
+    def consume(self):
+        """Lê o resto do áudio apenas para as estatísticas (sem converter blocos)"""
+        while self._read(self.block_frames) is not None:
+            pass
+    
+    def levels(self):
+        """
+        Níveis do áudio lido até agora
+        
+        Returns:
+            tuple: (RMS em dBFS, pico em dBFS); -inf se não houver sinal
+        """
+        return self.meter.levels()
+    
+    def close(self):
+        """
+        Termina a descodificação
+        
+        Raises:
+            RuntimeError: Se o ffmpeg terminar com erro antes do fim do áudio
+        """
+        try:
+            if not self._eof:
+                # Leitura interrompida antes do fim (ex: corte final)
+                self.process.kill()
+                self.process.wait()
+                return
+            
+            returncode = self.process.wait()
+            if returncode != 0:
+                self._stderr.seek(0)
+                stderr = self._stderr.read().decode('utf-8', errors='replace')
+                if 'matches no streams' in stderr:
+                    raise RuntimeError("Vídeo sem áudio")
+                raise RuntimeError(f"Erro na descodificação: {last_error_line(stderr)}")
+        finally:
+            self.process.stdout.close()
+            self._stderr.close()
@@ -0,0 +1,204 @@
+"""
+bitrate_selector.py
+Escolha do bitrate por ficheiro (perfil auto) a partir da análise do conteúdo
+"""
+
+import logging
+import math
+
+import numpy as np
+
+from dsp import ContentAnalyzer
+from quality_analyzer import QualityAnalyzer
+from signal_metrics import SignalMetrics
+
+
+class BitrateSelector:
+    """
+    Escolhe o menor bitrate cujo score de qualidade previsto atinge o alvo
+    
+    Para cada degrau da escada são previstas as métricas de sinal que a
+    conversão teria (as mesmas do SignalMetrics) e o score é calculado
+    pelas regras do QualityAnalyzer:
+    
+    - frequência de corte: passa-baixa do encoder para o bitrate e os
+      canais, limitado pela banda do conteúdo;
+    - SNR segmentado: em cada frame, energia do conteúdo acima do corte
+      (histograma do ContentAnalyzer) somada ao ruído de quantização, que
+      sobe ~6 dB por cada metade de kbps por kHz de banda e por canal
+      efetivo (canais correlacionados custam pouco mais que um em joint
+      stereo).
+    
+    Na fala, a banda a preservar é limitada a SPEECH_BANDWIDTH_HZ: o ruído
+    de fundo acima dessa frequência não justifica bitrate.
+    
+    Com saída stereo, o mesmo seletor prevê também a conversão em mono
+    (mono automático), com o passa-baixa e os pontos de um só canal.
+    """
+    
+    # Degraus de bitrate (kbps, CBR)
+    LADDER = (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+    
+    # Passa-baixa do encoder (kbps -> Hz) por número de canais, medido com libmp3lame
+    ENCODER_LOWPASS = {
+        2: ((32, 5800), (48, 7900), (64, 11300), (96, 15450), (128, 16900),
+            (192, 18900), (256, 19700), (320, 20500)),
+        1: ((32, 8600), (48, 11300), (64, 16900), (96, 20300), (320, 20300))
+    }
+    
+    # SNR de quantização = OFFSET + SLOPE * log2(kbps / (canais efetivos * kHz de banda))
+    QUANTIZATION_SNR_OFFSET = 6.6
+    QUANTIZATION_SNR_SLOPE = 6.0
+    
+    # Proporção de fala a partir da qual o conteúdo é tratado como fala
+    SPEECH_RATIO = 0.7
+    SPEECH_BANDWIDTH_HZ = 11025
+    
+    def __init__(self, target_score, max_mb_per_hour, sample_rate, channels):
+        """
+        Args:
+            target_score (int): Score de qualidade pretendido (0-100)
+            max_mb_per_hour (float): Limite de tamanho (0 = sem limite)
+            sample_rate (int): Sample rate de saída
+            channels (int): Canais de saída
+        """
+        self.target_score = target_score
+        self.sample_rate = sample_rate
+        self.channels = 1 if channels == 1 else 2
+        
+        # MB por hora -> kbps
+        self.max_kbps = max_mb_per_hour * 1024 * 1024 * 8 / 3600.0 / 1000 if max_mb_per_hour else None
+        self.ladder = [kbps for kbps in self.LADDER if not self.max_kbps or kbps <= self.max_kbps]
+        if not self.ladder:
+            logging.warning(f"Limite de {max_mb_per_hour} MB/h abaixo do menor bitrate. "
+                            f"Usando {self.LADDER[0]}k")
+            self.ladder = [self.LADDER[0]]
+        
+        # Passa-baixa do encoder em cada degrau, por número de canais
+        self.lowpass = {}
+        for count in {1, self.channels}:
+            table = np.array(self.ENCODER_LOWPASS[count], dtype=float).T
+            self.lowpass[count] = [min(float(np.interp(kbps, table[0], table[1])), sample_rate / 2.0)
+                                   for kbps in self.ladder]
+    
+    @classmethod
+    def for_config(cls, config):
+        """
+        Cria seletor com o perfil auto da configuração
+        
+        Args:
+            config (ConfigLoader): Configuração carregada
+        
+        Returns:
+            BitrateSelector: Seletor de bitrate
+        """
+        profile = config.get_profile_settings()
+        return cls(
+            profile['target_score'],
+            profile['max_mb_per_hour'],
+            profile['sample_rate'],
+            1 if profile['channels'] == 'mono' else 2
+        )
+    
+    def create_analyzer(self, sample_rate, channels, mono=False):
+        """
+        Análise de conteúdo com os cortes dos degraus da escada
+        
+        Args:
+            sample_rate (int): Sample rate do áudio analisado
+            channels (int): Canais do áudio analisado
+            mono (bool): Acrescentar os cortes em mono (a saída stereo
+                         pode passar a mono, ver select)
+        
+        Returns:
+            ContentAnalyzer: Análise a alimentar com o áudio processado
+        """
+        edges = list(self.lowpass[self.channels])
+        if mono and self.channels == 2:
+            edges += self.lowpass[1]
+        return ContentAnalyzer(sample_rate, channels, edges)
+    
+    def select(self, analyzer, channels=None):
+        """
+        Escolhe o bitrate para o conteúdo analisado
+        
+        Args:
+            analyzer (ContentAnalyzer): Análise completa do áudio
+                                        (criada por create_analyzer, com
+                                        mono=True se channels for 1)
+            channels (int): Canais da saída (None = os do perfil)
+        
+        Returns:
+            str: Bitrate do encoder (ex: 64k)
+        """
+        features = analyzer.features()
+        channels = channels or self.channels
+        
+        for index, kbps in enumerate(self.ladder):
+            score = self.predict(index, analyzer, features, channels)
+            if score >= self.target_score:
+                break
+        else:
+            logging.info(f"Score {self.target_score} não atingível até {kbps}k "
+                         f"(previsto: {score}). Usando {kbps}k")
+        
+        speech = features['speech_ratio']
+        logging.info(f"Conteúdo: fala {speech * 100 if speech is not None else 0:.0f}%, "
+                     f"banda {features['cutoff_hz'] / 1000:.1f} kHz, "
+                     f"correlação {features['correlation']:.2f} → {kbps}k "
+                     f"{'mono ' if channels == 1 else ''}(score previsto {score})")
+        
+        return f"{kbps}k"
+    
+    def predict(self, index, analyzer, features, channels=None):
+        """
+        Score de qualidade previsto para um degrau da escada
+        
+        Args:
+            index (int): Índice do degrau (ladder)
+            analyzer (ContentAnalyzer): Análise do áudio (histogramas de perda)
+            features (dict): Características (ContentAnalyzer.features)
+            channels (int): Canais da saída (None = os do perfil)
+        
+        Returns:
+            int: Score previsto (0-100)
+        """
+        channels = channels or self.channels
+        nyquist = self.sample_rate / 2.0
+        bandwidth = min(features['cutoff_hz'], nyquist)
+        if features['speech_ratio'] is not None and features['speech_ratio'] >= self.SPEECH_RATIO:
+            bandwidth = min(bandwidth, self.SPEECH_BANDWIDTH_HZ)
+        
+        kbps = self.ladder[index]
+        cutoff = min(bandwidth, self.lowpass[channels][index])
+        
+        # Ruído de quantização somado à energia cortada em cada frame
+        effective_channels = 1.0 if channels == 1 else 2.0 - max(0.0, features['correlation'])
+        quantization_db = self.QUANTIZATION_SNR_OFFSET + self.QUANTIZATION_SNR_SLOPE * math.log2(
+            kbps / (effective_channels * max(cutoff, 1000.0) / 1000.0))
+        
+        # Cortes em mono a seguir aos do perfil (create_analyzer com mono=True)
+        losses_db, counts = analyzer.loss_histogram(
+            index + len(self.ladder) if channels != self.channels else index)
+        if counts.sum():
+            frame_snr = -10 * np.log10(10 ** (-quantization_db / 10.0) + 10 ** (losses_db / 10.0))
+            frame_snr = np.clip(frame_snr, *SignalMetrics.SEGMENT_SNR_RANGE)
+            snr = round(float((frame_snr * counts).sum() / counts.sum()), 2)
+        else:
+            snr = round(quantization_db, 2)
+        
+        stats = {
+            'sample_rate': self.sample_rate,
+            'bitrate_kbps': kbps,
+            'channels': channels,
+            'sample_width': 16
+        }
+        signal = {
+            'cutoff_hz': cutoff,
+            'reference_cutoff_hz': bandwidth,
+            'segmental_snr_db': snr,
+            'snr_db': snr,
+            'clipped_ratio': 0.0
+        }
+        
+        return QualityAnalyzer.calculate_quality_score(stats, signal)['score']
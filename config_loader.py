@@ -4,6 +4,8 @@ Carrega e valida configurações do arquivo config.ini
 """
 
 import configparser
+import hashlib
+import json
 import os
 import logging
 from pathlib import Path
@@ -48,6 +50,35 @@ class ConfigLoader:
         """Retorna pasta de logs"""
         return self.config.get('PATHS', 'log_folder', fallback='./logs')
     
+    def get_temp_folder(self):
+        """Retorna pasta para ficheiros temporários (vazio = pasta de saída)"""
+        temp_folder = self.config.get('PATHS', 'temp_folder', fallback='').strip()
+        return temp_folder or self.get_output_folder()
+    
+    def get_recursive(self):
+        """Procurar vídeos também nas subpastas da pasta de entrada?"""
+        return self.config.getboolean('PATHS', 'recursive', fallback=False)
+    
+    def get_input_extensions(self):
+        """
+        Extensões de ficheiros aceites na pasta de entrada
+        
+        Returns:
+            tuple: Ex: ('.mp4', '.mkv'), minúsculas e com ponto
+        """
+        value = self.config.get('PATHS', 'extensions', fallback='mp4')
+        extensions = tuple(
+            f".{ext.strip().lower().lstrip('.')}"
+            for ext in value.split(',')
+            if ext.strip().lstrip('.')
+        )
+        
+        if not extensions:
+            logging.warning(f"Extensões '{value}' inválidas. Usando 'mp4'")
+            extensions = ('.mp4',)
+        
+        return extensions
+    
     # =========================================================================
     # PROCESSING
     # =========================================================================
@@ -63,11 +94,151 @@ class ConfigLoader:
         """Manter nome original do ficheiro?"""
         return self.config.getboolean('PROCESSING', 'keep_original_name', fallback=True)
     
+    def get_extraction_engine(self):
+        """Motor de extração de áudio: ffmpeg ou moviepy"""
+        engine = self.config.get('PROCESSING', 'extraction_engine', fallback='ffmpeg').lower()
+        if engine not in ('ffmpeg', 'moviepy'):
+            logging.warning(f"Motor de extração '{engine}' inválido. Usando 'ffmpeg'")
+            engine = 'ffmpeg'
+        return engine
+    
+    def get_stream_copy_enabled(self):
+        """Copiar áudio sem recodificar quando já corresponde ao perfil?"""
+        return self.config.getboolean('PROCESSING', 'stream_copy', fallback=True)
+    
+    def get_streaming_enabled(self):
+        """Processar áudio em blocos (memória limitada)?"""
+        return self.config.getboolean('PROCESSING', 'streaming', fallback=True)
+    
+    def get_pipe_enabled(self):
+        """Descodificar o vídeo diretamente para a conversão (sem WAV temporário)?"""
+        return self.config.getboolean('PROCESSING', 'pipe', fallback=False)
+    
+    def get_stream_block_seconds(self):
+        """Duração de cada bloco em modo streaming (segundos)"""
+        return max(0.1, self.config.getfloat('PROCESSING', 'block_seconds', fallback=1.0))
+    
+    def get_workers(self):
+        """Número de processos em paralelo (0 = número de CPUs)"""
+        workers = self.config.getint('PROCESSING', 'workers', fallback=0)
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        return workers
+    
+    def get_pipeline_enabled(self):
+        """Sobrepor etapas (extração, conversão, análise) de vídeos diferentes?"""
+        return self.config.getboolean('PROCESSING', 'pipeline', fallback=False)
+    
+    def get_pipeline_queue_depth(self):
+        """Vídeos em espera entre etapas no modo em etapas"""
+        return max(1, self.config.getint('PROCESSING', 'queue_depth', fallback=2))
+    
+    def get_stage_workers(self):
+        """
+        Threads de cada etapa no modo em etapas
+        
+        Returns:
+            tuple: (extração, conversão, análise), cada uma >= 1
+        """
+        workers = []
+        for option in ('extract_workers', 'convert_workers', 'analyze_workers'):
+            value = self.config.getint('PROCESSING', option, fallback=1)
+            if value < 1:
+                logging.warning(f"{option} = {value} inválido. Usando 1")
+                value = 1
+            workers.append(value)
+        return tuple(workers)
+    
+    def get_preflight_enabled(self):
+        """Validar todos os vídeos antes de começar o lote?"""
+        return self.config.getboolean('PROCESSING', 'preflight', fallback=True)
+    
+    def get_schedule(self):
+        """Ordem de processamento após a pré-validação: longest ou name"""
+        schedule = self.config.get('PROCESSING', 'schedule', fallback='longest').strip().lower()
+        if schedule not in ('longest', 'name'):
+            logging.warning(f"Ordem de processamento '{schedule}' inválida. Usando 'longest'")
+            schedule = 'longest'
+        return schedule
+    
+    def get_preflight_workers(self):
+        """Threads da pré-validação (leitura de cabeçalhos)"""
+        value = self.config.getint('PROCESSING', 'preflight_workers', fallback=8)
+        if value < 1:
+            logging.warning(f"preflight_workers = {value} inválido. Usando 1")
+            value = 1
+        return value
+    
+    # =========================================================================
+    # WATCH
+    # =========================================================================
+    def get_watch_poll_interval(self):
+        """Intervalo entre verificações da pasta no modo --watch (segundos)"""
+        return max(0.2, self.config.getfloat('WATCH', 'poll_interval', fallback=2.0))
+    
+    def get_watch_stable_seconds(self):
+        """Tempo sem alterações para considerar um vídeo copiado por completo (segundos)"""
+        return max(0.0, self.config.getfloat('WATCH', 'stable_seconds', fallback=5.0))
+    
+    # =========================================================================
+    # CACHE
+    # =========================================================================
+    def get_cache_enabled(self):
+        """Reutilizar conversões anteriores do mesmo vídeo com as mesmas configurações?"""
+        return self.config.getboolean('CACHE', 'enabled', fallback=False)
+    
+    def get_cache_folder(self):
+        """Retorna pasta da cache (vazio = subpasta da pasta de saída)"""
+        return self.config.get('CACHE', 'folder', fallback='').strip()
+    
+    def get_cache_max_size_mb(self):
+        """Tamanho máximo da cache em MB (entradas mais antigas são removidas)"""
+        return max(0.0, self.config.getfloat('CACHE', 'max_size_mb', fallback=2048.0))
+    
+    def get_cache_full_hash(self):
+        """Calcular o hash do vídeo completo (em vez de início, meio e fim)?"""
+        return self.config.getboolean('CACHE', 'full_hash', fallback=False)
+    
+    def get_output_settings(self):
+        """
+        Configurações efetivas que afetam o áudio produzido
+        
+        Usadas na chave da cache: pastas, paralelismo e logging ficam de
+        fora, pois não alteram o resultado.
+        
+        Returns:
+            dict: Valores por secção
+        """
+        settings = {
+            'profile': self.get_profile_settings(),
+            'output_format': self.get_output_format(),
+            'extraction_engine': self.get_extraction_engine(),
+            'stream_copy': self.get_stream_copy_enabled(),
+            'auto_mono': self.get_auto_mono_enabled() and self.get_mono_correlation(),
+            'resampler': f"{self.get_resampler()}:{self.get_resample_quality()}"
+        }
+        
+        for section in ('NORMALIZATION', 'SILENCE_REMOVAL', 'SEGMENT_REMOVAL', 'FILTERS'):
+            if self.config.has_section(section):
+                settings[section] = dict(self.config.items(section))
+        
+        return settings
+    
+    def get_output_fingerprint(self):
+        """
+        Hash das configurações que afetam o áudio produzido
+        
+        Returns:
+            str: Hash hexadecimal de get_output_settings()
+        """
+        data = json.dumps(self.get_output_settings(), sort_keys=True)
+        return hashlib.sha256(data.encode()).hexdigest()
+    
     # =========================================================================
     # PROFILE
     # =========================================================================
     def get_active_profile(self):
-        """Retorna perfil ativo: baixa, media, alta, custom"""
+        """Retorna perfil ativo: baixa, media, alta, custom, auto"""
         return self.config.get('PROFILE', 'active_profile', fallback='media').lower()
     
     def get_profile_settings(self):
@@ -94,6 +265,13 @@ class ConfigLoader:
                 'channels': self.config.get('PROFILE_CUSTOM', 'channels', fallback='stereo'),
                 'bitrate': self.config.get('PROFILE_CUSTOM', 'bitrate', fallback='128k'),
                 'sample_rate': self.config.getint('PROFILE_CUSTOM', 'sample_rate', fallback=44100)
+            },
+            'auto': {
+                'channels': self.config.get('PROFILE_AUTO', 'channels', fallback='stereo'),
+                'bitrate': 'auto',
+                'sample_rate': self.config.getint('PROFILE_AUTO', 'sample_rate', fallback=44100),
+                'target_score': self.get_auto_target_score(),
+                'max_mb_per_hour': self.get_auto_max_mb_per_hour()
             }
         }
         
@@ -103,6 +281,54 @@ class ConfigLoader:
         
         return profiles[profile]
     
+    def get_auto_target_score(self):
+        """Score de qualidade pretendido no perfil auto (0-100)"""
+        score = self.config.getint('PROFILE_AUTO', 'target_score', fallback=85)
+        if not 0 <= score <= 100:
+            logging.warning(f"target_score={score} fora de 0-100. Usando 85")
+            score = 85
+        return score
+    
+    def get_auto_max_mb_per_hour(self):
+        """Limite de tamanho do perfil auto em MB por hora de áudio (0 = sem limite)"""
+        return max(0.0, self.config.getfloat('PROFILE_AUTO', 'max_mb_per_hour', fallback=90.0))
+    
+    def get_auto_mono_enabled(self):
+        """Converter para mono quando os canais são praticamente iguais?"""
+        return self.config.getboolean('PROFILE', 'auto_mono', fallback=True)
+    
+    def get_mono_correlation(self):
+        """Correlação mínima entre canais para conversão automática para mono"""
+        correlation = self.config.getfloat('PROFILE', 'mono_correlation', fallback=0.99)
+        if not 0 < correlation <= 1:
+            logging.warning(f"mono_correlation={correlation} fora de ]0, 1]. Usando 0.99")
+            correlation = 0.99
+        return correlation
+    
+    def get_resampler(self):
+        """Reamostragem: numpy (filtro polifásico no grafo) ou ffmpeg"""
+        resampler = self.config.get('PROFILE', 'resampler', fallback='numpy').lower()
+        if resampler not in ('numpy', 'ffmpeg'):
+            logging.warning(f"Resampler '{resampler}' inválido. Usando 'numpy'")
+            resampler = 'numpy'
+        return resampler
+    
+    def get_resample_quality(self):
+        """Qualidade da reamostragem numpy: low, medium ou high"""
+        quality = self.config.get('PROFILE', 'resample_quality', fallback='medium').lower()
+        if quality not in ('low', 'medium', 'high'):
+            logging.warning(f"Qualidade de reamostragem '{quality}' inválida. Usando 'medium'")
+            quality = 'medium'
+        return quality
+    
+    def get_output_format(self):
+        """Formato do ficheiro de saída: mp3, m4a ou aac"""
+        output_format = self.config.get('PROFILE', 'output_format', fallback='mp3').lower()
+        if output_format not in ('mp3', 'm4a', 'aac'):
+            logging.warning(f"Formato de saída '{output_format}' inválido. Usando 'mp3'")
+            output_format = 'mp3'
+        return output_format
+    
     # =========================================================================
     # NORMALIZATION
     # =========================================================================
@@ -114,6 +340,22 @@ class ConfigLoader:
         """Nível alvo de normalização em dBFS"""
         return self.config.getfloat('NORMALIZATION', 'target_level', fallback=-12.0)
     
+    def get_normalization_method(self):
+        """Método de medição do volume: rms (dBFS) ou lufs (EBU R128)"""
+        method = self.config.get('NORMALIZATION', 'method', fallback='rms').lower()
+        if method not in ('rms', 'lufs'):
+            logging.warning(f"Método de normalização '{method}' inválido. Usando 'rms'")
+            method = 'rms'
+        return method
+    
+    def get_normalization_target_lufs(self):
+        """Loudness alvo em LUFS"""
+        return self.config.getfloat('NORMALIZATION', 'target_lufs', fallback=-16.0)
+    
+    def get_true_peak_limit(self):
+        """Pico real máximo após normalização em dBTP"""
+        return self.config.getfloat('NORMALIZATION', 'true_peak_limit', fallback=-1.0)
+    
     # =========================================================================
     # SILENCE_REMOVAL
     # =========================================================================
@@ -129,6 +371,22 @@ class ConfigLoader:
         """Duração mínima de silêncio em segundos"""
         return self.config.getfloat('SILENCE_REMOVAL', 'min_silence_duration', fallback=1.0)
     
+    def get_silence_mode(self):
+        """Modo de remoção: edges (início/fim) ou internal (também pausas internas)"""
+        mode = self.config.get('SILENCE_REMOVAL', 'mode', fallback='edges').lower()
+        if mode not in ('edges', 'internal'):
+            logging.warning(f"Modo de remoção de silêncios '{mode}' inválido. Usando 'edges'")
+            mode = 'edges'
+        return mode
+    
+    def get_silence_max_gap(self):
+        """Duração máxima de uma pausa interna após redução (segundos)"""
+        return max(0.0, self.config.getfloat('SILENCE_REMOVAL', 'max_gap', fallback=0.5))
+    
+    def get_silence_crossfade(self):
+        """Duração do crossfade nas junções de pausas reduzidas (ms)"""
+        return max(0.0, self.config.getfloat('SILENCE_REMOVAL', 'crossfade', fallback=10.0))
+    
     # =========================================================================
     # SEGMENT_REMOVAL
     # =========================================================================
@@ -163,6 +421,22 @@ class ConfigLoader:
         """Frequência do filtro passa-baixa"""
         return self.config.getint('FILTERS', 'lowpass_freq', fallback=8000)
     
+    def get_filter_engine(self):
+        """Motor dos filtros passa-alta/passa-baixa: numpy ou pydub"""
+        engine = self.config.get('FILTERS', 'filter_engine', fallback='numpy').lower()
+        if engine not in ('numpy', 'pydub'):
+            logging.warning(f"Motor de filtros '{engine}' inválido. Usando 'numpy'")
+            engine = 'numpy'
+        return engine
+    
+    def get_filter_order(self):
+        """Ordem dos filtros (1 = RC igual ao pydub, 2-8 = Butterworth)"""
+        order = self.config.getint('FILTERS', 'filter_order', fallback=1)
+        if not 1 <= order <= 8:
+            logging.warning(f"Ordem de filtro {order} inválida. Usando 1")
+            order = 1
+        return order
+    
     def get_compression_enabled(self):
         """Compressão dinâmica ativada?"""
         return self.config.getboolean('FILTERS', 'compression', fallback=False)
@@ -175,6 +449,26 @@ class ConfigLoader:
         """Rácio de compressão"""
         return self.config.getfloat('FILTERS', 'compression_ratio', fallback=4)
     
+    def get_compression_attack(self):
+        """Tempo de ataque da compressão em ms"""
+        return self.config.getfloat('FILTERS', 'compression_attack', fallback=5.0)
+    
+    def get_compression_release(self):
+        """Tempo de libertação da compressão em ms"""
+        return self.config.getfloat('FILTERS', 'compression_release', fallback=50.0)
+    
+    def get_compression_knee(self):
+        """Largura do joelho suave da compressão em dB (0 = joelho duro)"""
+        return self.config.getfloat('FILTERS', 'compression_knee', fallback=0.0)
+    
+    def get_compression_makeup(self):
+        """Ganho de compensação após compressão em dB"""
+        return self.config.getfloat('FILTERS', 'compression_makeup', fallback=0.0)
+    
+    def get_compression_lookahead(self):
+        """Antecipação do detetor de nível em ms"""
+        return self.config.getfloat('FILTERS', 'compression_lookahead', fallback=0.0)
+    
     # =========================================================================
     # QUALITY_ANALYSIS
     # =========================================================================
@@ -186,6 +480,29 @@ class ConfigLoader:
         """Mostrar estatísticas detalhadas?"""
         return self.config.getboolean('QUALITY_ANALYSIS', 'detailed_stats', fallback=True)
     
+    def get_signal_metrics_enabled(self):
+        """
+        Comparar o sinal processado com o ficheiro final (SNR, largura de banda, saturação)?
+        
+        Sempre ativado no perfil auto: o bitrate é escolhido pelo score
+        previsto com estas métricas, e o score final tem de ser comparável.
+        """
+        if self.get_active_profile() == 'auto':
+            return True
+        return self.config.getboolean('QUALITY_ANALYSIS', 'signal_metrics', fallback=False)
+    
+    def get_metric_windows(self):
+        """Janelas comparadas por ficheiro nas métricas de sinal (0 = todas)"""
+        value = self.config.getint('QUALITY_ANALYSIS', 'metric_windows', fallback=8)
+        if value < 0:
+            logging.warning(f"metric_windows = {value} inválido. Usando 0 (todas)")
+            value = 0
+        return value
+    
+    def get_metric_window_seconds(self):
+        """Duração de cada janela das métricas de sinal (segundos)"""
+        return max(0.1, self.config.getfloat('QUALITY_ANALYSIS', 'metric_window_seconds', fallback=2.0))
+    
     # =========================================================================
     # LOGGING
     # =========================================================================
@@ -197,6 +514,18 @@ class ConfigLoader:
         """Nome do arquivo de log"""
         return self.config.get('LOGGING', 'log_file', fallback='video_to_audio.log')
     
+    def get_journal_file(self):
+        """Retorna nome do diário de trabalhos (na pasta de logs)"""
+        return self.config.get('LOGGING', 'journal_file', fallback='jobs_journal.jsonl')
+    
+    def get_probe_cache_file(self):
+        """Retorna nome da cache de metadados dos vídeos (na pasta de logs; vazio = sem cache)"""
+        return self.config.get('LOGGING', 'probe_cache_file', fallback='probe_cache.sqlite').strip()
+    
+    def get_throughput_file(self):
+        """Retorna nome do histórico de velocidade de conversão (na pasta de logs; vazio = sem histórico)"""
+        return self.config.get('LOGGING', 'throughput_file', fallback='throughput.json').strip()
+    
     def get_log_with_timestamp(self):
         """Incluir timestamp no nome do log?"""
         return self.config.getboolean('LOGGING', 'log_with_timestamp', fallback=True)
@@ -212,23 +541,44 @@ class ConfigLoader:
         print("CONFIGURAÇÕES ATIVAS".center(70))
         print("="*70)
         print(f"\n📂 PASTAS:")
-        print(f"   Entrada:  {self.get_input_folder()}")
+        print(f"   Entrada:  {self.get_input_folder()} "
+              f"({', '.join(self.get_input_extensions())}{', com subpastas' if self.get_recursive() else ''})")
         print(f"   Saída:    {self.get_output_folder()}")
         print(f"   Logs:     {self.get_log_folder()}")
+        print(f"   Temp:     {self.get_temp_folder()}")
         
         print(f"\n🎵 PERFIL DE CONVERSÃO: {self.get_active_profile().upper()}")
         print(f"   Canais:        {profile['channels']}")
-        print(f"   Bitrate:       {profile['bitrate']}")
+        if profile['bitrate'] == 'auto':
+            limit = f", máx. {profile['max_mb_per_hour']:g} MB/h" if profile['max_mb_per_hour'] else ""
+            print(f"   Bitrate:       auto (score ≥ {profile['target_score']}{limit})")
+        else:
+            print(f"   Bitrate:       {profile['bitrate']}")
         print(f"   Sample Rate:   {profile['sample_rate']} Hz")
+        resampler = self.get_resampler()
+        if resampler == 'numpy':
+            resampler = f"numpy ({self.get_resample_quality()})"
+        print(f"   Reamostragem:  {resampler}")
+        if profile['channels'] == 'stereo' and self.get_auto_mono_enabled():
+            print(f"   Mono auto:     canais com correlação ≥ {self.get_mono_correlation()}")
+        print(f"   Formato:       {self.get_output_format()}")
         
         print(f"\n🔊 NORMALIZAÇÃO: {'✓ Ativada' if self.get_normalization_enabled() else '✗ Desativada'}")
         if self.get_normalization_enabled():
-            print(f"   Nível alvo:    {self.get_normalization_target()} dBFS")
+            if self.get_normalization_method() == 'lufs':
+                print(f"   Nível alvo:    {self.get_normalization_target_lufs()} LUFS")
+            else:
+                print(f"   Nível alvo:    {self.get_normalization_target()} dBFS")
+            print(f"   Pico máximo:   {self.get_true_peak_limit()} dBTP")
         
         print(f"\n🔇 REMOÇÃO DE SILÊNCIOS: {'✓ Ativada' if self.get_silence_removal_enabled() else '✗ Desativada'}")
         if self.get_silence_removal_enabled():
             print(f"   Limiar:        {self.get_silence_threshold()} dBFS")
             print(f"   Duração mín:   {self.get_silence_min_duration()}s")
+            print(f"   Modo:          {self.get_silence_mode()}")
+            if self.get_silence_mode() == 'internal':
+                print(f"   Pausa máx:     {self.get_silence_max_gap()}s")
+                print(f"   Crossfade:     {self.get_silence_crossfade()} ms")
         
         print(f"\n✂️  REMOÇÃO DE SEGMENTOS: {'✓ Ativada' if self.get_segment_removal_enabled() else '✗ Desativada'}")
         if self.get_segment_removal_enabled():
@@ -236,10 +586,11 @@ class ConfigLoader:
             print(f"   Fim:           {self.get_remove_end()}s")
         
         filters_active = []
+        order = f", ordem {self.get_filter_order()}" if self.get_filter_order() > 1 else ""
         if self.get_highpass_filter_enabled():
-            filters_active.append(f"Passa-alta ({self.get_highpass_freq()}Hz)")
+            filters_active.append(f"Passa-alta ({self.get_highpass_freq()}Hz{order})")
         if self.get_lowpass_filter_enabled():
-            filters_active.append(f"Passa-baixa ({self.get_lowpass_freq()}Hz)")
+            filters_active.append(f"Passa-baixa ({self.get_lowpass_freq()}Hz{order})")
         if self.get_compression_enabled():
             filters_active.append(f"Compressão ({self.get_compression_ratio()}:1)")
         
@@ -249,5 +600,25 @@ class ConfigLoader:
         print(f"\n⚙️  PROCESSAMENTO:")
         print(f"   Processar todos: {'✓ Sim' if self.get_process_all() else '✗ Não (apenas primeiro)'}")
         print(f"   Sobrescrever:    {'✓ Sim' if self.get_overwrite() else '✗ Não (criar versões)'}")
+        if self.get_pipeline_enabled():
+            extract, convert, analyze = self.get_stage_workers()
+            print(f"   Etapas:          extração={extract}, conversão={convert}, análise={analyze} "
+                  f"(fila {self.get_pipeline_queue_depth()})")
+        else:
+            print(f"   Processos:       {self.get_workers()}")
+        if self.get_preflight_enabled():
+            order = 'mais longos primeiro' if self.get_schedule() == 'longest' else 'alfabética'
+            print(f"   Pré-validação:   ✓ Sim (ordem {order})")
+        else:
+            print(f"   Pré-validação:   ✗ Não")
+        print(f"   Extração:        {self.get_extraction_engine()}")
+        print(f"   Cópia direta:    {'✓ Sim' if self.get_stream_copy_enabled() else '✗ Não'}")
+        print(f"   Streaming:       {'✓ Sim' if self.get_streaming_enabled() else '✗ Não (áudio completo em memória)'}")
+        print(f"   Pipe:            {'✓ Sim (sem WAV temporário)' if self.get_pipe_enabled() else '✗ Não'}")
+        
+        if self.get_cache_enabled():
+            print(f"\n♻️  CACHE: ✓ Ativada (máx. {self.get_cache_max_size_mb():.0f} MB)")
+        else:
+            print(f"\n♻️  CACHE: ✗ Desativada")
         
         print("\n" + "="*70 + "\n")
@@ -0,0 +1,314 @@
+"""
+conversion_cache.py
+Cache de conversões endereçada pelo conteúdo do vídeo e pelas configurações
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+
+# Incrementar quando o processamento mudar de forma a invalidar resultados antigos
+CACHE_VERSION = 1
+
+# Bytes lidos de cada zona do vídeo (início, meio, fim) no hash parcial
+SAMPLE_BYTES = 1024 * 1024
+
+# Fração de max_size_mb que fica ocupada após uma limpeza: a folga evita
+# percorrer o índice de novo a cada conversão com a cache cheia
+EVICT_TARGET = 0.9
+
+
+class ConversionCache:
+    """
+    Guarda uma ligação (hard link) para cada áudio convertido
+    
+    A chave combina um hash do conteúdo do vídeo com um hash das
+    configurações que afetam o resultado. O índice é uma pasta com um
+    ficheiro JSON por entrada, escrito de forma atómica, o que permite
+    o acesso simultâneo de várias threads e processos sem bloqueios.
+    """
+    
+    # Subpasta criada dentro da pasta de saída (quando não configurada)
+    ROOT_NAME = '_cache_conversor'
+    
+    def __init__(self, config, enabled=True):
+        """
+        Args:
+            config (ConfigLoader): Configuração carregada
+            enabled (bool): False para ignorar a cache (--no-cache)
+        """
+        self.config = config
+        self.enabled = enabled and config.get_cache_enabled()
+        self.root = config.get_cache_folder() or os.path.join(config.get_output_folder(), self.ROOT_NAME)
+        self.objects = os.path.join(self.root, 'objects')
+        self.index = os.path.join(self.root, 'index')
+        self.max_bytes = int(config.get_cache_max_size_mb() * 1024 * 1024)
+        self.full_hash = config.get_cache_full_hash()
+        self.settings_hash = hashlib.sha256(f"{CACHE_VERSION}:{config.get_output_fingerprint()}".encode()).hexdigest()
+        
+        # Tamanho total conhecido (None = ainda não medido); inclui apenas o
+        # que este processo guardou desde a última medição
+        self._size = None
+    
+    def setup(self):
+        """Cria pastas da cache"""
+        if not self.enabled:
+            logging.info("Cache de conversões desativada")
+            return
+        
+        Path(self.objects).mkdir(parents=True, exist_ok=True)
+        Path(self.index).mkdir(parents=True, exist_ok=True)
+        logging.info(f"Cache de conversões: {self.root}")
+    
+    def key_for(self, video_path):
+        """
+        Calcula a chave de um vídeo com as configurações atuais
+        
+        Args:
+            video_path (str): Caminho do vídeo
+        
+        Returns:
+            str: Chave hexadecimal ou None se a cache estiver desativada
+        """
+        if not self.enabled:
+            return None
+        
+        try:
+            content = self._hash_content(video_path)
+        except OSError as e:
+            logging.warning(f"Cache: não foi possível ler {video_path}: {e}")
+            return None
+        
+        return hashlib.sha256(f"{content}:{self.settings_hash}".encode()).hexdigest()
+    
+    def restore(self, key, existing_path, new_path):
+        """
+        Reutiliza uma conversão anterior, se existir
+        
+        Se existing_path já tiver o áudio guardado, nada é escrito; caso
+        contrário o áudio guardado é ligado num novo ficheiro de saída.
+        
+        Args:
+            key (str): Chave devolvida por key_for
+            existing_path (str): Saída habitual do vídeo (sem numeração)
+            new_path (callable): Função sem argumentos que gera o caminho
+                                 de saída (só chamada se for preciso
+                                 escrever um novo ficheiro)
+        
+        Returns:
+            tuple: (caminho do áudio, True se foi escrito um novo ficheiro)
+                   ou (None, False) se não houver entrada válida
+        """
+        if not key:
+            return None, False
+        
+        entry = self._read_entry(key)
+        if entry is None:
+            return None, False
+        
+        obj_path = os.path.join(self.objects, entry['object'])
+        if not os.path.exists(obj_path):
+            self._remove(key, entry)
+            return None, False
+        
+        entry['last_used'] = time.time()
+        
+        # Saída anterior intacta: o vídeo já está convertido
+        if os.path.exists(existing_path) and _same_file(existing_path, obj_path):
+            self._write_entry(key, entry)
+            logging.info(f"Cache: {os.path.basename(existing_path)} já convertido")
+            return existing_path, False
+        
+        target = new_path()
+        try:
+            # Ficheiro temporário + rename: nunca fica um áudio incompleto
+            temp_path = f"{target}.{uuid.uuid4().hex[:8]}.tmp"
+            _link_or_copy(obj_path, temp_path)
+            os.replace(temp_path, target)
+        except OSError as e:
+            logging.warning(f"Cache: não foi possível reutilizar {entry['object']}: {e}")
+            return None, False
+        
+        self._write_entry(key, entry)
+        logging.info(f"Cache: {os.path.basename(target)} reutilizado de conversão anterior")
+        return target, True
+    
+    def store(self, key, output_path, source_path=None):
+        """
+        Regista uma conversão concluída e aplica o limite de tamanho
+        
+        O índice só é percorrido na primeira vez e quando o total acumulado
+        passa max_size_mb; os restantes registos custam O(1).
+        
+        Args:
+            key (str): Chave devolvida por key_for
+            output_path (str): Áudio convertido
+            source_path (str): Vídeo de origem (apenas informativo)
+        """
+        if not key or not os.path.exists(output_path):
+            return
+        
+        obj_name = f"{key}{Path(output_path).suffix}"
+        obj_path = os.path.join(self.objects, obj_name)
+        
+        created = False
+        try:
+            if not os.path.exists(obj_path):
+                temp_path = f"{obj_path}.{uuid.uuid4().hex[:8]}.tmp"
+                _link_or_copy(output_path, temp_path)
+                os.replace(temp_path, obj_path)
+                created = True
+            size = os.path.getsize(obj_path)
+        except OSError as e:
+            logging.warning(f"Cache: não foi possível guardar {output_path}: {e}")
+            return
+        
+        now = time.time()
+        self._write_entry(key, {
+            'object': obj_name,
+            'source': os.path.basename(source_path) if source_path else None,
+            'size': size,
+            'created': now,
+            'last_used': now
+        })
+        logging.debug(f"Cache: {os.path.basename(output_path)} guardado ({key[:12]})")
+        
+        if self._size is not None and created:
+            self._size += size
+        if self._size is None or self._size > self.max_bytes:
+            self.evict()
+    
+    def evict(self):
+        """
+        Remove as entradas usadas há mais tempo se a cache passar max_size_mb
+        
+        A limpeza continua até EVICT_TARGET do limite.
+        
+        Returns:
+            int: Número de entradas removidas
+        """
+        entries = []
+        for entry_file in os.scandir(self.index):
+            if not entry_file.name.endswith('.json'):
+                continue
+            key = entry_file.name[:-5]
+            entry = self._read_entry(key)
+            if entry is not None:
+                entries.append((entry.get('last_used', 0), key, entry))
+        
+        total = sum(entry.get('size', 0) for _, _, entry in entries)
+        target = self.max_bytes * EVICT_TARGET if total > self.max_bytes else total
+        removed = 0
+        
+        for _, key, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= target:
+                break
+            self._remove(key, entry)
+            total -= entry.get('size', 0)
+            removed += 1
+        
+        self._size = total
+        
+        if removed:
+            logging.info(f"Cache: {removed} entrada(s) antiga(s) removida(s)")
+        
+        return removed
+    
+    def _hash_content(self, video_path):
+        """
+        Hash do conteúdo do vídeo
+        
+        Por omissão lê apenas o tamanho e três amostras (início, meio e fim),
+        suficiente para reconhecer o mesmo ficheiro copiado de novo para a
+        pasta de entrada; full_hash lê o ficheiro completo.
+        
+        Args:
+            video_path (str): Caminho do vídeo
+        
+        Returns:
+            str: Hash hexadecimal
+        """
+        size = os.path.getsize(video_path)
+        digest = hashlib.sha256(str(size).encode())
+        
+        with open(video_path, 'rb') as f:
+            if self.full_hash or size <= 3 * SAMPLE_BYTES:
+                for chunk in iter(lambda: f.read(SAMPLE_BYTES), b''):
+                    digest.update(chunk)
+            else:
+                for offset in (0, (size - SAMPLE_BYTES) // 2, size - SAMPLE_BYTES):
+                    f.seek(offset)
+                    digest.update(f.read(SAMPLE_BYTES))
+        
+        return digest.hexdigest()
+    
+    def _entry_path(self, key):
+        return os.path.join(self.index, f"{key}.json")
+    
+    def _read_entry(self, key):
+        """Lê uma entrada do índice (None se não existir ou estiver corrompida)"""
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_entry(self, key, entry):
+        """Escreve uma entrada do índice (ficheiro temporário + rename)"""
+        path = self._entry_path(key)
+        temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning(f"Cache: não foi possível atualizar o índice: {e}")
+    
+    def _remove(self, key, entry):
+        """Remove entrada e áudio guardado (a saída do utilizador mantém-se)"""
+        for path in (self._entry_path(key), os.path.join(self.objects, entry.get('object', ''))):
+            try:
+                if os.path.isfile(path):
+                    os.remove(path)
+            except OSError as e:
+                logging.warning(f"Cache: não foi possível remover {path}: {e}")
+
+
+def _same_file(path_a, path_b):
+    """Verifica se dois caminhos são o mesmo ficheiro (hard link) ou têm o mesmo conteúdo"""
+    try:
+        if os.path.samefile(path_a, path_b):
+            return True
+        return os.path.getsize(path_a) == os.path.getsize(path_b) and _file_digest(path_a) == _file_digest(path_b)
+    except OSError:
+        return False
+
+
+def _file_digest(path):
+    """Hash completo de um ficheiro"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(SAMPLE_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link_or_copy(source, target):
+    """
+    Cria hard link; copia se o sistema de ficheiros não o permitir
+    
+    Args:
+        source (str): Ficheiro existente
+        target (str): Novo caminho
+    """
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
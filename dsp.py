@@ -0,0 +1,1095 @@
+"""
+dsp.py
+Processamento digital de sinal vetorizado com NumPy
+"""
+
+import math
+
+import numpy as np
+
+
+# Limite de |p|^-n nas somas acumuladas (e^10), garante precisão em float64
+_SCAN_LOG_RANGE = 10.0
+
+
+def iir_scan(u, p, y0):
+    """
+    Resolve a recorrência de 1ª ordem y[n] = p * y[n-1] + u[n] sem ciclos Python
+    
+    O sinal é dividido em sub-blocos onde a solução fechada
+    y[n] = p^n * (p * y0 + soma(u[k] / p^k)) é numericamente estável;
+    o estado entre sub-blocos resolve-se com a mesma recorrência (p^S),
+    aplicada recursivamente.
+    
+    Args:
+        u (numpy.ndarray): Entrada (frames, canais), real ou complexa
+        p (complex): Polo (|p| < 1)
+        y0 (numpy.ndarray): Última saída do bloco anterior (canais,)
+    
+    Returns:
+        tuple: (saída (frames, canais), última saída (canais,))
+    """
+    n = u.shape[0]
+    dtype = np.result_type(u, p, y0)
+    y0 = np.asarray(y0, dtype=dtype)
+    
+    if n == 0:
+        return np.zeros(u.shape, dtype=dtype), y0
+    
+    magnitude = abs(p)
+    
+    if magnitude < 1e-300:
+        y = u.astype(dtype, copy=True)
+        return y, y[-1]
+    
+    span = int(_SCAN_LOG_RANGE / -math.log(magnitude)) if magnitude < 1 else n
+    span = max(1, min(span, n))
+    
+    # Polo muito pequeno: a memória do filtro dura poucas amostras
+    if span == 1:
+        y = u.astype(dtype, copy=True)
+        power = p
+        lag = 1
+        while abs(power) > 1e-17 and lag <= n:
+            y[lag:] += power * u[:n - lag]
+            y[lag - 1] += power * y0
+            power *= p
+            lag += 1
+        return y, y[-1]
+    
+    powers = (p ** np.arange(span, dtype=np.float64)).astype(dtype)[:, None]
+    
+    # Sub-bloco único: solução fechada direta
+    if span == n:
+        y = powers * (p * y0 + np.cumsum(u / powers, axis=0))
+        return y, y[-1]
+    
+    blocks = -(-n // span)
+    padded = np.zeros((blocks * span,) + u.shape[1:], dtype=dtype)
+    padded[:n] = u
+    padded = padded.reshape((blocks, span) + u.shape[1:])
+    
+    # Resposta de cada sub-bloco com estado inicial nulo
+    zero_state = powers * np.cumsum(padded / powers, axis=1)
+    
+    # Estado à entrada de cada sub-bloco
+    carries, _ = iir_scan(zero_state[:, -1], p ** span, y0)
+    previous = np.concatenate([y0[None], carries[:-1]])
+    
+    y = zero_state + (p * powers)[None] * previous[:, None]
+    y = y.reshape((blocks * span,) + u.shape[1:])[:n]
+    
+    return y, y[-1]
+
+
+class IIRFilter:
+    """Cascata de secções IIR de 1ª/2ª ordem com estado entre blocos"""
+    
+    def __init__(self, sections, channels, match_first_sample=False):
+        """
+        Args:
+            sections (list): Coeficientes (b, a) por secção, a[0] = 1,
+                             com 2 (1ª ordem) ou 3 (2ª ordem) termos
+            channels (int): Número de canais
+            match_first_sample (bool): Primeira saída igual à primeira
+                             amostra (comportamento dos filtros do pydub)
+        """
+        self.channels = channels
+        self.match_first_sample = match_first_sample
+        self.sections = []
+        
+        for b, a in sections:
+            b = np.asarray(b, dtype=np.float64)
+            a = np.asarray(a, dtype=np.float64)
+            poles = np.roots(a) if len(a) > 1 else np.array([])
+            
+            # Par de polos conjugados: 1/((1-p/z)(1-p*/z)) = 2*Re(r/(1-p/z)),
+            # com r = p/(p-p*); uma única recorrência em vez de duas
+            residue = None
+            if len(poles) == 2 and np.iscomplexobj(poles) and poles[0].imag != 0:
+                residue = poles[0] / (poles[0] - np.conj(poles[0]))
+                poles = poles[:1]
+            
+            self.sections.append({
+                'b': b,
+                'poles': poles,
+                'residue': residue,
+                'x_history': np.zeros((len(b) - 1, channels)),
+                'y_state': [np.zeros(channels, dtype=poles.dtype) for _ in poles]
+            })
+        
+        self._first_block = True
+    
+    def process(self, block):
+        """
+        Filtra um bloco continuando o estado do bloco anterior
+        
+        Args:
+            block (numpy.ndarray): Bloco (frames, canais)
+        
+        Returns:
+            numpy.ndarray: Bloco filtrado float32
+        """
+        signal = block.astype(np.float64)
+        
+        if signal.shape[0] == 0:
+            return block.astype(np.float32)
+        
+        if self._first_block and self.match_first_sample:
+            self._prime_first_sample(signal[0])
+        self._first_block = False
+        
+        for section in self.sections:
+            signal = self._process_section(section, signal)
+        
+        return signal.astype(np.float32)
+    
+    def _process_section(self, section, x):
+        """Aplica uma secção: parte FIR (numerador) seguida dos polos"""
+        b = section['b']
+        history = section['x_history']
+        order = len(b) - 1
+        
+        # u[n] = b0*x[n] + b1*x[n-1] + b2*x[n-2]
+        extended = np.concatenate([history, x]) if order else x
+        u = b[0] * x
+        for k in range(1, order + 1):
+            u = u + b[k] * extended[order - k:order - k + x.shape[0]]
+        
+        if order:
+            section['x_history'] = extended[-order:].copy()
+        
+        if section['residue'] is not None:
+            y, section['y_state'][0] = iir_scan(u, section['poles'][0], section['y_state'][0])
+            return 2 * np.real(section['residue'] * y)
+        
+        # Polos reais: uma recorrência de 1ª ordem por polo
+        y = u
+        for index, pole in enumerate(section['poles']):
+            y, section['y_state'][index] = iir_scan(y, pole, section['y_state'][index])
+        
+        return y
+    
+    def _prime_first_sample(self, x0):
+        """
+        Define estado inicial para que y[0] = x[0] (secções de 1ª ordem)
+        
+        Args:
+            x0 (numpy.ndarray): Primeira amostra de cada canal
+        """
+        for section in self.sections:
+            if len(section['poles']) != 1:
+                continue
+            
+            b = section['b']
+            pole = section['poles'][0]
+            section['x_history'][:] = x0
+            
+            # x0 = p*y[-1] + (b0 + b1)*x0
+            section['y_state'][0] = ((1 - b.sum()) * x0 / pole).astype(section['poles'].dtype)
+
+
+# =============================================================================
+# PROJETO DE FILTROS
+# =============================================================================
+def rc_lowpass(cutoff, sample_rate):
+    """
+    Passa-baixa RC de 1ª ordem (mesma equação do low_pass_filter do pydub)
+    
+    Returns:
+        list: Secções (b, a)
+    """
+    rc = 1.0 / (cutoff * 2 * math.pi)
+    dt = 1.0 / sample_rate
+    alpha = dt / (rc + dt)
+    
+    # y[n] = (1 - alpha) * y[n-1] + alpha * x[n]
+    return [([alpha, 0.0], [1.0, alpha - 1.0])]
+
+
+def rc_highpass(cutoff, sample_rate):
+    """
+    Passa-alta RC de 1ª ordem (mesma equação do high_pass_filter do pydub)
+    
+    Returns:
+        list: Secções (b, a)
+    """
+    rc = 1.0 / (cutoff * 2 * math.pi)
+    dt = 1.0 / sample_rate
+    alpha = rc / (rc + dt)
+    
+    # y[n] = alpha * (y[n-1] + x[n] - x[n-1])
+    return [([alpha, -alpha], [1.0, -alpha])]
+
+
+def butterworth(kind, cutoff, sample_rate, order):
+    """
+    Butterworth digital (transformação bilinear) em secções de 2ª ordem
+    
+    Args:
+        kind (str): 'lowpass' ou 'highpass'
+        cutoff (float): Frequência de corte (-3dB) em Hz
+        sample_rate (int): Sample rate
+        order (int): Ordem do filtro
+    
+    Returns:
+        list: Secções (b, a)
+    """
+    w0 = 2 * math.pi * cutoff / sample_rate
+    cos_w0 = math.cos(w0)
+    sections = []
+    
+    # Secção de 1ª ordem para ordens ímpares
+    if order % 2:
+        k = math.tan(w0 / 2)
+        a1 = (k - 1) / (k + 1)
+        if kind == 'lowpass':
+            sections.append(([k / (1 + k), k / (1 + k)], [1.0, a1]))
+        else:
+            sections.append(([1 / (1 + k), -1 / (1 + k)], [1.0, a1]))
+    
+    # Biquads (RBJ) com o Q de cada par de polos
+    for index in range(1, order // 2 + 1):
+        q = 1.0 / (2 * math.sin((2 * index - 1) * math.pi / (2 * order)))
+        alpha = math.sin(w0) / (2 * q)
+        a0 = 1 + alpha
+        
+        if kind == 'lowpass':
+            b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+        else:
+            b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        
+        a = [1.0, -2 * cos_w0 / a0, (1 - alpha) / a0]
+        sections.append(([coef / a0 for coef in b], a))
+    
+    return sections
+
+
+def design_filter(kind, cutoff, sample_rate, channels, order=1):
+    """
+    Cria filtro passa-alta ou passa-baixa
+    
+    Ordem 1 reproduz os filtros RC do pydub; ordens superiores usam
+    Butterworth.
+    
+    Args:
+        kind (str): 'lowpass' ou 'highpass'
+        cutoff (float): Frequência de corte em Hz
+        sample_rate (int): Sample rate
+        channels (int): Número de canais
+        order (int): Ordem do filtro
+    
+    Returns:
+        IIRFilter: Filtro pronto a processar blocos
+    """
+    if order <= 1:
+        design = rc_lowpass if kind == 'lowpass' else rc_highpass
+        return IIRFilter(design(cutoff, sample_rate), channels, match_first_sample=True)
+    
+    if cutoff >= sample_rate / 2:
+        raise ValueError(f"Frequência de corte {cutoff}Hz acima de Nyquist ({sample_rate / 2:.0f}Hz)")
+    
+    return IIRFilter(butterworth(kind, cutoff, sample_rate, order), channels)
+
+
+# =============================================================================
+# COMPRESSÃO DINÂMICA
+# =============================================================================
+class Compressor:
+    """Compressor de dinâmica com knee, attack/release, makeup e lookahead"""
+    
+    # Resolução do detetor de nível (ms)
+    HOP_MS = 1.0
+    
+    def __init__(self, sample_rate, channels, threshold=-20.0, ratio=4.0,
+                 attack_ms=5.0, release_ms=50.0, knee_db=0.0, makeup_db=0.0,
+                 lookahead_ms=0.0):
+        """
+        Args:
+            sample_rate (int): Sample rate
+            channels (int): Número de canais (detetor ligado entre canais)
+            threshold (float): Limiar em dBFS
+            ratio (float): Rácio de compressão (ex: 4 = 4:1)
+            attack_ms (float): Tempo de ataque
+            release_ms (float): Tempo de libertação
+            knee_db (float): Largura do joelho suave (0 = joelho duro)
+            makeup_db (float): Ganho de compensação
+            lookahead_ms (float): Antecipação do detetor (atrasa o áudio)
+        """
+        self.threshold = threshold
+        self.slope = 1.0 / max(ratio, 1.0) - 1.0
+        self.knee = max(knee_db, 0.0)
+        self.makeup = makeup_db
+        
+        self.hop = max(1, int(round(sample_rate * self.HOP_MS / 1000)))
+        hop_ms = self.hop * 1000.0 / sample_rate
+        self.attack_coef = math.exp(-hop_ms / attack_ms) if attack_ms > 0 else 0.0
+        self.release_coef = math.exp(-hop_ms / release_ms) if release_ms > 0 else 0.0
+        
+        self.lookahead = int(round(lookahead_ms * sample_rate / 1000))
+        
+        # Estado entre blocos
+        self._pending = np.zeros((0, channels), dtype=np.float32)
+        self._delay = np.zeros((self.lookahead, channels), dtype=np.float32)
+        self._skip = self.lookahead
+        self._reduction_db = 0.0
+        self._last_gain = 10 ** (makeup_db / 20.0)
+        self._frames_in = 0
+        self._frames_out = 0
+    
+    def process(self, block):
+        """
+        Comprime um bloco
+        
+        Apenas janelas completas do detetor são processadas; o resto fica
+        pendente para o bloco seguinte, pelo que o tamanho da saída pode
+        diferir do da entrada (o total coincide após flush).
+        
+        Args:
+            block (numpy.ndarray): Bloco (frames, canais)
+        
+        Returns:
+            numpy.ndarray: Bloco comprimido float32
+        """
+        self._frames_in += block.shape[0]
+        return self._process(block)
+    
+    def flush(self):
+        """
+        Devolve as amostras retidas (janela incompleta e lookahead)
+        
+        Returns:
+            numpy.ndarray: Últimas amostras comprimidas
+        """
+        remaining = self._frames_in - self._frames_out
+        padding = np.zeros((self.lookahead + self.hop, self._delay.shape[1]), dtype=np.float32)
+        return self._process(padding)[:remaining]
+    
+    def _process(self, block):
+        """Processa janelas completas e aplica ganho ao áudio atrasado"""
+        data = np.concatenate([self._pending, block.astype(np.float32, copy=False)])
+        usable = (data.shape[0] // self.hop) * self.hop
+        self._pending = data[usable:]
+        
+        if usable == 0:
+            return np.zeros((0, data.shape[1]), dtype=np.float32)
+        
+        current = data[:usable]
+        gains = self._gain_curve(current)
+        
+        # Lookahead: ganho atual aplicado ao áudio de há N amostras
+        delayed = np.concatenate([self._delay, current])
+        audio = delayed[:usable]
+        self._delay = delayed[usable:]
+        
+        output = audio * gains[:, None]
+        
+        if self._skip:
+            cut = min(self._skip, output.shape[0])
+            output = output[cut:]
+            self._skip -= cut
+        
+        self._frames_out += output.shape[0]
+        return output
+    
+    def _gain_curve(self, samples):
+        """
+        Calcula ganho linear por amostra
+        
+        Args:
+            samples (numpy.ndarray): Amostras (múltiplo de hop frames)
+        
+        Returns:
+            numpy.ndarray: Ganho por amostra
+        """
+        frames = samples.reshape(-1, self.hop * samples.shape[1])
+        mean_square = np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / frames.shape[1]
+        level_db = 10 * np.log10(np.maximum(mean_square, 1e-20))
+        
+        # Curva estática com joelho suave
+        over = level_db - self.threshold
+        target = np.where(over > 0, self.slope * over, 0.0)
+        if self.knee > 0:
+            in_knee = np.abs(over) <= self.knee / 2
+            knee_curve = self.slope * (over + self.knee / 2) ** 2 / (2 * self.knee)
+            target = np.where(in_knee, knee_curve, target)
+        
+        # Seguidor de envolvente (uma iteração por janela de 1ms)
+        smoothed = np.empty_like(target)
+        reduction = self._reduction_db
+        attack, release = self.attack_coef, self.release_coef
+        
+        for index, value in enumerate(target.tolist()):
+            coef = attack if value < reduction else release
+            reduction = value + coef * (reduction - value)
+            smoothed[index] = reduction
+        
+        self._reduction_db = reduction
+        
+        # Ganho por janela, interpolado linearmente entre janelas
+        hop_gain = 10 ** ((smoothed + self.makeup) / 20.0)
+        anchors = np.concatenate([[self._last_gain], hop_gain])
+        positions = np.arange(anchors.shape[0]) * self.hop
+        self._last_gain = float(hop_gain[-1])
+        
+        return np.interp(np.arange(1, samples.shape[0] + 1), positions, anchors).astype(np.float32)
+
+
+# =============================================================================
+# ENVOLVENTE E SILÊNCIO
+# =============================================================================
+# Frames processados de cada vez no cálculo da envolvente (memória limitada)
+_ENVELOPE_SLICE_FRAMES = 1 << 20
+
+
+def rms_envelope(samples, window_frames, full_scale=1.0, align_end=False):
+    """
+    Nível RMS em dBFS por janela, calculado de forma vetorizada
+    
+    Args:
+        samples (numpy.ndarray): Amostras (frames, canais), qualquer tipo
+        window_frames (int): Frames por janela
+        full_scale (float): Valor de 0 dBFS (1.0 para float, 32768 para int16)
+        align_end (bool): Alinhar janelas ao fim (janela parcial no início)
+                          em vez de ao início (janela parcial no fim)
+    
+    Returns:
+        numpy.ndarray: dBFS por janela (-inf em silêncio digital)
+    """
+    frames = samples.shape[0]
+    if frames == 0:
+        return np.zeros(0)
+    
+    head = frames % window_frames if align_end else 0
+    step = window_frames * max(1, _ENVELOPE_SLICE_FRAMES // window_frames)
+    pieces = []
+    
+    if head:
+        pieces.append(_window_mean_square(samples[:head], head))
+    
+    for start in range(head, frames, step):
+        pieces.append(_window_mean_square(samples[start:start + step], window_frames))
+    
+    mean_square = np.concatenate(pieces) / (full_scale * full_scale)
+    
+    with np.errstate(divide='ignore'):
+        return 10 * np.log10(mean_square)
+
+
+def _window_mean_square(samples, window_frames):
+    """Média dos quadrados por janela (última janela pode ser parcial)"""
+    values = samples.reshape(samples.shape[0], -1).astype(np.float64)
+    frame_energy = np.einsum('ij,ij->i', values, values)
+    starts = np.arange(0, values.shape[0], window_frames)
+    counts = np.diff(np.append(starts, values.shape[0])) * values.shape[1]
+    return np.add.reduceat(frame_energy, starts) / counts
+
+
+def silence_edges(envelope_db, threshold):
+    """
+    Primeira e última janela audíveis de uma envolvente
+    
+    Args:
+        envelope_db (numpy.ndarray): dBFS por janela
+        threshold (float): Limiar de silêncio em dBFS
+    
+    Returns:
+        tuple: (primeira, última) janela >= limiar, ou None se tudo silêncio
+    """
+    loud = np.flatnonzero(envelope_db >= threshold)
+    if loud.size == 0:
+        return None
+    return int(loud[0]), int(loud[-1])
+
+
+def silent_runs(envelope_db, threshold):
+    """
+    Trechos contíguos de janelas abaixo do limiar
+    
+    Args:
+        envelope_db (numpy.ndarray): dBFS por janela
+        threshold (float): Limiar de silêncio em dBFS
+    
+    Returns:
+        numpy.ndarray: Pares (início, fim exclusivo) em janelas, forma (n, 2)
+    """
+    silent = np.concatenate([[False], envelope_db < threshold, [False]])
+    changes = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    return changes.reshape(-1, 2)
+
+
+# =============================================================================
+# LOUDNESS (ITU-R BS.1770 / EBU R128)
+# =============================================================================
+def k_weighting(sample_rate):
+    """
+    Filtro de ponderação K (BS.1770): shelf de alta frequência + passa-alta
+    
+    Coeficientes recalculados para o sample rate (iguais aos da norma a 48kHz).
+    
+    Args:
+        sample_rate (int): Sample rate
+    
+    Returns:
+        list: Secções (b, a)
+    """
+    # Estágio 1: shelf +4dB (efeito acústico da cabeça)
+    gain_db, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    k = math.tan(math.pi * fc / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (
+        [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    )
+    
+    # Estágio 2: passa-alta RLB
+    q, fc = 0.5003270373238773, 38.13547087602444
+    k = math.tan(math.pi * fc / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = (
+        [1.0, -2.0, 1.0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    )
+    
+    return [shelf, highpass]
+
+
+class LoudnessMeter:
+    """
+    Mede loudness integrada (LUFS), pico real (dBTP) e nível RMS (dBFS)
+    numa única passagem por blocos
+    """
+    
+    # Duração dos sub-blocos de 100ms (blocos de 400ms com 75% de sobreposição)
+    STEP_MS = 100
+    GATE_STEPS = 4
+    ABSOLUTE_GATE = -70.0
+    RELATIVE_GATE = -10.0
+    
+    # Sobreamostragem para o pico real e taps por fase do interpolador
+    OVERSAMPLING = 4
+    PHASE_TAPS = 12
+    
+    def __init__(self, sample_rate, channels, loudness=True):
+        """
+        Args:
+            sample_rate (int): Sample rate
+            channels (int): Número de canais (todos com peso 1)
+            loudness (bool): Medir loudness integrada (False = apenas
+                             pico real e RMS, sem filtro de ponderação K)
+        """
+        self.channels = channels
+        self.step_frames = max(1, sample_rate * self.STEP_MS // 1000)
+        self.weighting = IIRFilter(k_weighting(sample_rate), channels) if loudness else None
+        
+        self._steps = []
+        self._pending = np.zeros((0, channels))
+        self._energy = 0.0
+        self._samples = 0
+        
+        # Interpolador polifásico (sinc com janela de Kaiser) para pico real
+        taps = self.OVERSAMPLING * self.PHASE_TAPS
+        n = np.arange(taps) - (taps - 1) / 2
+        prototype = np.sinc(n / self.OVERSAMPLING) * np.kaiser(taps, 8.0)
+        self._phases = prototype.reshape(self.PHASE_TAPS, self.OVERSAMPLING).T[:, ::-1]
+        self._phases = (self._phases / self._phases.sum(axis=1, keepdims=True)).astype(np.float32)
+        self._history = np.zeros((self.PHASE_TAPS - 1, channels), dtype=np.float32)
+        self._peak = 0.0
+    
+    def process(self, block):
+        """
+        Acumula um bloco na medição
+        
+        Args:
+            block (numpy.ndarray): Bloco float (frames, canais) em [-1, 1)
+        """
+        if block.shape[0] == 0:
+            return
+        
+        signal = block.astype(np.float64)
+        self._energy += np.einsum('ij,ij->', signal, signal)
+        self._samples += signal.size
+        
+        # Energia ponderada K em sub-blocos de 100ms
+        if self.weighting:
+            weighted = self.weighting.process(signal).astype(np.float64)
+            squares = np.concatenate([self._pending, weighted * weighted])
+            full = squares.shape[0] // self.step_frames * self.step_frames
+            if full:
+                steps = squares[:full].reshape(-1, self.step_frames, self.channels)
+                self._steps.append(steps.mean(axis=1))
+            self._pending = squares[full:]
+        
+        # Pico real: cada fase do sinal sobreamostrado (float32, somas deslocadas)
+        extended = np.concatenate([self._history, block.astype(np.float32)])
+        frames = block.shape[0]
+        peak = float(np.max(np.abs(block)))
+        
+        for phase in self._phases:
+            interpolated = phase[0] * extended[:frames]
+            for tap in range(1, self.PHASE_TAPS):
+                interpolated += phase[tap] * extended[tap:tap + frames]
+            peak = max(peak, float(np.max(np.abs(interpolated))))
+        
+        self._peak = max(self._peak, peak)
+        self._history = extended[-(self.PHASE_TAPS - 1):]
+    
+    def integrated_loudness(self):
+        """
+        Loudness integrada com gating absoluto e relativo (BS.1770-4)
+        
+        Returns:
+            float: LUFS (-inf em silêncio)
+        """
+        steps = np.concatenate(self._steps) if self._steps else np.zeros((0, self.channels))
+        
+        if steps.shape[0] < self.GATE_STEPS:
+            # Áudio mais curto que um bloco de 400ms: bloco único
+            frames = steps.shape[0] * self.step_frames + self._pending.shape[0]
+            if frames == 0:
+                return float('-inf')
+            energy = (steps * self.step_frames).sum() + self._pending.sum()
+            powers = np.array([energy / frames])
+        else:
+            totals = np.concatenate([np.zeros(1), np.cumsum(steps.sum(axis=1))])
+            powers = (totals[self.GATE_STEPS:] - totals[:-self.GATE_STEPS]) / self.GATE_STEPS
+        
+        with np.errstate(divide='ignore'):
+            loudness = -0.691 + 10 * np.log10(powers)
+        
+        gated = powers[loudness > self.ABSOLUTE_GATE]
+        if gated.size == 0:
+            return float('-inf')
+        
+        relative = -0.691 + 10 * math.log10(gated.mean()) + self.RELATIVE_GATE
+        gated = powers[(loudness > self.ABSOLUTE_GATE) & (loudness > relative)]
+        
+        return -0.691 + 10 * math.log10(gated.mean())
+    
+    def true_peak(self):
+        """
+        Pico real (sobreamostragem 4x)
+        
+        Returns:
+            float: dBTP (-inf em silêncio)
+        """
+        return 20 * math.log10(self._peak) if self._peak > 0 else float('-inf')
+    
+    def rms_level(self):
+        """
+        Nível RMS de todas as amostras
+        
+        Returns:
+            float: dBFS (-inf em silêncio)
+        """
+        if self._energy == 0:
+            return float('-inf')
+        return 10 * math.log10(self._energy / self._samples)
+
+
+# =============================================================================
+# ANÁLISE DE CONTEÚDO
+# =============================================================================
+def spectral_cutoff(frequencies, power, cutoff_db):
+    """
+    Última frequência com potência acima de (máximo + cutoff_db)
+    
+    Args:
+        frequencies (numpy.ndarray): Frequência de cada bin (Hz)
+        power (numpy.ndarray): Potência média por bin
+        cutoff_db (float): Limiar relativo ao máximo (negativo)
+    
+    Returns:
+        int: Frequência de corte em Hz (0 sem sinal)
+    """
+    if not np.any(power > 0):
+        return 0
+    threshold = power.max() * 10 ** (cutoff_db / 10.0)
+    above = np.nonzero(power > threshold)[0]
+    return int(round(frequencies[above[-1]])) if above.size else 0
+
+
+class StereoCorrelation:
+    """Correlação de Pearson entre os dois primeiros canais, acumulada por blocos"""
+    
+    def __init__(self):
+        # Somas de L, R, L*R, L*L e R*R e número de frames
+        self._sums = np.zeros(5)
+        self.frames = 0
+    
+    def process(self, block):
+        """
+        Acumula um bloco
+        
+        Args:
+            block (numpy.ndarray): Bloco (frames, canais), canais >= 2
+        """
+        pair = block[:, :2]
+        products = np.einsum('ij,ik->jk', pair, pair, dtype=np.float64)[[0, 0, 1], [1, 0, 1]]
+        self._sums += np.concatenate([pair.sum(axis=0, dtype=np.float64), products])
+        self.frames += block.shape[0]
+    
+    def value(self):
+        """
+        Returns:
+            float: Correlação (-1 a 1), None se algum canal estiver em silêncio
+        """
+        if not self.frames:
+            return None
+        
+        left, right, lr, ll, rr = self._sums
+        covariance = lr - left * right / self.frames
+        left_variance = ll - left * left / self.frames
+        right_variance = rr - right * right / self.frames
+        if left_variance <= 0 or right_variance <= 0:
+            return None
+        return float(covariance / math.sqrt(left_variance * right_variance))
+
+
+class ContentAnalyzer:
+    """
+    Caracteriza o conteúdo numa única passagem por blocos: proporção de
+    fala, banda efetiva e correlação entre canais
+    
+    A fala alterna sílabas e pausas curtas, pelo que em cada segundo uma
+    parte das frames de 20ms fica muito abaixo da energia média (LSTER,
+    "low short-time energy ratio"); na música a energia é contínua. A
+    banda efetiva é a frequência de corte do espectro médio (frames de
+    FFT sem sobreposição) e a correlação é a de Pearson entre os dois
+    primeiros canais.
+    
+    Para cada frequência de loss_edges é ainda acumulado o histograma da
+    fração de energia que um passa-baixa nessa frequência removeria em
+    cada frame com som (memória constante, independente da duração).
+    """
+    
+    # Frames de energia e segundos de classificação (fala/música)
+    FRAME_MS = 20
+    SEGMENT_FRAMES = 50
+    
+    # Frame de baixa energia: abaixo de metade da energia média do segmento
+    LOW_ENERGY_FACTOR = 0.5
+    
+    # Segmento classificado como fala a partir desta proporção de frames fracas
+    SPEECH_LSTER = 0.15
+    
+    # Segmentos abaixo deste nível não são classificados
+    SILENCE_DBFS = -50.0
+    
+    # Espectro médio e limiar da frequência de corte (igual às métricas de sinal)
+    FFT_SIZE = 2048
+    CUTOFF_DB = -80.0
+    
+    # Classes de 1 dB do histograma de perda (0 a LOSS_FLOOR_DB)
+    LOSS_FLOOR_DB = -60
+    
+    def __init__(self, sample_rate, channels, loss_edges=()):
+        """
+        Args:
+            sample_rate (int): Sample rate
+            channels (int): Número de canais
+            loss_edges (sequence): Frequências de corte candidatas (Hz)
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame = max(1, sample_rate * self.FRAME_MS // 1000)
+        self._hann = np.hanning(self.FFT_SIZE).astype(np.float32)
+        
+        self._frame_pending = np.zeros(0, dtype=np.float32)
+        self._energy_pending = np.zeros(0)
+        self._fft_pending = np.zeros(0, dtype=np.float32)
+        self._power = np.zeros(self.FFT_SIZE // 2 + 1)
+        self._correlation = StereoCorrelation() if channels > 1 else None
+        
+        # Primeiro bin acima de cada frequência candidata
+        resolution = sample_rate / float(self.FFT_SIZE)
+        self._loss_bins = [min(self.FFT_SIZE // 2 + 1, int(math.floor(edge / resolution)) + 1)
+                           for edge in loss_edges]
+        self._loss_counts = np.zeros((len(self._loss_bins), 1 - self.LOSS_FLOOR_DB), dtype=np.int64)
+        
+        self._speech = 0
+        self._active = 0
+        self._frames = 0
+    
+    def process(self, block):
+        """
+        Acumula um bloco na análise
+        
+        Args:
+            block (numpy.ndarray): Bloco float (frames, canais) em [-1, 1)
+        """
+        if block.shape[0] == 0:
+            return
+        
+        self._frames += block.shape[0]
+        
+        if self._correlation:
+            self._correlation.process(block)
+        
+        mono = block.mean(axis=1, dtype=np.float32)
+        self._add_energy(mono)
+        self._add_spectrum(mono)
+    
+    def _add_energy(self, mono):
+        """Energia por frame de 20ms e classificação dos segmentos completos"""
+        samples = np.concatenate([self._frame_pending, mono])
+        full = samples.shape[0] // self.frame * self.frame
+        self._frame_pending = samples[full:]
+        if not full:
+            return
+        
+        frames = samples[:full].reshape(-1, self.frame)
+        energies = np.concatenate([
+            self._energy_pending,
+            np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / self.frame
+        ])
+        
+        count = energies.shape[0] // self.SEGMENT_FRAMES
+        self._energy_pending = energies[count * self.SEGMENT_FRAMES:]
+        if not count:
+            return
+        
+        segments = energies[:count * self.SEGMENT_FRAMES].reshape(count, self.SEGMENT_FRAMES)
+        mean = segments.mean(axis=1)
+        active = mean > 10 ** (self.SILENCE_DBFS / 10.0)
+        lster = (segments < self.LOW_ENERGY_FACTOR * mean[:, None]).mean(axis=1)
+        
+        self._active += int(np.count_nonzero(active))
+        self._speech += int(np.count_nonzero(active & (lster >= self.SPEECH_LSTER)))
+    
+    def _add_spectrum(self, mono):
+        """Potência das frames completas da FFT"""
+        samples = np.concatenate([self._fft_pending, mono])
+        full = samples.shape[0] // self.FFT_SIZE * self.FFT_SIZE
+        self._fft_pending = samples[full:]
+        if not full:
+            return
+        
+        frames = samples[:full].reshape(-1, self.FFT_SIZE)
+        spectrum = np.fft.rfft(frames * self._hann, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        self._power += power.sum(axis=0)
+        
+        if not self._loss_bins:
+            return
+        
+        # Energia acima de cada bin (soma acumulada a partir do topo), frames com som
+        active = np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / self.FFT_SIZE > 10 ** (self.SILENCE_DBFS / 10.0)
+        if not np.any(active):
+            return
+        above = np.concatenate([np.cumsum(power[active, ::-1], axis=1)[:, ::-1],
+                                np.zeros((int(np.count_nonzero(active)), 1))], axis=1)
+        total = above[:, :1]
+        
+        for index, first_bin in enumerate(self._loss_bins):
+            loss_db = 10 * np.log10(np.maximum(above[:, first_bin:first_bin + 1] / total, 1e-12))
+            classes = np.clip(np.round(-loss_db), 0, -self.LOSS_FLOOR_DB).astype(np.int64).ravel()
+            self._loss_counts[index] += np.bincount(classes, minlength=self._loss_counts.shape[1])
+    
+    def loss_histogram(self, index):
+        """
+        Energia removida por um passa-baixa em loss_edges[index], por frame com som
+        
+        Args:
+            index (int): Índice da frequência em loss_edges
+        
+        Returns:
+            tuple: (perda em dB de cada classe, frames por classe)
+        """
+        return -np.arange(self._loss_counts.shape[1], dtype=float), self._loss_counts[index]
+    
+    def features(self):
+        """
+        Características do conteúdo analisado
+        
+        Returns:
+            dict: speech_ratio (0-1, None sem segmentos com som),
+                  cutoff_hz, correlation (-1 a 1; 1 em mono ou silêncio),
+                  seconds
+        """
+        correlation = self._correlation.value() if self._correlation else None
+        if correlation is None:
+            correlation = 1.0
+        
+        frequencies = np.fft.rfftfreq(self.FFT_SIZE, 1.0 / self.sample_rate)
+        
+        return {
+            'speech_ratio': self._speech / float(self._active) if self._active else None,
+            'cutoff_hz': spectral_cutoff(frequencies, self._power, self.CUTOFF_DB),
+            'correlation': round(correlation, 4),
+            'seconds': round(self._frames / float(self.sample_rate), 2)
+        }
+
+
+# =============================================================================
+# REAMOSTRAGEM
+# =============================================================================
+class Resampler:
+    """
+    Reamostragem por razão racional com filtro polifásico (sinc com janela de Kaiser)
+    
+    A razão destino/origem é reduzida a L/M: a saída n corresponde à
+    posição n*M/L da entrada e usa a fase (n*M mod L) do filtro, calculada
+    uma única vez. O passa-baixa corta abaixo do Nyquist da menor das duas
+    frequências, pelo que a mesma etapa serve para subir e para descer.
+    
+    As fases repetem-se a cada L saídas, que usam sempre as mesmas posições
+    relativas a um avanço de M entradas: com as razões habituais (ex:
+    48000 -> 44100 Hz, L/M = 147/160) cada grupo de L saídas é um produto
+    por uma matriz fixa, e o bloco inteiro uma multiplicação de matrizes.
+    Os blocos são processados com estado (histórico e posição), como nos
+    filtros IIR; as últimas amostras saem no flush.
+    """
+    
+    # Qualidade: (cruzamentos de zero do sinc por lado, fração da banda
+    # preservada, beta da janela de Kaiser ~ atenuação de 60/90/120 dB)
+    QUALITY = {
+        'low': (8, 0.90, 6.0),
+        'medium': (16, 0.94, 9.0),
+        'high': (32, 0.97, 12.0)
+    }
+    
+    # Maior matriz polifásica (elementos); razões pouco comuns (ex: 44056 ->
+    # 44100 Hz) calculam cada saída com a sua fase
+    MAX_MATRIX_SIZE = 1 << 20
+    
+    # Saídas calculadas de cada vez sem matriz (limita a memória das janelas)
+    CHUNK_FRAMES = 8192
+    
+    def __init__(self, input_rate, output_rate, channels, quality='medium'):
+        """
+        Args:
+            input_rate (int): Sample rate de entrada
+            output_rate (int): Sample rate de saída
+            channels (int): Número de canais
+            quality (str): low, medium ou high
+        """
+        divisor = math.gcd(input_rate, output_rate)
+        self.up = output_rate // divisor
+        self.down = input_rate // divisor
+        self.channels = channels
+        
+        crossings, bandwidth, beta = self.QUALITY[quality]
+        
+        # Corte em ciclos por amostra de entrada e meia largura do filtro
+        cutoff = 0.5 * bandwidth * min(1.0, self.up / float(self.down))
+        self.half = int(math.ceil(crossings * 0.5 / cutoff))
+        self.taps = 2 * self.half
+        
+        # Fase p: distância (em amostras de entrada) de cada tap à saída
+        offsets = (np.arange(self.up)[:, None] / float(self.up)
+                   + (self.half - 1) - np.arange(self.taps)[None, :])
+        window = np.i0(beta * np.sqrt(np.clip(1 - (offsets / self.half) ** 2, 0, None))) / np.i0(beta)
+        kernel = np.sinc(2 * cutoff * offsets) * window
+        
+        # Ganho unitário em DC em todas as fases
+        self._kernel = (kernel / kernel.sum(axis=1, keepdims=True)).astype(np.float32)
+        
+        # Saída r de cada grupo de L: posição (r*M)//L e fase (r*M) mod L
+        steps = np.arange(self.up) * self.down
+        self._positions = steps // self.up
+        self._phases = steps % self.up
+        
+        span = int(self._positions[-1]) + self.taps
+        self._matrix = None
+        if span * self.up <= self.MAX_MATRIX_SIZE:
+            self._matrix = np.zeros((span, self.up), dtype=np.float32)
+            rows = self._positions[:, None] + np.arange(self.taps)[None, :]
+            self._matrix[rows, np.arange(self.up)[:, None]] = self._kernel[self._phases]
+        
+        # Zeros antes do início; _start é o índice de entrada de _buffer[0]
+        self._buffer = np.zeros((self.half - 1, channels), dtype=np.float32)
+        self._start = -(self.half - 1)
+        self._next = 0
+        self._received = 0
+    
+    def process(self, block):
+        """
+        Reamostra um bloco continuando o estado do bloco anterior
+        
+        Args:
+            block (numpy.ndarray): Bloco (frames, canais)
+        
+        Returns:
+            numpy.ndarray: Bloco reamostrado float32 (pode ser vazio)
+        """
+        self._buffer = np.concatenate([self._buffer, block.astype(np.float32)])
+        self._received += block.shape[0]
+        return self._produce(self._start + self._buffer.shape[0])
+    
+    def flush(self):
+        """
+        Amostras finais (o filtro precisa de half amostras após cada saída)
+        
+        Returns:
+            numpy.ndarray: Últimas amostras float32
+        """
+        # Zeros para completar o último grupo de L saídas
+        padding = np.zeros((self.half + self.down, self.channels), dtype=np.float32)
+        self._buffer = np.concatenate([self._buffer, padding])
+        total = -(-self._received * self.up // self.down)
+        return self._produce(self._start + self._buffer.shape[0], total)
+    
+    def _produce(self, available, limit=None):
+        """
+        Calcula todas as saídas cujos taps já estão no buffer
+        
+        Args:
+            available (int): Índice de entrada seguinte ao fim do buffer
+            limit (int): Total de saídas a não ultrapassar (fim do áudio)
+        
+        Returns:
+            numpy.ndarray: Saídas (frames, canais)
+        """
+        # Saída n usa as entradas até floor(n*M/L) + half; com a matriz,
+        # apenas grupos completos de L saídas
+        if self._matrix is None:
+            end = ((available - self.half) * self.up - 1) // self.down + 1
+        else:
+            end = ((available - self.half - int(self._positions[-1]) - 1) // self.down + 1) * self.up
+        if limit is not None:
+            end = min(end, limit)
+        count = end - self._next
+        if count <= 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        
+        result = self._multiply(count) if self._matrix is not None else self._gather(count)
+        
+        # Descartar entradas que nenhuma saída seguinte usa
+        self._next = end
+        consumed = end * self.down // self.up - (self.half - 1) - self._start
+        if consumed > 0:
+            self._buffer = self._buffer[consumed:]
+            self._start += consumed
+        
+        return result
+    
+    def _multiply(self, count):
+        """Saídas em grupos de L: janelas de entrada com avanço M vezes a matriz"""
+        groups = -(-count // self.up)
+        first = self._next // self.up * self.down - (self.half - 1) - self._start
+        span = self._matrix.shape[0]
+        
+        result = np.empty((groups * self.up, self.channels), dtype=np.float32)
+        for channel in range(self.channels):
+            samples = self._buffer[first:, channel]
+            windows = np.lib.stride_tricks.sliding_window_view(samples, span)[::self.down][:groups]
+            result[:, channel] = (np.ascontiguousarray(windows) @ self._matrix).ravel()
+        
+        return result[:count]
+    
+    def _gather(self, count):
+        """Saídas uma a uma, cada uma com a sua janela e fase"""
+        outputs = np.arange(self._next, self._next + count, dtype=np.int64)
+        first_taps = outputs * self.down // self.up - (self.half - 1) - self._start
+        phases = outputs * self.down % self.up
+        
+        windows = np.lib.stride_tricks.sliding_window_view(self._buffer, self.taps, axis=0)
+        result = np.empty((count, self.channels), dtype=np.float32)
+        for start in range(0, count, self.CHUNK_FRAMES):
+            chunk = slice(start, start + self.CHUNK_FRAMES)
+            np.einsum('nck,nk->nc', windows[first_taps[chunk]], self._kernel[phases[chunk]], out=result[chunk])
+        
+        return result
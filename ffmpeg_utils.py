@@ -0,0 +1,157 @@
+"""
+ffmpeg_utils.py
+Localização e execução do FFmpeg
+"""
+
+import logging
+import os
+import re
+import shutil
+import subprocess
+
+
+# Caminhos do ffmpeg e ffprobe (resolvidos na primeira utilização)
+_ffmpeg_exe = None
+_ffprobe_exe = None
+
+
+def get_ffmpeg_exe():
+    """
+    Retorna caminho do executável ffmpeg
+    
+    Usa o ffmpeg do PATH (o mesmo que o pydub) e, na falta deste,
+    o binário incluído no imageio-ffmpeg (dependência do moviepy).
+    
+    Returns:
+        str: Caminho do executável
+    """
+    global _ffmpeg_exe
+    
+    if _ffmpeg_exe is None:
+        exe = shutil.which('ffmpeg')
+        
+        if exe is None:
+            try:
+                import imageio_ffmpeg
+                exe = imageio_ffmpeg.get_ffmpeg_exe()
+            except Exception:
+                exe = 'ffmpeg'
+        
+        _ffmpeg_exe = exe
+        logging.debug(f"FFmpeg: {exe}")
+    
+    return _ffmpeg_exe
+
+
+def get_ffprobe_exe():
+    """
+    Retorna caminho do executável ffprobe, se existir
+    
+    Procura no PATH e junto do ffmpeg em uso (o imageio-ffmpeg não
+    inclui ffprobe).
+    
+    Returns:
+        str: Caminho do executável ou None se indisponível
+    """
+    global _ffprobe_exe
+    
+    if _ffprobe_exe is None:
+        exe = shutil.which('ffprobe')
+        
+        if exe is None:
+            folder = os.path.dirname(get_ffmpeg_exe())
+            name = 'ffprobe.exe' if os.name == 'nt' else 'ffprobe'
+            candidate = os.path.join(folder, name)
+            if folder and os.path.isfile(candidate):
+                exe = candidate
+        
+        # False = procurado e não encontrado
+        _ffprobe_exe = exe or False
+        logging.debug(f"FFprobe: {exe or 'indisponível (usando ffmpeg -i)'}")
+    
+    return _ffprobe_exe or None
+
+
+def run_ffmpeg(args):
+    """
+    Executa ffmpeg e aguarda o fim
+    
+    Args:
+        args (list): Argumentos (sem o executável)
+    
+    Returns:
+        subprocess.CompletedProcess: Resultado com stderr em texto
+    """
+    cmd = [get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-nostats', '-y'] + args
+    logging.debug(f"FFmpeg: {' '.join(cmd)}")
+    
+    return subprocess.run(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace'
+    )
+
+
+def parse_duration(stderr):
+    """
+    Extrai duração do cabeçalho "Duration: HH:MM:SS.ss" do ffmpeg
+    
+    Args:
+        stderr (str): Saída de erro do ffmpeg
+    
+    Returns:
+        float: Duração em segundos ou None se indisponível
+    """
+    match = re.search(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)', stderr)
+    if not match:
+        return None
+    
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def last_error_line(stderr):
+    """
+    Retorna a última linha não vazia da saída de erro
+    
+    Args:
+        stderr (str): Saída de erro do ffmpeg
+    
+    Returns:
+        str: Mensagem de erro resumida
+    """
+    lines = [line.strip() for line in stderr.splitlines() if line.strip()]
+    return lines[-1] if lines else "Erro desconhecido do FFmpeg"
+
+
+# Formatos de saída suportados: muxer do ffmpeg, codec da faixa e encoder
+OUTPUT_FORMATS = {
+    'mp3': {'muxer': 'mp3', 'codec': 'mp3', 'encoder': 'libmp3lame'},
+    'm4a': {'muxer': 'ipod', 'codec': 'aac', 'encoder': 'aac'},
+    'aac': {'muxer': 'adts', 'codec': 'aac', 'encoder': 'aac'}
+}
+
+
+def parse_channel_layout(layout):
+    """
+    Converte descrição de canais do ffmpeg em número de canais
+    
+    Args:
+        layout (str): Ex: "mono", "stereo", "5.1(side)", "3 channels"
+    
+    Returns:
+        int: Número de canais ou None se não for uma descrição de canais
+    """
+    layouts = {'mono': 1, 'stereo': 2, '2.1': 3, 'quad': 4, '5.0': 5, '5.1': 6, '7.1': 8}
+    name = layout.split('(')[0].strip()
+    
+    if name in layouts:
+        return layouts[name]
+    
+    match = re.match(r'(\d+) channels', name)
+    if match:
+        return int(match.group(1))
+    
+    return None
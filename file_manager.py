@@ -5,9 +5,13 @@ Gestão de ficheiros e pastas
 
 import os
 import logging
+import socket
+import uuid
 from pathlib import Path
 from datetime import datetime
 
+from temp_workspace import process_alive
+
 
 class FileManager:
     """Gestão de ficheiros e pastas"""
@@ -28,35 +32,58 @@ class FileManager:
         
         logging.info(f"Pastas configuradas: entrada={self.input_folder}, saída={self.output_folder}")
     
-    def get_video_files(self):
+    def iter_video_files(self):
         """
-        Retorna lista de ficheiros MP4 na pasta de entrada
+        Percorre a pasta de entrada e gera vídeos à medida que são encontrados
         
-        Returns:
-            list: Lista de caminhos completos dos ficheiros MP4
-        """
-        video_files = []
+        Usa os.scandir sem ordenar nem listar tudo antes: o processamento
+        pode começar logo no primeiro ficheiro, mesmo em pastas enormes ou
+        em rede. Subpastas são percorridas se recursive = true; pastas
+        ocultas e as pastas de saída, logs, temporários e cache são ignoradas.
         
+        Yields:
+            str: Caminho completo de cada vídeo
+        """
         if not os.path.exists(self.input_folder):
             logging.error(f"Pasta de entrada não existe: {self.input_folder}")
-            return video_files
+            return
         
-        for filename in os.listdir(self.input_folder):
-            if filename.lower().endswith('.mp4'):
-                filepath = os.path.join(self.input_folder, filename)
-                video_files.append(filepath)
-                logging.debug(f"Vídeo encontrado: {filename}")
+        extensions = self.config.get_input_extensions()
+        recursive = self.config.get_recursive()
+        excluded = self.excluded_folders()
+        count = 0
         
-        if not video_files:
-            logging.warning(f"Nenhum ficheiro MP4 encontrado em: {self.input_folder}")
+        for path in scan_media_files(self.input_folder, extensions, recursive, excluded):
+            count += 1
+            logging.debug(f"Vídeo encontrado: {path}")
+            yield path
+        
+        if not count:
+            logging.warning(f"Nenhum vídeo ({', '.join(extensions)}) encontrado em: {self.input_folder}")
         else:
-            logging.info(f"Total de vídeos encontrados: {len(video_files)}")
+            logging.info(f"Total de vídeos encontrados: {count}")
+    
+    def get_video_files(self):
+        """
+        Retorna lista ordenada dos vídeos da pasta de entrada
         
-        return sorted(video_files)
+        Returns:
+            list: Lista de caminhos completos dos vídeos
+        """
+        return sorted(self.iter_video_files())
     
-    def generate_output_filename(self, input_path):
+    def excluded_folders(self):
+        """Pastas geridas pelo conversor (ignoradas se estiverem dentro da entrada)"""
+        folders = [self.output_folder, self.log_folder, self.config.get_temp_folder(), self.config.get_cache_folder()]
+        return {os.path.realpath(folder) for folder in folders if folder}
+    
+    def get_base_output_filename(self, input_path):
         """
-        Gera nome do ficheiro de saída baseado nas configurações
+        Retorna caminho de saída de um vídeo, sem numeração de versões
+        
+        A estrutura de subpastas da entrada é reproduzida na saída.
+        Vídeos da mesma pasta com o mesmo nome e extensões diferentes
+        recebem a extensão de origem no nome (a.mp4 → a_mp4.mp3).
         
         Args:
             input_path (str): Caminho do ficheiro de entrada
@@ -64,27 +91,86 @@ class FileManager:
         Returns:
             str: Caminho completo do ficheiro de saída
         """
-        # Obter nome base do ficheiro (sem extensão)
-        base_name = Path(input_path).stem
+        base_name = self._output_stem(input_path)
+        extension = self.config.get_output_format()
         
         # Manter nome original ou adicionar sufixo?
         if self.config.get_keep_original_name():
-            output_name = f"{base_name}.mp3"
+            output_name = f"{base_name}.{extension}"
         else:
-            output_name = f"{base_name}_converted.mp3"
+            output_name = f"{base_name}_converted.{extension}"
+        
+        return os.path.join(self._output_dir_for(input_path), output_name)
+    
+    def _output_stem(self, input_path):
+        """
+        Nome base da saída: o do vídeo, com a extensão de origem se houver
+        mais de uma extensão aceite (a.mp4 → a_mp4, a.mkv → a_mkv)
+        
+        O nome depende apenas do próprio caminho, nunca dos ficheiros
+        presentes no disco: todos os processos (workers, pipeline, execuções
+        seguintes em modo contínuo) chegam ao mesmo nome, e as saídas de
+        a.mp4 e a.mkv nunca se substituem.
+        
+        Args:
+            input_path (str): Caminho do ficheiro de entrada
+            
+        Returns:
+            str: Nome sem extensão
+        """
+        path = Path(input_path)
+        if len(self.config.get_input_extensions()) > 1:
+            return f"{path.stem}_{path.suffix.lower().lstrip('.')}"
+        return path.stem
+    
+    def _output_dir_for(self, input_path):
+        """
+        Pasta de saída correspondente à subpasta do vídeo na entrada
+        
+        Args:
+            input_path (str): Caminho do ficheiro de entrada
+            
+        Returns:
+            str: Pasta de saída
+        """
+        relative = os.path.relpath(
+            os.path.dirname(os.path.abspath(input_path)),
+            os.path.abspath(self.input_folder)
+        )
+        
+        # Ficheiro fora da pasta de entrada: diretamente na pasta de saída
+        if relative == os.curdir or relative.startswith(os.pardir):
+            return self.output_folder
+        
+        return os.path.join(self.output_folder, relative)
+    
+    def generate_output_filename(self, input_path):
+        """
+        Gera nome do ficheiro de saída baseado nas configurações
         
-        output_path = os.path.join(self.output_folder, output_name)
+        Args:
+            input_path (str): Caminho do ficheiro de entrada
+            
+        Returns:
+            str: Caminho completo do ficheiro de saída
+        """
+        # Obter nome base do ficheiro (sem extensão)
+        base_name = self._output_stem(input_path)
+        extension = self.config.get_output_format()
+        output_path = self.get_base_output_filename(input_path)
+        output_dir = os.path.dirname(output_path)
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
         
         # Se não sobrescrever e ficheiro já existe, criar versão numerada
         if not self.config.get_overwrite() and os.path.exists(output_path):
             counter = 1
             while True:
                 if self.config.get_keep_original_name():
-                    output_name = f"{base_name}_{counter:03d}.mp3"
+                    output_name = f"{base_name}_{counter:03d}.{extension}"
                 else:
-                    output_name = f"{base_name}_converted_{counter:03d}.mp3"
+                    output_name = f"{base_name}_converted_{counter:03d}.{extension}"
                 
-                output_path = os.path.join(self.output_folder, output_name)
+                output_path = os.path.join(output_dir, output_name)
                 
                 if not os.path.exists(output_path):
                     break
@@ -94,6 +180,67 @@ class FileManager:
         
         return output_path
     
+    def partial_output_path(self, output_path):
+        """
+        Caminho temporário onde a saída é escrita antes do rename final
+        
+        Fica na raiz da pasta de saída (mesmo disco: rename atómico) e
+        identifica máquina e processo dono, para limpar restos de execuções
+        interrompidas.
+        
+        Args:
+            output_path (str): Caminho final
+            
+        Returns:
+            str: Ex: saida/.video.mp3.3f2a9c1b.1234@maquina.part
+        """
+        name = os.path.basename(output_path)
+        unique = uuid.uuid4().hex[:8]
+        return os.path.join(self.output_folder, f".{name}.{unique}.{os.getpid()}@{socket.gethostname()}.part")
+    
+    def commit_output(self, partial_path, output_path):
+        """
+        Publica a saída escrita em partial_path (rename atómico)
+        
+        Args:
+            partial_path (str): Caminho de partial_output_path
+            output_path (str): Caminho final
+        """
+        os.replace(partial_path, output_path)
+    
+    def cleanup_partial_outputs(self):
+        """
+        Remove saídas incompletas de processos que já terminaram
+        
+        Returns:
+            int: Número de ficheiros removidos
+        """
+        removed = 0
+        hostname = socket.gethostname()
+        
+        if not os.path.exists(self.output_folder):
+            return removed
+        
+        for entry in os.scandir(self.output_folder):
+            if not (entry.name.startswith('.') and entry.name.endswith('.part')):
+                continue
+            
+            owner, _, host = entry.name[:-len('.part')].rpartition('@')
+            pid = owner.rpartition('.')[2]
+            if host != hostname or not pid.isdigit() or process_alive(int(pid)):
+                continue
+            
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError as e:
+                logging.warning(f"Não foi possível remover saída incompleta {entry.path}: {e}")
+        
+        if removed:
+            logging.info(f"Saídas incompletas removidas: {removed}")
+        
+        return removed
+    
     def get_file_size(self, filepath):
         """
         Retorna tamanho do ficheiro em MB
@@ -170,9 +317,9 @@ class FileManager:
             logging.error(f"Ficheiro não encontrado: {filepath}")
             return False
         
-        # Verifica se é MP4
-        if not filepath.lower().endswith('.mp4'):
-            logging.error(f"Ficheiro não é MP4: {filepath}")
+        # Verifica extensão
+        if not filepath.lower().endswith(self.config.get_input_extensions()):
+            logging.error(f"Extensão não suportada: {filepath}")
             return False
         
         # Verifica se não está vazio
@@ -206,3 +353,37 @@ class FileManager:
         summary += f"\n{'='*70}\n"
         
         return summary
+
+
+def scan_media_files(folder, extensions, recursive=True, excluded=()):
+    """
+    Gera ficheiros com as extensões pedidas, sem listar a árvore completa
+    
+    Args:
+        folder (str): Pasta inicial
+        extensions (tuple): Extensões aceites (minúsculas, com ponto)
+        recursive (bool): Percorrer subpastas
+        excluded (set): Caminhos reais (realpath) de pastas a ignorar
+    
+    Yields:
+        str: Caminho de cada ficheiro
+    """
+    pending = [folder]
+    
+    while pending:
+        current = pending.pop()
+        
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            if entry.name.lower().endswith(extensions):
+                                yield entry.path
+                        elif recursive and entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.'):
+                            if os.path.realpath(entry.path) not in excluded:
+                                pending.append(entry.path)
+                    except OSError as e:
+                        logging.warning(f"Não foi possível ler {entry.path}: {e}")
+        except OSError as e:
+            logging.warning(f"Não foi possível ler a pasta {current}: {e}")
@@ -0,0 +1,326 @@
+"""
+folder_watcher.py
+Vigilância da pasta de entrada: deteta vídeos novos quando terminam de ser escritos
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+
+from file_manager import scan_media_files
+
+
+class FolderWatcher:
+    """
+    Deteta ficheiros novos numa pasta e entrega-os quando estão completos
+    
+    Em Linux usa inotify: um ficheiro fechado após escrita (ou movido para
+    a pasta) fica pronto de imediato. Noutros sistemas, ou se inotify não
+    estiver disponível, a pasta é lida periodicamente e um ficheiro fica
+    pronto quando o tamanho e a data de modificação não mudam durante
+    stable_seconds.
+    """
+    
+    # Com inotify, nova leitura completa da pasta a cada N segundos
+    # (eventos perdidos, ex: ficheiros escritos por outra máquina via NFS)
+    RESCAN_SECONDS = 60.0
+    
+    def __init__(self, folder, extensions=('.mp4',), recursive=False, excluded=(),
+                 poll_interval=2.0, stable_seconds=3.0):
+        """
+        Args:
+            folder (str): Pasta a vigiar
+            extensions (tuple): Extensões aceites (minúsculas, com ponto)
+            recursive (bool): Vigiar também as subpastas
+            excluded (set): Caminhos reais (realpath) de pastas a ignorar
+            poll_interval (float): Intervalo entre verificações (segundos)
+            stable_seconds (float): Tempo sem alterações para considerar
+                                    um ficheiro completo
+        """
+        self.folder = folder
+        self.extensions = tuple(extensions)
+        self.recursive = recursive
+        self.excluded = set(excluded)
+        self.poll_interval = poll_interval
+        self.stable_seconds = stable_seconds
+        
+        self._inotify = _Inotify.open()
+        if self._inotify and not self._inotify.add_watch(folder):
+            self._inotify.close()
+            self._inotify = None
+        self.mode = 'inotify' if self._inotify else 'polling'
+        
+        # Ficheiros à espera de ficarem estáveis: caminho -> (tamanho, mtime, desde)
+        self._pending = {}
+        # Ficheiros já entregues: caminho -> (tamanho, mtime)
+        self._delivered = {}
+    
+    def watch(self):
+        """
+        Gera caminhos de ficheiros prontos, incluindo os já existentes
+        
+        Bloqueia entre ficheiros; termina apenas com close() ou
+        KeyboardInterrupt.
+        
+        Yields:
+            str: Caminho de um ficheiro completo
+        """
+        self._scan()
+        last_scan = time.monotonic()
+        
+        while True:
+            for path in self._take_ready():
+                yield path
+            
+            if self._inotify is None:
+                time.sleep(self.poll_interval)
+                self._scan()
+                continue
+            
+            events = self._inotify.read(self.poll_interval)
+            if events is None:
+                # Descritor fechado por close()
+                return
+            
+            for folder, name, closed, is_dir in events:
+                path = os.path.join(folder, name)
+                if is_dir:
+                    # Subpasta nova (ou movida para dentro): vigiar e ler
+                    if self._watch_subfolder(path):
+                        self._scan(path, forget=False)
+                elif self._accepts(name):
+                    self._track(path, ready=closed)
+            
+            if time.monotonic() - last_scan >= self.RESCAN_SECONDS:
+                self._scan()
+                last_scan = time.monotonic()
+    
+    def close(self):
+        """Liberta o descritor inotify"""
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+    
+    def _accepts(self, name):
+        """Verifica se o nome tem uma extensão aceite"""
+        return name.lower().endswith(self.extensions)
+    
+    def _scan(self, folder=None, forget=True):
+        """
+        Lê a pasta (e subpastas) e acompanha ficheiros novos ou alterados
+        
+        Args:
+            folder (str): Pasta a ler (None = pasta vigiada)
+            forget (bool): Esquecer ficheiros entregues que já não existem
+        """
+        folder = folder or self.folder
+        present = set()
+        
+        for path in scan_media_files(folder, self.extensions, self.recursive, self.excluded):
+            present.add(path)
+            self._track(path)
+        
+        if self._inotify and self.recursive:
+            self._watch_tree(folder)
+        
+        # Esquecer ficheiros removidos (podem voltar a ser copiados)
+        if forget:
+            for path in list(self._delivered):
+                if path not in present:
+                    del self._delivered[path]
+    
+    def _watch_subfolder(self, path):
+        """
+        Acrescenta vigilância inotify a uma subpasta
+        
+        Returns:
+            bool: True se a subpasta deve ser lida
+        """
+        name = os.path.basename(path)
+        if not self.recursive or name.startswith('.') or os.path.realpath(path) in self.excluded:
+            return False
+        
+        if self._inotify:
+            self._inotify.add_watch(path)
+        return True
+    
+    def _watch_tree(self, folder):
+        """Garante vigilância inotify em todas as subpastas"""
+        pending = [folder]
+        
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and self._watch_subfolder(entry.path):
+                            pending.append(entry.path)
+            except OSError:
+                continue
+    
+    def _track(self, path, ready=False):
+        """
+        Regista observação de um ficheiro
+        
+        Args:
+            path (str): Caminho do ficheiro
+            ready (bool): True se a escrita terminou (evento de fecho)
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._pending.pop(path, None)
+            return
+        
+        signature = (stat.st_size, stat.st_mtime)
+        if self._delivered.get(path) == signature:
+            return
+        
+        previous = self._pending.get(path)
+        if ready:
+            since = float('-inf')
+        elif previous and previous[:2] == signature:
+            since = previous[2]
+        else:
+            since = time.monotonic()
+        
+        self._pending[path] = (stat.st_size, stat.st_mtime, since)
+    
+    def _take_ready(self):
+        """
+        Retira ficheiros estáveis da lista de espera
+        
+        Returns:
+            list: Caminhos prontos, por ordem alfabética
+        """
+        now = time.monotonic()
+        ready = []
+        
+        for path, (size, mtime, since) in list(self._pending.items()):
+            if size == 0 or now - since < self.stable_seconds:
+                continue
+            
+            # Confirmar que não mudou desde a última observação
+            self._track(path)
+            current = self._pending.get(path)
+            if current and current[:2] == (size, mtime):
+                del self._pending[path]
+                self._delivered[path] = (size, mtime)
+                ready.append(path)
+        
+        if self._inotify is None and self._pending:
+            logging.debug(f"Ficheiros em escrita: {len(self._pending)}")
+        
+        return sorted(ready)
+
+
+class _Inotify:
+    """Acesso mínimo ao inotify do Linux via ctypes (sem dependências)"""
+    
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_ISDIR = 0x40000000
+    
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    
+    # struct inotify_event: wd, mask, cookie, len, name[len]
+    EVENT = struct.Struct('iIII')
+    
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+        # Descritor de vigilância -> pasta
+        self.folders = {}
+    
+    @classmethod
+    def open(cls):
+        """
+        Cria instância inotify
+        
+        Returns:
+            _Inotify: Instância ou None se inotify não estiver disponível
+        """
+        if not sys.platform.startswith('linux'):
+            return None
+        
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            logging.debug(f"inotify indisponível: {e}")
+            return None
+        
+        return cls(libc, fd) if fd >= 0 else None
+    
+    def add_watch(self, folder):
+        """
+        Vigia uma pasta (sem efeito se já estiver vigiada)
+        
+        Args:
+            folder (str): Pasta a vigiar
+        
+        Returns:
+            bool: True se a pasta está vigiada
+        """
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), self.MASK)
+        if wd < 0:
+            logging.debug(f"inotify: não foi possível vigiar {folder}")
+            return False
+        
+        self.folders[wd] = folder
+        return True
+    
+    def read(self, timeout):
+        """
+        Aguarda eventos
+        
+        Args:
+            timeout (float): Tempo máximo de espera (segundos)
+        
+        Returns:
+            list: Tuplos (pasta, nome, escrita terminada, é pasta) ou None
+                  se fechado
+        """
+        if self.fd is None:
+            return None
+        
+        try:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if not readable:
+                return []
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        except (OSError, ValueError):
+            return None
+        
+        events = []
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            start = offset + self.EVENT.size
+            name = data[start:start + length].rstrip(b'\0')
+            offset = start + length
+            
+            if name and wd in self.folders:
+                events.append((
+                    self.folders[wd],
+                    os.fsdecode(name),
+                    bool(mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO)),
+                    bool(mask & self.IN_ISDIR)
+                ))
+        
+        return events
+    
+    def close(self):
+        """Fecha o descritor"""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
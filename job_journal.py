@@ -0,0 +1,139 @@
+"""
+job_journal.py
+Diário de trabalhos: estado de cada vídeo do lote, para retomar após falhas
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+
+
+class JobJournal:
+    """
+    Regista o estado de cada vídeo num ficheiro só de acréscimo (JSON por linha)
+    
+    Estados: queued, extracting, converting, done, failed. Cada registo é
+    escrito com uma única chamada em modo append, o que permite a escrita
+    simultânea pelos processos trabalhadores; uma linha incompleta deixada
+    por uma interrupção é ignorada na leitura.
+    """
+    
+    STATES = ('queued', 'extracting', 'converting', 'done', 'failed')
+    
+    def __init__(self, path, settings_hash):
+        """
+        Args:
+            path (str): Ficheiro do diário
+            settings_hash (str): Hash das configurações que afetam a saída
+        """
+        self.path = path
+        self.settings_hash = settings_hash
+    
+    def start_batch(self, resume=False):
+        """
+        Inicia um lote
+        
+        Sem resume, o diário anterior é substituído; com resume, os novos
+        registos são acrescentados aos do lote interrompido. Os vídeos são
+        registados com record() à medida que são encontrados.
+        
+        Args:
+            resume (bool): Continuar o lote anterior
+        """
+        if resume and os.path.exists(self.path):
+            self._terminate_last_line()
+        else:
+            header = {'batch': uuid.uuid4().hex[:12], 'started': time.time(), 'settings': self.settings_hash}
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(header) + '\n')
+            os.replace(temp_path, self.path)
+        
+        logging.info(f"Diário de trabalhos: {self.path} ({'retomado' if resume else 'novo lote'})")
+    
+    def record(self, video_path, state, output=None):
+        """
+        Regista mudança de estado de um vídeo
+        
+        Args:
+            video_path (str): Caminho do vídeo
+            state (str): Um de STATES
+            output (str): Caminho de saída (estados done/failed)
+        """
+        self._append([self._entry(video_path, state, output)])
+    
+    def completed(self):
+        """
+        Vídeos concluídos no lote registado, com as configurações atuais
+        
+        Só conta o último estado de cada vídeo, e apenas se a saída ainda
+        existir.
+        
+        Returns:
+            dict: Caminho absoluto do vídeo -> caminho de saída
+        """
+        latest = {}
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if 'video' in entry:
+                        latest[entry['video']] = entry
+        except OSError:
+            return {}
+        
+        return {
+            video: entry['output']
+            for video, entry in latest.items()
+            if entry['state'] == 'done'
+            and entry.get('settings') == self.settings_hash
+            and entry.get('output')
+            and os.path.exists(entry['output'])
+        }
+    
+    def _entry(self, video_path, state, output=None):
+        """Cria registo de estado"""
+        entry = {
+            'video': os.path.abspath(video_path),
+            'state': state,
+            'settings': self.settings_hash,
+            'time': round(time.time(), 3)
+        }
+        if output:
+            entry['output'] = os.path.abspath(output)
+        return entry
+    
+    def _append(self, entries):
+        """Acrescenta registos numa única escrita"""
+        if not entries:
+            return
+        
+        data = ''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8')
+        
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logging.warning(f"Não foi possível escrever no diário de trabalhos: {e}")
+    
+    def _terminate_last_line(self):
+        """Termina linha incompleta deixada por uma interrupção"""
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            complete = f.read(1) == b'\n'
+        
+        if not complete:
+            with open(self.path, 'ab') as f:
+                f.write(b'\n')
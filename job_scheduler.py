@@ -0,0 +1,111 @@
+"""
+job_scheduler.py
+Ordem de processamento do lote e estimativa do tempo restante
+"""
+
+import heapq
+import logging
+
+
+class JobScheduler:
+    """
+    Ordena os vídeos validados e acompanha o tempo restante do lote
+    
+    Com vários vídeos em simultâneo, começar pelos mais longos (LPT,
+    "longest processing time first") evita que uma gravação de horas fique
+    para o fim a correr sozinha com os restantes processos parados. A
+    estimativa usa o fator de tempo real do histórico, atualizado a cada
+    vídeo concluído: com poucos vídeos em falta simula a distribuição
+    pelos processos livres; com muitos, o limite inferior
+    max(mais longo, total / processos), mantido em tempo constante por
+    vídeo para lotes de centenas de milhares de ficheiros.
+    """
+    
+    # Vídeos em falta até aos quais a estimativa simula a distribuição
+    SIMULATE_JOBS = 256
+    
+    def __init__(self, durations, throughput, parallel=1, strategy='longest'):
+        """
+        Args:
+            durations (dict): Caminho do vídeo -> duração do áudio (segundos)
+            throughput (ThroughputHistory): Velocidade observada do perfil
+            parallel (int): Vídeos convertidos em simultâneo
+            strategy (str): longest (mais longos primeiro) ou name (alfabética)
+        """
+        self.durations = dict(durations)
+        self.throughput = throughput
+        self.parallel = max(1, parallel)
+        self.strategy = strategy
+        
+        if strategy == 'longest':
+            self._order = sorted(self.durations, key=lambda path: (-self.durations[path], path))
+        else:
+            self._order = sorted(self.durations)
+        
+        # Vídeos ainda não concluídos (pela ordem de processamento), soma das
+        # durações e heap dos mais longos (entradas concluídas saem ao consultar)
+        self._remaining = dict.fromkeys(self._order)
+        self._remaining_seconds = float(sum(self.durations.values()))
+        self._longest = [(-seconds, path) for path, seconds in self.durations.items()]
+        heapq.heapify(self._longest)
+        
+        logging.info(f"Ordem de processamento: {strategy} ({len(self._order)} vídeo(s))")
+    
+    def order(self):
+        """
+        Returns:
+            list: Caminhos dos vídeos pela ordem de processamento
+        """
+        return list(self._order)
+    
+    def complete(self, video_path):
+        """
+        Retira um vídeo concluído (com sucesso ou não) da estimativa
+        
+        Args:
+            video_path (str): Caminho do vídeo
+        """
+        if video_path in self._remaining:
+            del self._remaining[video_path]
+            self._remaining_seconds = max(0.0, self._remaining_seconds - self.durations[video_path])
+    
+    def eta(self):
+        """
+        Tempo estimado até ao fim do lote
+        
+        Returns:
+            float: Segundos ou None sem histórico de velocidade
+        """
+        factor = self.throughput.factor()
+        if not factor:
+            return None
+        
+        if len(self._remaining) <= self.SIMULATE_JOBS:
+            return _makespan([self.durations[path] / factor for path in self._remaining], self.parallel)
+        
+        while self._longest[0][1] not in self._remaining:
+            heapq.heappop(self._longest)
+        longest = -self._longest[0][0]
+        
+        return max(longest, self._remaining_seconds / self.parallel) / factor
+
+
+def _makespan(job_seconds, parallel):
+    """
+    Duração de uma lista de trabalhos distribuídos por ordem, cada um ao
+    primeiro processo livre
+    
+    Args:
+        job_seconds (list): Tempo de cada trabalho, pela ordem de entrega
+        parallel (int): Processos disponíveis
+    
+    Returns:
+        float: Tempo até ao fim do último trabalho
+    """
+    free_at = [0.0] * min(parallel, max(1, len(job_seconds)))
+    
+    for seconds in job_seconds:
+        start = heapq.heappop(free_at)
+        heapq.heappush(free_at, start + seconds)
+    
+    return max(free_at)
@@ -5,8 +5,15 @@ Orquestrador principal do sistema
 """
 
 import logging
+import argparse
+import itertools
 import os
+import signal
 import sys
+import threading
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 
@@ -15,25 +22,49 @@ from config_loader import ConfigLoader
 from file_manager import FileManager
 from video_processor import VideoProcessor
 from audio_converter import AudioConverter
+from conversion_cache import ConversionCache
+from folder_watcher import FolderWatcher
+from job_journal import JobJournal
+from job_scheduler import JobScheduler
+from preflight import Preflight
 from quality_analyzer import QualityAnalyzer
+from temp_workspace import TempWorkspace
+from stage_pipeline import StagePipeline
+from throughput_history import ThroughputHistory, format_duration
 
 
 class VideoToAudioConverter:
     """Conversor principal de vídeo para áudio"""
     
-    def __init__(self, config_path='config.ini'):
+    def __init__(self, config_path='config.ini', use_cache=True, resume=False):
         """
         Inicializa conversor
         
         Args:
             config_path (str): Caminho do arquivo de configuração
+            use_cache (bool): False para ignorar a cache de conversões
+            resume (bool): Continuar o lote interrompido (diário de trabalhos)
         """
         self.config_path = config_path
+        self.use_cache = use_cache
+        self.resume = resume
         self.config = None
         self.file_manager = None
         self.video_processor = None
         self.audio_converter = None
         self.quality_analyzer = None
+        self.workspace = None
+        self.cache = None
+        self.journal = None
+        self.throughput = None
+        self.scheduler = None
+        self.log_path = None
+        
+        # Instâncias por thread (etapas sobrepostas)
+        self._local = threading.local()
+        
+        # Resultados por vídeo (caminho, sucesso, tempo)
+        self.results = []
         
         # Estatísticas
         self.stats = {
@@ -63,13 +94,14 @@ class VideoToAudioConverter:
             
             # Inicializar módulos
             print("🔧 Inicializando módulos...")
-            self.file_manager = FileManager(self.config)
-            self.video_processor = VideoProcessor(self.config)
-            self.audio_converter = AudioConverter(self.config)
-            self.quality_analyzer = QualityAnalyzer(self.config)
+            self._init_modules()
             
             # Configurar pastas
             self.file_manager.setup_folders()
+            self.file_manager.cleanup_partial_outputs()
+            self.workspace.setup()
+            self.cache.setup()
+            self.throughput = ThroughputHistory.for_config(self.config)
             
             logging.info("Sistema inicializado com sucesso")
             print("✅ Sistema pronto!\n")
@@ -81,6 +113,19 @@ class VideoToAudioConverter:
             logging.error(f"Erro na inicialização: {str(e)}")
             return False
     
+    def _init_modules(self):
+        """Cria módulos de processamento a partir da configuração carregada"""
+        self.file_manager = FileManager(self.config)
+        self.video_processor = VideoProcessor(self.config)
+        self.audio_converter = AudioConverter(self.config)
+        self.quality_analyzer = QualityAnalyzer(self.config)
+        self.workspace = TempWorkspace(self.config)
+        self.cache = ConversionCache(self.config, self.use_cache)
+        self.journal = JobJournal(
+            os.path.join(self.config.get_log_folder(), self.config.get_journal_file()),
+            self.config.get_output_fingerprint()
+        )
+    
     def _setup_logging(self):
         """Configura sistema de logging"""
         log_level = getattr(logging, self.config.get_log_level())
@@ -98,15 +143,17 @@ class VideoToAudioConverter:
             log_name = log_file
         
         log_path = os.path.join(log_folder, log_name)
+        self.log_path = log_path
         
-        # Configurar logging
+        # Configurar logging (force: ConfigLoader já registou mensagens antes)
         logging.basicConfig(
             level=log_level,
             format='%(asctime)s - %(levelname)s - %(message)s',
             handlers=[
                 logging.FileHandler(log_path, encoding='utf-8'),
                 logging.StreamHandler()
-            ]
+            ],
+            force=True
         )
         
         logging.info("="*70)
@@ -115,130 +162,685 @@ class VideoToAudioConverter:
     
     def process_videos(self):
         """Processa todos os vídeos da pasta de entrada"""
-        print("🔍 Procurando vídeos MP4...\n")
+        extensions = ', '.join(ext[1:].upper() for ext in self.config.get_input_extensions())
+        print(f"🔍 Procurando vídeos ({extensions})...\n")
         
-        # Obter lista de vídeos
-        video_files = self.file_manager.get_video_files()
-        
-        if not video_files:
-            print("❌ Nenhum vídeo MP4 encontrado na pasta de entrada!")
-            logging.warning("Nenhum vídeo encontrado para processar")
-            return False
-        
-        print(f"📹 Encontrados {len(video_files)} vídeo(s)\n")
+        # Vídeos entregues ao processamento à medida que são encontrados
+        video_files = self.file_manager.iter_video_files()
         
         # Processar apenas o primeiro ou todos?
         if not self.config.get_process_all():
-            video_files = video_files[:1]
+            video_files = itertools.islice(video_files, 1)
             print("⚠️  Modo teste: processando apenas o primeiro vídeo\n")
         
+        # Retomar lote interrompido: saltar vídeos já concluídos
+        completed = self.journal.completed() if self.resume else {}
+        if self.resume:
+            print(f"↩️  Retomando lote: {len(completed)} vídeo(s) já concluído(s) serão saltados\n")
+        
+        self.journal.start_batch(resume=self.resume)
+        skipped = 0
+        
+        def discovered():
+            nonlocal skipped
+            for video_path in video_files:
+                if os.path.abspath(video_path) in completed:
+                    skipped += 1
+                    continue
+                self.journal.record(video_path, 'queued')
+                self.stats['total'] += 1
+                yield video_path
+        
         # Estatísticas
-        self.stats['total'] = len(video_files)
         self.stats['start_time'] = datetime.now()
         
-        # Processar cada vídeo
+        # Validar todos os vídeos antes de começar (ou processar à medida
+        # que são encontrados)
+        if self.config.get_preflight_enabled():
+            video_files = self._preflight(discovered())
+        else:
+            video_files = discovered()
+        
+        # Processar vídeos (etapas sobrepostas, vários processos ou sequencial)
+        workers = self.config.get_workers()
+        
+        if self.config.get_pipeline_enabled():
+            self._process_pipelined(video_files)
+        elif workers > 1:
+            self._process_parallel(video_files, workers)
+        else:
+            self._process_sequential(video_files)
+        
+        self.throughput.save()
+        
+        if self.stats['total'] == 0:
+            if skipped:
+                print("✅ Nada por processar")
+                return True
+            print("❌ Nenhum vídeo encontrado na pasta de entrada!")
+            logging.warning("Nenhum vídeo encontrado para processar")
+            return False
+        
+        if skipped:
+            print(f"↩️  Saltados (já concluídos): {skipped}")
+        
+        # Estatísticas finais
+        self.stats['end_time'] = datetime.now()
+        self._print_final_stats()
+        
+        return True
+    
+    def _preflight(self, video_files):
+        """
+        Valida todos os vídeos antes de começar o lote
+        
+        Os vídeos rejeitados contam como falhas; os restantes são ordenados
+        pelo JobScheduler (por omissão, mais longos primeiro), com a duração
+        total de áudio e o tempo estimado do lote.
+        
+        Args:
+            video_files (iterable): Caminhos dos vídeos
+            
+        Returns:
+            list: Vídeos válidos, pela ordem de processamento
+        """
+        start = time.time()
+        preflight = Preflight(self.file_manager, self.video_processor, self.config.get_preflight_workers())
+        valid, rejected = preflight.run(video_files)
+        
+        if not valid and not rejected:
+            return []
+        
+        total_audio = sum(duration for _, duration in valid)
+        print(f"🔎 Pré-validação: {len(valid) + len(rejected)} vídeo(s) em {time.time() - start:.1f}s")
+        print(f"   ✅ Válidos:        {len(valid)} ({format_duration(total_audio)} de áudio)")
+        
+        if rejected:
+            print(f"   ❌ Rejeitados:     {len(rejected)}")
+            for video_path, reason in rejected:
+                print(f"      - {os.path.basename(video_path)}: {reason}")
+                logging.error(f"Vídeo rejeitado na pré-validação: {video_path}: {reason}")
+                self.journal.record(video_path, 'failed')
+                self._record_result(video_path, False, 0.0)
+        
+        if not valid:
+            print()
+            return []
+        
+        self.scheduler = JobScheduler(
+            valid,
+            self.throughput,
+            parallel=self._parallel_jobs(),
+            strategy=self.config.get_schedule()
+        )
+        
+        eta = self.scheduler.eta()
+        if eta is None:
+            print("   ⏱️  Tempo estimado: indisponível (sem histórico para este perfil)")
+        else:
+            print(f"   ⏱️  Tempo estimado: ~{format_duration(eta)}")
+        if self.scheduler.strategy == 'longest' and len(valid) > 1:
+            print("   📏 Ordem: mais longos primeiro")
+        logging.info(f"Pré-validação: {len(valid)} válido(s), {total_audio:.1f}s de áudio, "
+                     f"estimativa {format_duration(eta) if eta is not None else 'indisponível'}")
+        
+        print()
+        return self.scheduler.order()
+    
+    def _eta_label(self):
+        """
+        Tempo restante do lote para as linhas de progresso
+        
+        Returns:
+            str: Ex: " · restam ~12m30s" ou "" sem estimativa
+        """
+        if self.scheduler is None:
+            return ""
+        eta = self.scheduler.eta()
+        if eta is None or eta < 1:
+            return ""
+        return f" · restam ~{format_duration(eta)}"
+    
+    def _parallel_jobs(self):
+        """Vídeos convertidos em simultâneo no modo de processamento configurado"""
+        if self.config.get_pipeline_enabled():
+            return self.config.get_stage_workers()[1]
+        return self.config.get_workers()
+    
+    def _process_sequential(self, video_files):
+        """
+        Processa vídeos um a um no processo atual
+        
+        Args:
+            video_files (iterable): Caminhos dos vídeos
+        """
+        total = _known_length(video_files)
+        
         for idx, video_path in enumerate(video_files, 1):
             print("="*70)
-            print(f"Processando {idx}/{len(video_files)}: {os.path.basename(video_path)}")
+            print(f"Processando {_progress_label(idx, total)[1:-1]}: {os.path.basename(video_path)}{self._eta_label()}")
             print("="*70 + "\n")
             
-            success = self._process_single_video(video_path)
-            
-            if success:
-                self.stats['success'] += 1
-            else:
-                self.stats['failed'] += 1
+            start = time.time()
+            job = self._process_single_video(video_path)
+            self._record_result(video_path, job['success'], time.time() - start, _throughput_sample(job))
             
             print()
+    
+    def _process_parallel(self, video_files, workers):
+        """
+        Distribui vídeos por um pool de processos
         
-        # Estatísticas finais
+        Cada processo trabalhador escreve apenas no ficheiro de log; a consola
+        recebe uma linha de progresso por vídeo concluído.
+        
+        Args:
+            video_files (list): Caminhos dos vídeos
+            workers (int): Número de processos
+        """
+        total = _known_length(video_files)
+        print(f"⚡ Modo paralelo: {workers} processos\n")
+        logging.info(f"Processamento paralelo: {total or 'vários'} vídeo(s), {workers} processos")
+        
+        lock = threading.Lock()
+        finished = 0
+        pending = set()
+        
+        def on_done(future, video_path):
+            nonlocal finished
+            
+            with lock:
+                pending.discard(future)
+            
+            # Cancelado pelo Ctrl+C: fica por processar (retomado na próxima execução)
+            if future.cancelled():
+                return
+            
+            try:
+                _, success, elapsed, sample = future.result()
+            except Exception as e:
+                # Processo trabalhador terminou de forma inesperada
+                logging.error(f"Erro no processo de {video_path}: {str(e)}")
+                success, elapsed, sample = False, 0.0, None
+            
+            with lock:
+                finished += 1
+                self._record_result(video_path, success, elapsed, sample)
+                
+                status = "✅" if success else "❌"
+                print(f"{status} {_progress_label(finished, total)} {os.path.basename(video_path)} "
+                      f"({elapsed:.1f}s){self._eta_label()}")
+        
+        # Vídeos submetidos à medida que são encontrados (ou chegam à pasta)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.config_path, self.log_path, self.config.get_log_level(), self.use_cache)
+        ) as executor:
+            try:
+                for video_path in video_files:
+                    future = executor.submit(_process_video_worker, video_path)
+                    with lock:
+                        pending.add(future)
+                    future.add_done_callback(lambda f, path=video_path: on_done(f, path))
+                
+                # Espera com intervalo para o Ctrl+C chegar ao processo principal
+                while True:
+                    with lock:
+                        running = list(pending)
+                    if not running:
+                        break
+                    wait(running, timeout=1)
+            except KeyboardInterrupt:
+                # Não esperar pelos vídeos em fila (modo contínuo ou lote longo);
+                # o shutdown implícito do 'with' repõe o pedido de cancelamento,
+                # por isso os futuros por começar são cancelados aqui
+                with lock:
+                    queued = list(pending)
+                for future in queued:
+                    future.cancel()
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    
+    def _process_pipelined(self, video_files):
+        """
+        Processa vídeos com etapas sobrepostas no processo atual
+        
+        Extração, conversão e análise correm em threads próprias, ligadas
+        por filas limitadas: enquanto um vídeo é convertido, o seguinte já
+        está a ser extraído e o anterior analisado. A consola recebe uma
+        linha por vídeo concluído; o detalhe fica no log.
+        
+        Args:
+            video_files (iterable): Caminhos dos vídeos
+        """
+        total = _known_length(video_files)
+        depth = self.config.get_pipeline_queue_depth()
+        extract_workers, convert_workers, analyze_workers = self.config.get_stage_workers()
+        
+        print(f"⚡ Modo em etapas: extração={extract_workers}, conversão={convert_workers}, "
+              f"análise={analyze_workers}, fila={depth}\n")
+        logging.info(f"Processamento em etapas: {total or 'vários'} vídeo(s), extração={extract_workers}, "
+                     f"conversão={convert_workers}, análise={analyze_workers}, fila={depth}")
+        
+        pipeline = StagePipeline(depth)
+        pipeline.add_stage('extracao', lambda job: self._run_stage(self._stage_extract, job), extract_workers)
+        pipeline.add_stage('conversao', lambda job: self._run_stage(self._stage_convert, job), convert_workers)
+        pipeline.add_stage('analise', lambda job: self._run_stage(self._stage_analyze, job), analyze_workers)
+        
+        console = sys.stdout
+        finished = 0
+        
+        def on_done(job):
+            nonlocal finished
+            finished += 1
+            self._finish_job(job)
+            elapsed = time.time() - job['start'] if job['start'] else 0.0
+            self._record_result(job['video'], job['success'], elapsed, _throughput_sample(job))
+            
+            status = "✅" if job['success'] else "❌"
+            print(f"{status} {_progress_label(finished, total)} {os.path.basename(job['video'])} "
+                  f"({elapsed:.1f}s){self._eta_label()}", file=console)
+        
+        # Mensagens detalhadas das etapas ficam fora da consola
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+            pipeline.run((self._create_job(video_path) for video_path in video_files), on_done)
+    
+    def watch_videos(self):
+        """
+        Modo contínuo: converte vídeos à medida que chegam à pasta de entrada
+        
+        Vídeos já presentes são processados primeiro. Cada vídeo novo entra
+        no modo de processamento configurado (etapas, processos ou
+        sequencial) assim que termina de ser escrito. Termina com Ctrl+C.
+        """
+        input_folder = self.config.get_input_folder()
+        watcher = FolderWatcher(
+            input_folder,
+            extensions=self.config.get_input_extensions(),
+            recursive=self.config.get_recursive(),
+            excluded=self.file_manager.excluded_folders(),
+            poll_interval=self.config.get_watch_poll_interval(),
+            stable_seconds=self.config.get_watch_stable_seconds()
+        )
+        
+        print(f"👀 A vigiar {input_folder} ({watcher.mode}). Ctrl+C para terminar\n")
+        logging.info(f"Modo contínuo: {input_folder} ({watcher.mode})")
+        
+        self.stats['start_time'] = datetime.now()
+        
+        completed = self.journal.completed() if self.resume else {}
+        self.journal.start_batch(resume=self.resume)
+        
+        def arrivals():
+            for video_path in watcher.watch():
+                if os.path.abspath(video_path) in completed:
+                    continue
+                self.journal.record(video_path, 'queued')
+                self.stats['total'] += 1
+                logging.info(f"Novo vídeo: {os.path.basename(video_path)}")
+                yield video_path
+        
+        workers = self.config.get_workers()
+        
+        try:
+            if self.config.get_pipeline_enabled():
+                self._process_pipelined(arrivals())
+            elif workers > 1:
+                self._process_parallel(arrivals(), workers)
+            else:
+                self._process_sequential(arrivals())
+        except KeyboardInterrupt:
+            print("\n⏹️  Vigilância terminada pelo utilizador")
+            logging.info("Modo contínuo terminado")
+        finally:
+            watcher.close()
+        
+        self.throughput.save()
         self.stats['end_time'] = datetime.now()
         self._print_final_stats()
+    
+    def _record_result(self, video_path, success, elapsed, sample=None):
+        """
+        Regista resultado de um vídeo nas estatísticas
         
-        return True
+        Args:
+            video_path (str): Caminho do vídeo
+            success (bool): Processado com sucesso?
+            elapsed (float): Tempo de processamento em segundos
+            sample (tuple): (segundos de áudio, segundos de trabalho) de uma
+                            conversão real, para o histórico de velocidade
+        """
+        self.results.append({
+            'video': video_path,
+            'success': success,
+            'elapsed': elapsed
+        })
+        
+        if success:
+            self.stats['success'] += 1
+            if sample:
+                self.throughput.record(*sample)
+        else:
+            self.stats['failed'] += 1
+        
+        if self.scheduler:
+            self.scheduler.complete(video_path)
     
     def _process_single_video(self, video_path):
         """
-        Processa um único vídeo
+        Processa um único vídeo (todas as etapas em sequência)
         
         Args:
             video_path (str): Caminho do vídeo
             
         Returns:
-            bool: True se processado com sucesso
+            dict: Estado final do trabalho (chave success)
         """
-        temp_audio_path = None
+        job = self._create_job(video_path)
         
         try:
-            # Validar ficheiro
-            if not self.file_manager.validate_input_file(video_path):
-                return False
+            for stage in (self._stage_extract, self._stage_convert, self._stage_analyze):
+                if not self._run_stage(stage, job):
+                    break
+        finally:
+            self._finish_job(job)
+        
+        return job
+    
+    def _create_job(self, video_path):
+        """
+        Cria registo de trabalho de um vídeo, passado entre as etapas
+        
+        Args:
+            video_path (str): Caminho do vídeo
             
-            # Gerar nome de saída
-            output_path = self.file_manager.generate_output_filename(video_path)
-            print(f"📤 Saída: {os.path.basename(output_path)}\n")
+        Returns:
+            dict: Estado do trabalho
+        """
+        return {
+            'video': video_path,
+            'output': None,
+            'partial': None,
+            'cache_key': None,
+            'job_dir': None,
+            'temp_audio': None,
+            'pipe': False,
+            'duration': 0,
+            'source_stats': None,
+            'output_stats': None,
+            'success': False,
+            'cached': False,
+            'start': None,
+            'busy': 0.0
+        }
+    
+    def _run_stage(self, stage, job):
+        """
+        Executa uma etapa tratando exceções como falha do vídeo
+        
+        Args:
+            stage (callable): Etapa (_stage_extract, _stage_convert, _stage_analyze)
+            job (dict): Estado do trabalho
             
-            # Caminho temporário para áudio WAV
-            temp_audio_path = os.path.join(
-                self.file_manager.output_folder,
-                '_temp_audio.wav'
-            )
+        Returns:
+            bool: True se o trabalho deve seguir para a etapa seguinte
+        """
+        stage_start = time.time()
+        if job['start'] is None:
+            job['start'] = stage_start
+        
+        try:
+            return stage(job)
+        except Exception as e:
+            print(f"\n❌ Erro no processamento: {str(e)}")
+            logging.error(f"Erro ao processar {job['video']}: {str(e)}")
+            job['success'] = False
+            return False
+        finally:
+            # Tempo efetivo nas etapas (sem espera nas filas)
+            job['busy'] += time.time() - stage_start
+    
+    def _finish_job(self, job):
+        """Remove ficheiros temporários e regista o resultado no diário"""
+        self.workspace.release(job['job_dir'])
+        job['job_dir'] = None
+        
+        # Saída incompleta de uma conversão que falhou
+        if job['partial'] and os.path.exists(job['partial']):
+            os.remove(job['partial'])
+        job['partial'] = None
+        
+        if not job.get('journaled'):
+            self.journal.record(job['video'], 'done' if job['success'] else 'failed', job['output'])
+            job['journaled'] = True
+    
+    def _write_output(self, job, write):
+        """
+        Escreve a saída num ficheiro temporário e publica-a com rename
+        
+        Um processo interrompido nunca deixa um áudio incompleto com o
+        nome final.
+        
+        Args:
+            job (dict): Estado do trabalho
+            write (callable): write(caminho) -> (sucesso, ...) escreve o áudio
             
-            # ETAPA 1: Extrair áudio do vídeo
-            print("🎬 [1/3] Extraindo áudio do vídeo...")
-            success, duration, message = self.video_processor.extract_audio(
-                video_path,
-                temp_audio_path
-            )
+        Returns:
+            tuple: Resultado de write
+        """
+        job['partial'] = self.file_manager.partial_output_path(job['output'])
+        result = write(job['partial'])
+        
+        if result[0]:
+            self.file_manager.commit_output(job['partial'], job['output'])
+            job['partial'] = None
+        
+        return result
+    
+    def _stage_extract(self, job):
+        """
+        Etapa 1: validação, atalhos e extração do áudio para WAV
+        
+        Args:
+            job (dict): Estado do trabalho
             
-            if not success:
-                print(f"❌ Falha na extração: {message}")
+        Returns:
+            bool: True se o trabalho segue para a conversão
+        """
+        video_path = job['video']
+        self.journal.record(video_path, 'extracting')
+        
+        # Validar ficheiro
+        if not self.file_manager.validate_input_file(video_path):
+            return False
+        
+        # Vídeo já convertido com as mesmas configurações?
+        job['cache_key'] = self.cache.key_for(video_path)
+        cached, linked = self.cache.restore(
+            job['cache_key'],
+            self.file_manager.get_base_output_filename(video_path),
+            lambda: self.file_manager.generate_output_filename(video_path)
+        )
+        if cached:
+            job['output'] = cached
+            if linked:
+                print(f"♻️  Reutilizado da cache: {os.path.basename(cached)}")
+            else:
+                print(f"♻️  Já convertido: {os.path.basename(cached)} (cache)")
+            logging.info(f"Vídeo em cache: {os.path.basename(video_path)}")
+            job['cached'] = True
+            job['success'] = True
+            return False
+        
+        # Gerar nome de saída
+        job['output'] = self.file_manager.generate_output_filename(video_path)
+        print(f"📤 Saída: {os.path.basename(job['output'])}\n")
+        
+        # Atalho: áudio de origem já corresponde à saída pedida
+        if self.audio_converter.stream_copy_allowed():
+            stream_info = self.video_processor.probe_audio_stream(video_path)
+            if self.audio_converter.can_stream_copy(stream_info):
+                job['success'] = self._stream_copy_video(job)
+                if job['success']:
+                    self.cache.store(job['cache_key'], job['output'], video_path)
                 return False
+        
+        # Conversão direta do vídeo, sem WAV temporário
+        if self.audio_converter.pipe_allowed():
+            job['pipe'] = True
+            return True
+        
+        # Pasta temporária exclusiva deste vídeo
+        job['job_dir'] = self.workspace.create_job()
+        job['temp_audio'] = os.path.join(job['job_dir'], 'audio.wav')
+        
+        print("🎬 [1/3] Extraindo áudio do vídeo...")
+        success, duration, message = self.video_processor.extract_audio(
+            video_path,
+            job['temp_audio']
+        )
+        
+        if not success:
+            print(f"❌ Falha na extração: {message}")
+            return False
+        
+        job['duration'] = duration
+        print(f"✅ Áudio extraído ({duration:.1f}s)\n")
+        
+        return True
+    
+    def _stage_convert(self, job):
+        """
+        Etapa 2: conversão, otimização e codificação do áudio
+        
+        Args:
+            job (dict): Estado do trabalho
             
-            print(f"✅ Áudio extraído ({duration:.1f}s)\n")
-            
-            # ETAPA 2: Converter e otimizar áudio
+        Returns:
+            bool: True se o trabalho segue para a análise
+        """
+        converter = self._thread_converter()
+        self.journal.record(job['video'], 'converting')
+        
+        # Cópia do áudio processado para as métricas de sinal da análise
+        reference = None
+        if self.quality_analyzer.needs_reference():
+            if job['job_dir'] is None:
+                job['job_dir'] = self.workspace.create_job()
+            reference = os.path.join(job['job_dir'], 'reference.pcm')
+        
+        if job['pipe']:
+            # Conversão direta do vídeo por pipe (sem WAV)
+            print("🎵 [1/2] Convertendo áudio diretamente do vídeo...")
+            success, duration, message = self._write_output(
+                job,
+                lambda path: converter.convert_media(job['video'], path, reference)
+            )
+            job['duration'] = duration
+            job['source_stats'] = converter.source_stats
+        else:
             print("🎵 [2/3] Convertendo e otimizando áudio...")
-            success, message = self.audio_converter.convert_audio(
-                temp_audio_path,
-                output_path
+            success, message = self._write_output(
+                job,
+                lambda path: converter.convert_audio(job['temp_audio'], path, reference)
             )
-            
-            if not success:
-                print(f"❌ Falha na conversão: {message}")
-                return False
-            
+            job['source_stats'] = converter.source_stats
+        
+        if not success:
+            print(f"❌ Falha na conversão: {message}")
+            return False
+        
+        job['output_stats'] = converter.output_stats
+        self.cache.store(job['cache_key'], job['output'], job['video'])
+        
+        if job['pipe']:
+            print(f"✅ Conversão concluída ({job['duration']:.1f}s)\n")
+        else:
             print(f"✅ Conversão concluída\n")
+        
+        return True
+    
+    def _stage_analyze(self, job):
+        """
+        Etapa 3: análise de qualidade do resultado
+        
+        Args:
+            job (dict): Estado do trabalho
             
-            # ETAPA 3: Análise de qualidade
-            print("📊 [3/3] Analisando qualidade...")
-            analysis = self.quality_analyzer.analyze_conversion(
-                temp_audio_path,
-                output_path,
-                duration
-            )
-            
-            if analysis:
-                self.quality_analyzer.print_summary(analysis)
-            
-            print("\n✅ Vídeo processado com sucesso!")
-            logging.info(f"Vídeo processado: {os.path.basename(video_path)}")
-            
-            return True
+        Returns:
+            bool: False (última etapa)
+        """
+        print(f"📊 {'[2/2]' if job['pipe'] else '[3/3]'} Analisando qualidade...")
+        analysis = self.quality_analyzer.analyze_conversion(
+            job['temp_audio'] or job['video'],
+            job['output'],
+            job['duration'],
+            original_stats=job['source_stats'],
+            converted_stats=job['output_stats']
+        )
+        
+        if analysis:
+            self.quality_analyzer.print_summary(analysis)
+        
+        # WAV temporário já não é necessário
+        self.workspace.release(job['job_dir'])
+        job['job_dir'] = None
+        
+        print("\n✅ Vídeo processado com sucesso!")
+        logging.info(f"Vídeo processado: {os.path.basename(job['video'])}")
+        
+        job['success'] = True
+        return False
+    
+    def _thread_converter(self):
+        """
+        Conversor de áudio da thread atual
+        
+        O AudioConverter guarda estado da última conversão; com etapas
+        sobrepostas, cada thread de conversão usa a sua instância.
+        
+        Returns:
+            AudioConverter: Conversor exclusivo da thread
+        """
+        if threading.current_thread() is threading.main_thread():
+            return self.audio_converter
+        
+        converter = getattr(self._local, 'converter', None)
+        if converter is None:
+            converter = self._local.converter = AudioConverter(self.config)
+        return converter
+    
+    def _stream_copy_video(self, job):
+        """
+        Copia a faixa de áudio do vídeo sem descodificar nem recodificar
+        
+        Args:
+            job (dict): Estado do trabalho (vídeo e caminho de saída)
             
-        except Exception as e:
-            print(f"\n❌ Erro no processamento: {str(e)}")
-            logging.error(f"Erro ao processar {video_path}: {str(e)}")
+        Returns:
+            bool: True se copiado com sucesso
+        """
+        video_path = job['video']
+        
+        print("⚡ [1/1] Áudio compatível com o perfil: cópia direta...")
+        success, duration, message = self._write_output(
+            job,
+            lambda path: self.video_processor.copy_audio_stream(
+                video_path,
+                path,
+                self.config.get_output_format()
+            )
+        )
+        
+        if not success:
+            print(f"❌ Falha na cópia: {message}")
             return False
         
-        finally:
-            # Remover arquivo temporário
-            if temp_audio_path and os.path.exists(temp_audio_path):
-                try:
-                    os.remove(temp_audio_path)
-                    logging.debug("Arquivo temporário removido")
-                except:
-                    pass
+        print(f"✅ Áudio copiado sem recodificação ({duration:.1f}s)")
+        logging.info(f"Vídeo processado (cópia direta): {os.path.basename(video_path)}")
+        
+        return True
     
     def _print_final_stats(self):
         """Imprime estatísticas finais"""
@@ -261,6 +863,12 @@ class VideoToAudioConverter:
             avg_time = duration / self.stats['success']
             print(f"⌛ Tempo médio/vídeo:     {avg_time:.1f}s")
         
+        failed = [r['video'] for r in self.results if not r['success']]
+        if failed:
+            print("\n❌ Vídeos com falha:")
+            for video_path in failed:
+                print(f"   - {os.path.basename(video_path)}")
+        
         print("\n" + "="*70)
         
         logging.info("="*70)
@@ -268,8 +876,117 @@ class VideoToAudioConverter:
         logging.info("="*70)
 
 
+def _known_length(video_files):
+    """Número de vídeos, ou None se chegarem aos poucos (gerador)"""
+    return len(video_files) if isinstance(video_files, (list, tuple)) else None
+
+
+def _throughput_sample(job):
+    """
+    Observação de velocidade de um trabalho concluído
+    
+    Returns:
+        tuple: (segundos de áudio, segundos de trabalho) ou None para
+               reutilizações da cache e trabalhos sem duração conhecida
+    """
+    if not job['success'] or job['cached'] or not job['duration']:
+        return None
+    return job['duration'], job['busy']
+
+
+def _progress_label(done, total):
+    """
+    Etiqueta de progresso
+    
+    Returns:
+        str: "[3/10]" ou "[3]" se o total não for conhecido
+    """
+    return f"[{done}/{total}]" if total else f"[{done}]"
+
+
+# Conversor usado por cada processo trabalhador do pool
+_worker_converter = None
+
+
+def _init_worker(config_path, log_path, log_level, use_cache):
+    """
+    Inicializa um processo trabalhador do pool
+    
+    Args:
+        config_path (str): Caminho do arquivo de configuração
+        log_path (str): Ficheiro de log partilhado com o processo principal
+        log_level (str): Nível de log
+        use_cache (bool): Usar a cache de conversões
+    """
+    global _worker_converter
+    
+    # A consola pertence ao processo principal, que também trata o Ctrl+C
+    # (cancela os vídeos em fila; os que estão a correr terminam normalmente)
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    
+    if log_path:
+        handler = logging.FileHandler(log_path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - [%(processName)s] %(message)s'
+        ))
+        root.addHandler(handler)
+    root.setLevel(getattr(logging, log_level))
+    
+    _worker_converter = VideoToAudioConverter(config_path, use_cache)
+    _worker_converter.config = ConfigLoader(config_path)
+    _worker_converter._init_modules()
+
+
+def _process_video_worker(video_path):
+    """
+    Processa um vídeo num processo trabalhador
+    
+    Args:
+        video_path (str): Caminho do vídeo
+        
+    Returns:
+        tuple: (caminho, sucesso, tempo em segundos, observação de velocidade)
+    """
+    start = time.time()
+    job = _worker_converter._process_single_video(video_path)
+    return video_path, job['success'], time.time() - start, _throughput_sample(job)
+
+
+def parse_args():
+    """
+    Lê opções da linha de comandos
+    
+    Returns:
+        argparse.Namespace: Opções
+    """
+    parser = argparse.ArgumentParser(description="Conversor de vídeo para áudio")
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="converter todos os vídeos, mesmo os já convertidos com as mesmas configurações"
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help="continuar o último lote interrompido, sem repetir vídeos já concluídos"
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help="continuar a vigiar a pasta de entrada e converter vídeos novos (Ctrl+C para terminar)"
+    )
+    return parser.parse_args()
+
+
 def main():
     """Função principal"""
+    args = parse_args()
+    
     try:
         # Verificar se config.ini existe
         if not os.path.exists('config.ini'):
@@ -278,13 +995,16 @@ def main():
             sys.exit(1)
         
         # Criar e inicializar conversor
-        converter = VideoToAudioConverter('config.ini')
+        converter = VideoToAudioConverter('config.ini', use_cache=not args.no_cache, resume=args.resume)
         
         if not converter.initialize():
             sys.exit(1)
         
-        # Processar vídeos
-        converter.process_videos()
+        # Processar vídeos (uma vez ou continuamente)
+        if args.watch:
+            converter.watch_videos()
+        else:
+            converter.process_videos()
         
         print("\n👋 Até breve!\n")
         
@@ -0,0 +1,489 @@
+"""
+media_probe.py
+Leitura de metadados multimédia (ffprobe) com cache em disco
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import struct
+import subprocess
+import threading
+
+from ffmpeg_utils import (
+    get_ffmpeg_exe, get_ffprobe_exe, last_error_line, parse_channel_layout, parse_duration
+)
+
+
+# Bits por amostra de cada formato de amostra do ffmpeg
+SAMPLE_FORMAT_BITS = {
+    'u8': 8, 'u8p': 8,
+    's16': 16, 's16p': 16,
+    's32': 32, 's32p': 32, 'flt': 32, 'fltp': 32,
+    's64': 64, 's64p': 64, 'dbl': 64, 'dblp': 64
+}
+
+# Bitrates (kbps) do MPEG Layer III por índice: MPEG-1 e MPEG-2/2.5
+MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+
+# Sample rates por versão MPEG (bits de versão do cabeçalho da frame)
+MP3_SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG-1
+    0b10: (22050, 24000, 16000),  # MPEG-2
+    0b00: (11025, 12000, 8000)    # MPEG-2.5
+}
+
+# Bytes lidos do início do MP3 à procura da primeira frame
+MP3_SCAN_BYTES = 64 * 1024
+
+# Metadados já lidos neste processo: (caminho, tamanho, mtime) -> registo
+_memory = {}
+_memory_lock = threading.Lock()
+
+
+class MediaProbe:
+    """
+    Lê metadados de ficheiros multimédia sem descodificar
+    
+    Usa ffprobe (uma execução por ficheiro) ou, na falta deste, o
+    cabeçalho impresso por "ffmpeg -i". Os registos ficam em cache em
+    memória e numa base SQLite, com chave caminho + tamanho + data de
+    modificação: um ficheiro alterado é sempre lido de novo.
+    
+    Registo:
+        duration (float): Duração do contentor em segundos (ou None)
+        container (str): Formato do contentor (ex: "mov,mp4,m4a,...")
+        bitrate_kbps (int): Bitrate total (ou None)
+        video (dict): codec, width, height, fps; None se não houver vídeo
+        audio (dict): codec, sample_rate, channels, bitrate_kbps,
+                      sample_width; None se não houver áudio
+    """
+    
+    def __init__(self, cache_path=None):
+        """
+        Args:
+            cache_path (str): Base SQLite da cache (None = só em memória)
+        """
+        self.cache_path = cache_path
+    
+    @classmethod
+    def for_config(cls, config):
+        """
+        Cria leitor com a cache definida na configuração
+        
+        Args:
+            config (ConfigLoader): Configuração carregada
+        
+        Returns:
+            MediaProbe: Leitor de metadados
+        """
+        name = config.get_probe_cache_file()
+        return cls(os.path.join(config.get_log_folder(), name) if name else None)
+    
+    def probe(self, path):
+        """
+        Retorna metadados de um ficheiro
+        
+        Args:
+            path (str): Caminho do ficheiro
+        
+        Returns:
+            dict: Registo de metadados ou None se não for legível
+        """
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logging.error(f"Não foi possível ler {path}: {e}")
+            return None
+        
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        
+        with _memory_lock:
+            if key in _memory:
+                return _memory[key]
+        
+        record = self._load(key)
+        if record is None:
+            record = self._run_probe(path)
+            if record is None:
+                return None
+            self._save(key, record)
+        
+        with _memory_lock:
+            _memory[key] = record
+        
+        return record
+    
+    def _run_probe(self, path):
+        """Lê metadados com ffprobe ou, na falta deste, com ffmpeg -i"""
+        ffprobe = get_ffprobe_exe()
+        
+        try:
+            if ffprobe:
+                return _probe_ffprobe(ffprobe, path)
+            return _probe_ffmpeg(path)
+        except Exception as e:
+            logging.error(f"Erro ao analisar {path}: {str(e)}")
+            return None
+    
+    def _connect(self):
+        """Abre a base da cache (criando a tabela se necessário)"""
+        connection = sqlite3.connect(self.cache_path, timeout=10)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, record TEXT)"
+        )
+        return connection
+    
+    def _load(self, key):
+        """Lê registo da cache em disco (None se ausente ou desatualizado)"""
+        if not self.cache_path:
+            return None
+        
+        try:
+            connection = self._connect()
+            try:
+                row = connection.execute(
+                    "SELECT record FROM probes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    key
+                ).fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logging.debug(f"Cache de metadados indisponível: {e}")
+            return None
+        
+        return json.loads(row[0]) if row else None
+    
+    def _save(self, key, record):
+        """Guarda registo na cache em disco (substitui versões antigas)"""
+        if not self.cache_path:
+            return
+        
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO probes (path, size, mtime_ns, record) VALUES (?, ?, ?, ?)",
+                        key + (json.dumps(record),)
+                    )
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logging.debug(f"Não foi possível guardar metadados em cache: {e}")
+
+
+def _probe_ffprobe(ffprobe, path):
+    """
+    Lê metadados com ffprobe (formato e todas as faixas numa só execução)
+    
+    Returns:
+        dict: Registo de metadados ou None se o ficheiro não for legível
+    """
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace'
+    )
+    
+    if result.returncode != 0:
+        logging.error(f"ffprobe não conseguiu ler {path}: {result.stderr.strip()}")
+        return None
+    
+    data = json.loads(result.stdout or '{}')
+    fmt = data.get('format', {})
+    streams = data.get('streams', [])
+    
+    video = next((s for s in streams if s.get('codec_type') == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    
+    record = {
+        'duration': _to_float(fmt.get('duration')),
+        'container': fmt.get('format_name'),
+        'bitrate_kbps': _to_kbps(fmt.get('bit_rate')),
+        'video': None,
+        'audio': None
+    }
+    
+    if video:
+        record['video'] = {
+            'codec': video.get('codec_name'),
+            'width': video.get('width'),
+            'height': video.get('height'),
+            'fps': _parse_rate(video.get('avg_frame_rate')) or _parse_rate(video.get('r_frame_rate'))
+        }
+    
+    if audio:
+        bits = audio.get('bits_per_raw_sample') or audio.get('bits_per_sample')
+        record['audio'] = {
+            'codec': audio.get('codec_name'),
+            'sample_rate': int(audio['sample_rate']) if audio.get('sample_rate') else None,
+            'channels': audio.get('channels'),
+            'bitrate_kbps': _to_kbps(audio.get('bit_rate')),
+            'sample_width': _sample_width(int(bits) if bits else 0, audio.get('sample_fmt'))
+        }
+    
+    return record
+
+
+def _probe_ffmpeg(path):
+    """
+    Lê metadados do cabeçalho impresso por "ffmpeg -i" (sem ffprobe)
+    
+    Returns:
+        dict: Registo de metadados ou None se o ficheiro não for legível
+    """
+    result = subprocess.run(
+        [get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-i', path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace'
+    )
+    stderr = result.stderr
+    
+    # Ex: Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'video.mp4':
+    container = re.search(r"Input #0, (.*?), from ", stderr)
+    if not container:
+        logging.error(f"ffmpeg não conseguiu ler {path}: {last_error_line(stderr)}")
+        return None
+    
+    bitrate = re.search(r'Duration:.*?bitrate:\s*(\d+) kb/s', stderr)
+    
+    record = {
+        'duration': parse_duration(stderr),
+        'container': container.group(1),
+        'bitrate_kbps': int(bitrate.group(1)) if bitrate else None,
+        'video': None,
+        'audio': None
+    }
+    
+    # Ex: Stream #0:0(und): Video: h264 (High) (avc1 / 0x31637661), yuv420p, 160x120 [SAR 1:1 DAR 4:3], 25 fps
+    video = re.search(r'Stream #\d+:\d+.*?: Video: (.*)', stderr)
+    if video and '(attached pic)' not in video.group(1):
+        line = video.group(1)
+        size = re.search(r'\b(\d{2,5})x(\d{2,5})\b', line)
+        fps = re.search(r'([\d.]+) fps', line) or re.search(r'([\d.]+) tbr', line)
+        record['video'] = {
+            'codec': line.split()[0].rstrip(','),
+            'width': int(size.group(1)) if size else None,
+            'height': int(size.group(2)) if size else None,
+            'fps': float(fps.group(1)) if fps else None
+        }
+    
+    # Ex: Stream #0:1(und): Audio: aac (LC) (mp4a / 0x6134706D), 44100 Hz, stereo, fltp, 128 kb/s
+    audio = re.search(r'Stream #\d+:\d+.*?: Audio: (.*)', stderr)
+    if audio:
+        fields = [field.strip() for field in audio.group(1).split(',')]
+        info = {
+            'codec': fields[0].split()[0],
+            'sample_rate': None,
+            'channels': None,
+            'bitrate_kbps': None,
+            'sample_width': None
+        }
+        sample_format = None
+        
+        for field in fields[1:]:
+            # Remover anotações como "(default)"
+            field = re.sub(r'\s*\(\w+\)$', '', field)
+            
+            if field.endswith(' Hz'):
+                info['sample_rate'] = int(field.split()[0])
+            elif field.endswith(' kb/s'):
+                info['bitrate_kbps'] = int(field.split()[0])
+            elif field.split(' ')[0] in SAMPLE_FORMAT_BITS:
+                sample_format = field.split(' ')[0]
+            elif info['channels'] is None:
+                info['channels'] = parse_channel_layout(field)
+        
+        # Bits reais das amostras PCM (ex: pcm_s24le); codecs comprimidos
+        # não têm resolução fixa
+        pcm = re.match(r'pcm_[su](\d+)', info['codec'])
+        info['sample_width'] = _sample_width(int(pcm.group(1)) if pcm else 0, sample_format if pcm else None)
+        record['audio'] = info
+    
+    return record
+
+
+def read_mp3_header(path):
+    """
+    Lê bitrate e duração de um MP3 pelo cabeçalho, sem descodificar
+    
+    Usa a tag Xing/Info (LAME) ou VBRI da primeira frame, que indica o
+    número de frames e de bytes do ficheiro; sem tag, o ficheiro é CBR e o
+    bitrate é o do cabeçalho da frame.
+    
+    Args:
+        path (str): Caminho do MP3
+    
+    Returns:
+        dict: bitrate_kbps, duration, sample_rate, channels, vbr; ou None
+              se não for um MP3 Layer III legível
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            head = f.read(10)
+            
+            # Saltar tag ID3v2 (tamanho "syncsafe": 7 bits por byte)
+            start = 0
+            if head[:3] == b'ID3' and len(head) == 10:
+                start = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+                if head[5] & 0x10:
+                    start += 10
+            
+            f.seek(start)
+            data = f.read(MP3_SCAN_BYTES)
+            
+            # Tag ID3v1 no fim (128 bytes)
+            f.seek(max(0, size - 128))
+            tail = 128 if f.read(3) == b'TAG' else 0
+    except OSError as e:
+        logging.debug(f"Não foi possível ler {path}: {e}")
+        return None
+    
+    for offset in range(len(data) - 4):
+        if data[offset] != 0xFF or (data[offset + 1] & 0xE0) != 0xE0:
+            continue
+        frame = _parse_mp3_frame(data, offset)
+        if frame:
+            break
+    else:
+        return None
+    
+    audio_bytes = size - start - offset - tail
+    frames, total_bytes, vbr = _read_vbr_tag(data, offset, frame)
+    
+    if frames:
+        # Os bytes da tag incluem a própria frame da tag, que não conta nas frames de áudio
+        duration = frames * frame['samples'] / float(frame['sample_rate'])
+        audio_bytes = (total_bytes or audio_bytes) - frame['length']
+        bitrate = audio_bytes * 8 / duration / 1000 if duration else frame['bitrate_kbps']
+    else:
+        bitrate = frame['bitrate_kbps']
+        duration = audio_bytes * 8 / (bitrate * 1000.0)
+    
+    return {
+        'bitrate_kbps': int(round(bitrate)),
+        'duration': duration,
+        'sample_rate': frame['sample_rate'],
+        'channels': frame['channels'],
+        'vbr': vbr
+    }
+
+
+def _parse_mp3_frame(data, offset):
+    """
+    Interpreta o cabeçalho de 4 bytes de uma frame MPEG Layer III
+    
+    Returns:
+        dict: mpeg1, bitrate_kbps, sample_rate, channels, samples,
+              length (bytes da frame); ou None
+    """
+    header, = struct.unpack_from('>I', data, offset)
+    version = (header >> 19) & 0b11
+    layer = (header >> 17) & 0b11
+    bitrate_index = (header >> 12) & 0b1111
+    rate_index = (header >> 10) & 0b11
+    
+    # Layer III (01), versão válida, índices não reservados
+    if layer != 0b01 or version == 0b01 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    
+    mpeg1 = version == 0b11
+    bitrate = MP3_BITRATES[1 if mpeg1 else 2][bitrate_index]
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    samples = 1152 if mpeg1 else 576
+    return {
+        'mpeg1': mpeg1,
+        'bitrate_kbps': bitrate,
+        'sample_rate': sample_rate,
+        'channels': 1 if (header >> 6) & 0b11 == 0b11 else 2,
+        'samples': samples,
+        'length': samples // 8 * bitrate * 1000 // sample_rate + ((header >> 9) & 0b1)
+    }
+
+
+def _read_vbr_tag(data, offset, frame):
+    """
+    Lê a tag Xing/Info ou VBRI da primeira frame
+    
+    Returns:
+        tuple: (número de frames, bytes de áudio, VBR); (None, None, False)
+               sem tag
+    """
+    # Tag Xing/Info logo após a "side information" da frame
+    if frame['mpeg1']:
+        side_info = 17 if frame['channels'] == 1 else 32
+    else:
+        side_info = 9 if frame['channels'] == 1 else 17
+    
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info') and len(data) >= xing + 16:
+        flags, = struct.unpack_from('>I', data, xing + 4)
+        position = xing + 8
+        frames = total_bytes = None
+        if flags & 0x1:
+            frames, = struct.unpack_from('>I', data, position)
+            position += 4
+        if flags & 0x2:
+            total_bytes, = struct.unpack_from('>I', data, position)
+        # "Info" é a mesma tag escrita pelo LAME em ficheiros CBR
+        return frames, total_bytes, data[xing:xing + 4] == b'Xing'
+    
+    # Tag VBRI (encoder Fraunhofer): 32 bytes após o cabeçalho
+    vbri = offset + 36
+    if data[vbri:vbri + 4] == b'VBRI' and len(data) >= vbri + 18:
+        total_bytes, frames = struct.unpack_from('>II', data, vbri + 10)
+        return frames, total_bytes, True
+    
+    return None, None, False
+
+
+def _sample_width(bits, sample_format):
+    """
+    Resolução das amostras em bits
+    
+    Codecs comprimidos (bits = 0) são descodificados para PCM de 16 bits,
+    como na análise original com pydub.
+    """
+    if bits:
+        return bits
+    if sample_format and not sample_format.startswith('flt') and sample_format in SAMPLE_FORMAT_BITS:
+        return SAMPLE_FORMAT_BITS[sample_format]
+    return 16
+
+
+def _parse_rate(value):
+    """Converte taxa do ffprobe (ex: "30000/1001") em float"""
+    if not value or value in ('0/0', '0'):
+        return None
+    numerator, _, denominator = value.partition('/')
+    try:
+        return round(float(numerator) / float(denominator or 1), 3)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _to_float(value):
+    """Converte texto em float (None se ausente)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_kbps(value):
+    """Converte bitrate em bps (texto) para kbps inteiros"""
+    bps = _to_float(value)
+    return int(round(bps / 1000)) if bps else None
@@ -0,0 +1,78 @@
+"""
+preflight.py
+Pré-validação do lote: lê os cabeçalhos de todos os vídeos em paralelo, sem descodificar
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Preflight:
+    """
+    Valida todos os vídeos antes do início do lote
+    
+    Cada vídeo é lido apenas ao nível do contentor (ffprobe ou ffmpeg -i,
+    via MediaProbe), por um pool de threads: o trabalho é quase todo
+    espera por processos externos e disco. Vídeos ilegíveis, truncados,
+    sem áudio ou com duração nula são rejeitados antes de qualquer
+    conversão. Os metadados ficam na cache do MediaProbe, pelo que as
+    etapas seguintes não voltam a ler os cabeçalhos.
+    """
+    
+    def __init__(self, file_manager, video_processor, workers=8):
+        """
+        Args:
+            file_manager (FileManager): Validação de caminho, extensão e tamanho
+            video_processor (VideoProcessor): Validação dos metadados
+            workers (int): Threads de leitura
+        """
+        self.file_manager = file_manager
+        self.video_processor = video_processor
+        self.workers = max(1, workers)
+    
+    def run(self, video_files):
+        """
+        Valida os vídeos
+        
+        Os vídeos são submetidos à medida que são encontrados, pelo que a
+        leitura dos cabeçalhos sobrepõe-se à procura na pasta de entrada.
+        
+        Args:
+            video_files (iterable): Caminhos dos vídeos
+        
+        Returns:
+            tuple: (válidos [(caminho, duração em segundos)],
+                    rejeitados [(caminho, motivo)]), pela ordem de entrada
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='prevalidacao') as executor:
+            futures = [executor.submit(self._check, video_path) for video_path in video_files]
+            results = [future.result() for future in futures]
+        
+        valid = [(video_path, duration) for video_path, duration, reason in results if reason is None]
+        rejected = [(video_path, reason) for video_path, _, reason in results if reason is not None]
+        
+        logging.info(f"Pré-validação: {len(valid)} válido(s), {len(rejected)} rejeitado(s)")
+        return valid, rejected
+    
+    def _check(self, video_path):
+        """
+        Valida um vídeo
+        
+        Returns:
+            tuple: (caminho, duração, motivo da rejeição ou None)
+        """
+        try:
+            if not self.file_manager.validate_input_file(video_path):
+                return video_path, 0.0, "Ficheiro inexistente, vazio ou com extensão não suportada"
+            
+            valid, message = self.video_processor.validate_video(video_path)
+            if not valid:
+                return video_path, 0.0, message
+            
+            record = self.video_processor.probe.probe(video_path)
+            return video_path, record['duration'], None
+        
+        except Exception as e:
+            logging.error(f"Erro na pré-validação de {os.path.basename(video_path)}: {str(e)}")
+            return video_path, 0.0, f"Erro na pré-validação: {str(e)}"
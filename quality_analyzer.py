@@ -5,7 +5,10 @@ Análise de qualidade de áudio antes e depois da conversão
 
 import logging
 import os
-from pydub import AudioSegment
+
+from audio_stream import PcmPipeSource, wav_info, wav_levels
+from media_probe import MediaProbe, read_mp3_header
+from signal_metrics import SignalMetrics
 
 
 class QualityAnalyzer:
@@ -15,15 +18,40 @@ class QualityAnalyzer:
         self.config = config
         self.enabled = config.get_quality_analysis_enabled()
         self.detailed = config.get_detailed_stats()
+        self.probe = MediaProbe.for_config(config)
+        self.signal_metrics = None
+        if self.enabled and config.get_signal_metrics_enabled():
+            self.signal_metrics = SignalMetrics(
+                window_seconds=config.get_metric_window_seconds(),
+                sample_windows=config.get_metric_windows()
+            )
     
-    def analyze_conversion(self, original_path, converted_path, video_duration):
+    def needs_reference(self):
+        """
+        Verifica se a conversão deve guardar o PCM processado
+        
+        Returns:
+            bool: True se as métricas de sinal estão ativas
+        """
+        return self.signal_metrics is not None
+    
+    def analyze_conversion(self, original_path, converted_path, video_duration, original_stats=None,
+                           converted_stats=None):
         """
         Analisa qualidade antes e depois da conversão
         
         Args:
-            original_path (str): Caminho do áudio original (WAV temporário)
-            converted_path (str): Caminho do áudio convertido (MP3)
+            original_path (str): Caminho do áudio original (WAV temporário,
+                                 ou o vídeo na conversão por pipe)
+            converted_path (str): Caminho do áudio convertido (MP3/M4A/AAC)
             video_duration (float): Duração do vídeo original em segundos
+            original_stats (dict): Estatísticas do original já calculadas
+                                   (conversão por pipe, sem WAV); se None,
+                                   são lidas de original_path
+            converted_stats (dict): Estatísticas medidas pelo conversor
+                                    (AudioConverter.output_stats); o
+                                    ficheiro convertido só é lido no
+                                    cabeçalho. Se None, é descodificado
             
         Returns:
             dict: Análise comparativa
@@ -34,19 +62,41 @@ class QualityAnalyzer:
         try:
             logging.info("Analisando qualidade do áudio...")
             
-            # Estatísticas do áudio original (WAV)
-            original_stats = self._get_audio_stats(original_path)
+            # Estatísticas do áudio original
+            if original_stats is None:
+                original_stats = self._get_audio_stats(original_path)
+            
+            # Estatísticas do áudio convertido
+            reference = None
+            if converted_stats is None:
+                converted_stats = self._get_audio_stats(converted_path)
+            else:
+                reference = converted_stats.get('reference')
+                converted_stats = self._complete_stats(converted_stats, converted_path)
             
-            # Estatísticas do áudio convertido (MP3)
-            converted_stats = self._get_audio_stats(converted_path)
+            # Comparação do sinal processado com o ficheiro final
+            signal = None
+            if self.signal_metrics and reference:
+                try:
+                    signal = self.signal_metrics.compare(
+                        reference['path'],
+                        reference['sample_rate'],
+                        reference['channels'],
+                        converted_path
+                    )
+                except Exception as e:
+                    logging.warning(f"Métricas de sinal indisponíveis: {str(e)}")
             
             # Análise comparativa
             analysis = {
                 'original': original_stats,
                 'converted': converted_stats,
                 'video_duration': video_duration,
+                'source': self._source_label(original_path),
+                'output_format': self.config.get_output_format().upper(),
                 'compression': self._calculate_compression(original_stats, converted_stats),
-                'quality_score': self._calculate_quality_score(converted_stats)
+                'signal': signal,
+                'quality_score': self.calculate_quality_score(converted_stats, signal)
             }
             
             # Log da análise
@@ -60,7 +110,11 @@ class QualityAnalyzer:
     
     def _get_audio_stats(self, audio_path):
         """
-        Obtém estatísticas detalhadas do áudio
+        Obtém estatísticas detalhadas do áudio medindo o sinal
+        
+        Um WAV PCM de 16 bits é lido diretamente em blocos; outros formatos
+        são descodificados em blocos (formato, sample rate e canais vêm dos
+        metadados). O áudio nunca é carregado por inteiro em memória.
         
         Args:
             audio_path (str): Caminho do áudio
@@ -68,23 +122,93 @@ class QualityAnalyzer:
         Returns:
             dict: Estatísticas
         """
-        audio = AudioSegment.from_file(audio_path)
+        info = wav_info(audio_path) if audio_path.lower().endswith('.wav') else None
+        
+        if info and info['sample_width'] == 2:
+            rate = info['sample_rate']
+            channels = info['channels']
+            sample_width = 16
+            meter = wav_levels(audio_path)
+        else:
+            record = self.probe.probe(audio_path)
+            if not record or not record['audio']:
+                raise ValueError(f"Sem faixa de áudio legível: {os.path.basename(audio_path)}")
+            
+            audio = record['audio']
+            rate = audio['sample_rate']
+            channels = audio['channels'] or 2
+            sample_width = audio['sample_width']
+            
+            # Níveis e duração exata da descodificação (frequência e canais nativos)
+            source = PcmPipeSource(audio_path, rate, channels, rate)
+            try:
+                source.consume()
+            finally:
+                source.close()
+            meter = source.meter
+        
+        duration = meter.frames / float(rate)
+        rms_dbfs, peak_dbfs = meter.levels()
         file_stats = os.stat(audio_path)
         
         stats = {
-            'duration': len(audio) / 1000.0,
-            'sample_rate': audio.frame_rate,
-            'channels': audio.channels,
-            'sample_width': audio.sample_width * 8,  # bits
-            'dBFS': round(audio.dBFS, 2),
-            'max_dBFS': round(audio.max_dBFS, 2),
+            'duration': duration,
+            'sample_rate': rate,
+            'channels': channels,
+            'sample_width': sample_width,
+            'dBFS': rms_dbfs,
+            'max_dBFS': peak_dbfs,
             'size_bytes': file_stats.st_size,
             'size_mb': round(file_stats.st_size / (1024 * 1024), 2),
-            'bitrate_kbps': self._estimate_bitrate(file_stats.st_size, len(audio) / 1000.0)
+            'bitrate_kbps': self._estimate_bitrate(file_stats.st_size, duration)
         }
         
         return stats
     
+    def _complete_stats(self, record, audio_path):
+        """
+        Completa as estatísticas medidas pelo conversor com os dados do ficheiro
+        
+        Apenas o tamanho e o cabeçalho são lidos (bitrate real da tag
+        Xing/Info nos MP3, metadados do contentor nos restantes formatos).
+        
+        Args:
+            record (dict): duration, sample_rate, channels, dBFS, max_dBFS
+            audio_path (str): Caminho do áudio convertido
+            
+        Returns:
+            dict: Estatísticas
+        """
+        file_stats = os.stat(audio_path)
+        
+        stats = {key: value for key, value in record.items() if key != 'reference'}
+        stats.setdefault('sample_width', 16)
+        stats['size_bytes'] = file_stats.st_size
+        stats['size_mb'] = round(file_stats.st_size / (1024 * 1024), 2)
+        stats['bitrate_kbps'] = self._read_bitrate(audio_path, file_stats.st_size, record['duration'])
+        
+        return stats
+    
+    def _read_bitrate(self, audio_path, size_bytes, duration_seconds):
+        """
+        Bitrate real do áudio convertido, lido do cabeçalho
+        
+        Returns:
+            int: Bitrate em kbps (estimado pelo tamanho se o cabeçalho não o indicar)
+        """
+        if audio_path.lower().endswith('.mp3'):
+            header = read_mp3_header(audio_path)
+            if header:
+                return header['bitrate_kbps']
+        else:
+            record = self.probe.probe(audio_path)
+            if record:
+                bitrate = (record['audio'] or {}).get('bitrate_kbps') or record['bitrate_kbps']
+                if bitrate:
+                    return bitrate
+        
+        return self._estimate_bitrate(size_bytes, duration_seconds)
+    
     def _estimate_bitrate(self, size_bytes, duration_seconds):
         """
         Estima bitrate do áudio
@@ -125,12 +249,18 @@ class QualityAnalyzer:
             'reduction_percent': round(reduction_percent, 1)
         }
     
-    def _calculate_quality_score(self, stats):
+    @staticmethod
+    def calculate_quality_score(stats, signal=None):
         """
         Calcula score de qualidade (0-100)
         
+        Também usado para prever o score de uma conversão antes de
+        codificar (perfil auto, ver BitrateSelector).
+        
         Args:
             stats (dict): Estatísticas do áudio
+            signal (dict): Métricas do sinal (SignalMetrics); se existirem,
+                           substituem os pontos do bitrate
             
         Returns:
             dict: Score e categoria
@@ -147,8 +277,10 @@ class QualityAnalyzer:
         else:
             score += 10
         
-        # Bitrate (max 40 pontos)
-        if stats['bitrate_kbps'] >= 320:
+        # Bitrate (max 40 pontos), ou fidelidade medida do sinal
+        if signal:
+            score += QualityAnalyzer._signal_points(signal)
+        elif stats['bitrate_kbps'] >= 320:
             score += 40
         elif stats['bitrate_kbps'] >= 256:
             score += 35
@@ -192,6 +324,58 @@ class QualityAnalyzer:
             'category': category
         }
     
+    @staticmethod
+    def _signal_points(signal):
+        """
+        Pontos de fidelidade do sinal (max 40)
+        
+        Args:
+            signal (dict): Métricas do sinal
+            
+        Returns:
+            int: Pontos
+        """
+        points = 0
+        
+        # Banda preservada pelo encoder (max 20 pontos)
+        reference_cutoff = signal['reference_cutoff_hz']
+        ratio = signal['cutoff_hz'] / reference_cutoff if reference_cutoff else 1.0
+        if ratio >= 0.95:
+            points += 20
+        elif ratio >= 0.85:
+            points += 16
+        elif ratio >= 0.7:
+            points += 12
+        elif ratio >= 0.5:
+            points += 8
+        else:
+            points += 4
+        
+        # SNR segmentado (max 20 pontos)
+        snr = signal['segmental_snr_db']
+        if snr is None:
+            snr = signal['snr_db'] if signal['snr_db'] is not None else 0.0
+        if snr >= 25:
+            points += 20
+        elif snr >= 20:
+            points += 17
+        elif snr >= 15:
+            points += 14
+        elif snr >= 10:
+            points += 10
+        elif snr >= 5:
+            points += 6
+        else:
+            points += 3
+        
+        # Saturação
+        if signal['clipped_ratio'] > 1e-3:
+            points -= 10
+        elif signal['clipped_ratio'] > 1e-4:
+            points -= 5
+        
+        return max(0, points)
+    
     def _log_analysis(self, analysis):
         """
         Log detalhado da análise
@@ -206,6 +390,8 @@ class QualityAnalyzer:
             logging.info(f"Compressão: {comp['reduction_percent']:.1f}% "
                         f"({comp['original_size_mb']}MB → {comp['converted_size_mb']}MB)")
             logging.info(f"Qualidade: {quality['category']} (score: {quality['score']}/100)")
+            if analysis['signal']:
+                logging.info(f"Sinal: {self._format_signal(analysis['signal'])}")
             return
         
         # Log detalhado
@@ -221,7 +407,7 @@ class QualityAnalyzer:
         logging.info(f"\n📹 VÍDEO ORIGINAL:")
         logging.info(f"   Duração: {self._format_duration(analysis['video_duration'])}")
         
-        logging.info(f"\n🎵 ÁUDIO EXTRAÍDO (WAV):")
+        logging.info(f"\n🎵 {analysis['source']}:")
         logging.info(f"   Duração:     {self._format_duration(original['duration'])}")
         logging.info(f"   Sample Rate: {original['sample_rate']} Hz")
         logging.info(f"   Canais:      {original['channels']} ({'Stereo' if original['channels'] == 2 else 'Mono'})")
@@ -230,7 +416,7 @@ class QualityAnalyzer:
         logging.info(f"   dBFS:        {original['dBFS']} (max: {original['max_dBFS']})")
         logging.info(f"   Tamanho:     {original['size_mb']} MB")
         
-        logging.info(f"\n🎧 ÁUDIO CONVERTIDO (MP3):")
+        logging.info(f"\n🎧 ÁUDIO CONVERTIDO ({analysis['output_format']}):")
         logging.info(f"   Duração:     {self._format_duration(converted['duration'])}")
         logging.info(f"   Sample Rate: {converted['sample_rate']} Hz")
         logging.info(f"   Canais:      {converted['channels']} ({'Stereo' if converted['channels'] == 2 else 'Mono'})")
@@ -244,12 +430,41 @@ class QualityAnalyzer:
         logging.info(f"   Tamanho final:     {comp['converted_size_mb']} MB")
         logging.info(f"   Redução:           {comp['reduction_mb']} MB ({comp['reduction_percent']:.1f}%)")
         
+        signal = analysis['signal']
+        if signal:
+            logging.info(f"\n🔬 SINAL ({signal['windows']} janela(s), {signal['analyzed_seconds']}s):")
+            logging.info(f"   SNR:         {signal['snr_db']} dB (segmentado: {signal['segmental_snr_db']} dB)")
+            logging.info(f"   Corte:       {signal['cutoff_hz']} Hz (origem: {signal['reference_cutoff_hz']} Hz)")
+            logging.info(f"   Largura:     {signal['bandwidth_hz']} Hz")
+            logging.info(f"   Saturação:   {signal['clipped_samples']} amostra(s) ({signal['clipped_ratio'] * 100:.4f}%)")
+        
         logging.info(f"\n⭐ QUALIDADE FINAL:")
         logging.info(f"   Score:      {quality['score']}/100")
         logging.info(f"   Categoria:  {quality['category']}")
         
         logging.info("\n" + "="*70)
     
+    @staticmethod
+    def _source_label(original_path):
+        """
+        Título do áudio original no log detalhado
+        
+        Args:
+            original_path (str): WAV temporário ou ficheiro descodificado por pipe
+            
+        Returns:
+            str: Ex: ÁUDIO EXTRAÍDO (WAV), ÁUDIO ORIGINAL (MKV, POR PIPE)
+        """
+        extension = os.path.splitext(original_path)[1].lstrip('.').upper()
+        if extension == 'WAV':
+            return "ÁUDIO EXTRAÍDO (WAV)"
+        return f"ÁUDIO ORIGINAL ({extension or 'VÍDEO'}, POR PIPE)"
+    
+    def _format_signal(self, signal):
+        """Resumo das métricas do sinal numa linha"""
+        return (f"SNR seg. {signal['segmental_snr_db']} dB, corte {signal['cutoff_hz'] / 1000:.1f} kHz "
+                f"(origem {signal['reference_cutoff_hz'] / 1000:.1f} kHz), {signal['clipped_samples']} saturada(s)")
+    
     def _format_duration(self, seconds):
         """Formata duração"""
         hours = int(seconds // 3600)
@@ -279,5 +494,7 @@ class QualityAnalyzer:
         print("="*70)
         print(f"\n📦 Compressão: {comp['original_size_mb']}MB → {comp['converted_size_mb']}MB "
               f"({comp['reduction_percent']:.1f}% redução)")
+        if analysis['signal']:
+            print(f"🔬 Sinal:      {self._format_signal(analysis['signal'])}")
         print(f"⭐ Qualidade:  {quality['category']} ({quality['score']}/100)")
         print("\n" + "="*70)
@@ -0,0 +1,299 @@
+"""
+signal_metrics.py
+Métricas objetivas de qualidade: comparação do PCM processado com o áudio codificado
+"""
+
+import logging
+import math
+
+import numpy as np
+
+from audio_stream import PCM16_SCALE, PcmPipeSource
+from dsp import spectral_cutoff
+
+
+class SignalMetrics:
+    """
+    Compara o sinal enviado ao encoder (referência) com o ficheiro final descodificado
+    
+    A comparação é feita por janelas: em cada janela o áudio descodificado
+    é alinhado com a referência (correlação cruzada, para compensar o
+    atraso do encoder ou um seek impreciso) e são acumulados o erro, o
+    espectro médio (STFT vetorizada) e as amostras saturadas. A memória
+    usada é a de uma janela, independentemente da duração do áudio.
+    
+    Com sample_windows > 0 apenas N janelas distribuídas pelo ficheiro são
+    descodificadas (seek do ffmpeg), o que mantém o custo constante em
+    ficheiros longos.
+    """
+    
+    # Tamanho e avanço das frames da STFT
+    FFT_SIZE = 2048
+    HOP = 1024
+    
+    # Duração das frames do SNR segmentado e intervalo de valores admitido
+    SEGMENT_MS = 20
+    SEGMENT_SNR_RANGE = (-10.0, 35.0)
+    
+    # Frames da referência abaixo deste nível não contam no SNR segmentado
+    SILENCE_DBFS = -50.0
+    
+    # Frequência de corte: última frequência com energia acima de
+    # (máximo do espectro + CUTOFF_DB)
+    CUTOFF_DB = -80.0
+    
+    # Margem de alinhamento em cada lado da janela (segundos)
+    ALIGN_SECONDS = 0.05
+    
+    def __init__(self, window_seconds=2.0, sample_windows=0):
+        """
+        Args:
+            window_seconds (float): Duração de cada janela de comparação
+            sample_windows (int): Janelas analisadas por ficheiro (0 = todas)
+        """
+        self.window_seconds = max(0.1, window_seconds)
+        self.sample_windows = max(0, sample_windows)
+        self._hann = np.hanning(self.FFT_SIZE).astype(np.float32)
+    
+    def compare(self, reference_path, sample_rate, channels, encoded_path):
+        """
+        Calcula as métricas
+        
+        Args:
+            reference_path (str): PCM 16 bits intercalado enviado ao encoder
+            sample_rate (int): Sample rate da referência
+            channels (int): Canais da referência
+            encoded_path (str): Ficheiro codificado (MP3, M4A, AAC)
+        
+        Returns:
+            dict: snr_db, segmental_snr_db, bandwidth_hz, cutoff_hz,
+                  reference_cutoff_hz, clipped_samples, clipped_ratio,
+                  windows, analyzed_seconds; None se não houver áudio
+        """
+        reference = np.memmap(reference_path, dtype='<i2', mode='r')
+        reference = reference[:reference.size - reference.size % channels].reshape(-1, channels)
+        total = reference.shape[0]
+        
+        window = int(self.window_seconds * sample_rate)
+        margin = int(self.ALIGN_SECONDS * sample_rate)
+        if total < self.FFT_SIZE:
+            return None
+        
+        accumulator = _Accumulator(self.FFT_SIZE // 2 + 1, sample_rate, self.SEGMENT_MS)
+        
+        if self.sample_windows and total > self.sample_windows * window:
+            starts = np.linspace(0, total - window, self.sample_windows).astype(int)
+            for start in starts:
+                decoded = self._decode_range(encoded_path, sample_rate, channels,
+                                             start - margin, window + 2 * margin)
+                self._compare_window(reference[start:start + window], decoded, margin, accumulator,
+                                     pad=max(0, margin - start))
+        else:
+            self._compare_sequential(reference, encoded_path, sample_rate, channels,
+                                     window, margin, accumulator)
+        
+        result = accumulator.result(self.CUTOFF_DB)
+        logging.debug(f"Métricas de sinal: {result}")
+        return result
+    
+    def _decode_range(self, encoded_path, sample_rate, channels, start, frames):
+        """Descodifica um intervalo do ficheiro codificado (seek do ffmpeg)"""
+        start_seconds = max(0, start) / float(sample_rate)
+        source = PcmPipeSource(encoded_path, sample_rate, channels, frames,
+                               start_seconds=start_seconds,
+                               duration_seconds=frames / float(sample_rate))
+        try:
+            blocks = [block for block in source.read_blocks(0, frames)]
+        finally:
+            source.close()
+        
+        if not blocks:
+            return np.zeros((0, channels), dtype=np.float32)
+        return np.concatenate(blocks)
+    
+    def _compare_sequential(self, reference, encoded_path, sample_rate, channels, window, margin, accumulator):
+        """Compara o ficheiro completo, janela a janela, numa só descodificação"""
+        source = PcmPipeSource(encoded_path, sample_rate, channels, window)
+        buffer = np.zeros((0, channels), dtype=np.float32)
+        # Frame da descodificação correspondente a buffer[0]
+        offset = 0
+        total = reference.shape[0]
+        
+        try:
+            blocks = source.read_blocks()
+            for start in range(0, total, window):
+                end = min(start + window, total)
+                
+                # Descodificado suficiente para a janela e a margem seguinte
+                while offset + buffer.shape[0] < end + margin:
+                    block = next(blocks, None)
+                    if block is None:
+                        break
+                    buffer = np.concatenate([buffer, block])
+                
+                first = max(0, start - margin)
+                decoded = buffer[first - offset:end + margin - offset]
+                self._compare_window(reference[start:end], decoded, margin, accumulator,
+                                     pad=margin - (start - first))
+                
+                # Manter apenas a margem anterior à janela seguinte
+                keep = max(0, end - margin)
+                buffer = buffer[keep - offset:]
+                offset = keep
+        finally:
+            source.close()
+    
+    def _compare_window(self, reference, decoded, margin, accumulator, pad=0):
+        """
+        Alinha uma janela descodificada com a referência e acumula as métricas
+        
+        Args:
+            reference (numpy.ndarray): Referência int16 (frames, canais)
+            decoded (numpy.ndarray): Descodificado float32 com margem
+                                     antes e depois da janela
+            margin (int): Margem pedida em cada lado (frames)
+            accumulator (_Accumulator): Totais do ficheiro
+            pad (int): Frames em falta antes do início (janela no início)
+        """
+        frames = reference.shape[0]
+        if frames < self.FFT_SIZE:
+            return
+        
+        if pad:
+            decoded = np.concatenate([np.zeros((pad, decoded.shape[1]), dtype=np.float32), decoded])
+        
+        reference = reference.astype(np.float32) / PCM16_SCALE
+        lag = _best_lag(reference.mean(axis=1), decoded.mean(axis=1), 2 * margin)
+        aligned = decoded[lag:lag + frames]
+        if aligned.shape[0] < frames:
+            # Fim do ficheiro codificado (ex: descodificação truncada)
+            frames = aligned.shape[0]
+            reference = reference[:frames]
+            if frames < self.FFT_SIZE:
+                return
+        
+        accumulator.add_error(reference, aligned)
+        accumulator.add_spectra(self._power_spectrum(reference), self._power_spectrum(aligned))
+        accumulator.clipped += int(np.count_nonzero(np.abs(aligned) >= (PCM16_SCALE - 1) / PCM16_SCALE))
+        accumulator.samples += aligned.size
+        accumulator.windows += 1
+    
+    def _power_spectrum(self, block):
+        """
+        Soma das potências das frames da STFT (mistura mono)
+        
+        Returns:
+            tuple: (soma das potências por frequência, número de frames)
+        """
+        mono = block.mean(axis=1)
+        frames = np.lib.stride_tricks.sliding_window_view(mono, self.FFT_SIZE)[::self.HOP]
+        spectrum = np.fft.rfft(frames * self._hann, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        return power.sum(axis=0), power.shape[0]
+
+
+class _Accumulator:
+    """Totais da comparação de um ficheiro"""
+    
+    def __init__(self, bins, sample_rate, segment_ms):
+        self.sample_rate = sample_rate
+        self.segment = max(1, sample_rate * segment_ms // 1000)
+        self.frequencies = np.fft.rfftfreq((bins - 1) * 2, 1.0 / sample_rate)
+        self.reference_power = np.zeros(bins)
+        self.encoded_power = np.zeros(bins)
+        self.stft_frames = 0
+        self.signal_energy = 0.0
+        self.noise_energy = 0.0
+        self.segment_snr_sum = 0.0
+        self.segment_count = 0
+        self.clipped = 0
+        self.samples = 0
+        self.windows = 0
+        self.frames = 0
+    
+    def add_error(self, reference, aligned):
+        """Acumula energia do sinal e do erro (SNR e SNR segmentado)"""
+        error = aligned - reference
+        self.signal_energy += float(np.einsum('ij,ij->', reference, reference, dtype=np.float64))
+        self.noise_energy += float(np.einsum('ij,ij->', error, error, dtype=np.float64))
+        self.frames += reference.shape[0]
+        
+        # SNR por segmento de 20 ms (apenas segmentos com sinal)
+        count = reference.shape[0] // self.segment
+        if count == 0:
+            return
+        shape = (count, self.segment * reference.shape[1])
+        signal = np.square(reference[:count * self.segment].reshape(shape), dtype=np.float64).mean(axis=1)
+        noise = np.square(error[:count * self.segment].reshape(shape), dtype=np.float64).mean(axis=1)
+        
+        active = signal > 10 ** (SignalMetrics.SILENCE_DBFS / 10.0)
+        if not np.any(active):
+            return
+        snr = 10 * np.log10(signal[active] / np.maximum(noise[active], 1e-20))
+        low, high = SignalMetrics.SEGMENT_SNR_RANGE
+        self.segment_snr_sum += float(np.clip(snr, low, high).sum())
+        self.segment_count += int(snr.size)
+    
+    def add_spectra(self, reference, encoded):
+        """Acumula espectros de potência (referência e codificado)"""
+        self.reference_power += reference[0]
+        self.encoded_power += encoded[0]
+        self.stft_frames += encoded[1]
+    
+    def result(self, cutoff_db):
+        """
+        Métricas finais
+        
+        Returns:
+            dict: Métricas ou None se nenhuma janela foi comparada
+        """
+        if not self.windows or not self.stft_frames:
+            return None
+        
+        snr = None
+        if self.noise_energy > 0 and self.signal_energy > 0:
+            snr = round(10 * math.log10(self.signal_energy / self.noise_energy), 2)
+        elif self.signal_energy > 0:
+            snr = float('inf')
+        
+        encoded = self.encoded_power / self.stft_frames
+        total = encoded.sum()
+        bandwidth = 0.0
+        if total > 0:
+            centroid = (self.frequencies * encoded).sum() / total
+            bandwidth = math.sqrt(((self.frequencies - centroid) ** 2 * encoded).sum() / total)
+        
+        return {
+            'snr_db': snr,
+            'segmental_snr_db': round(self.segment_snr_sum / self.segment_count, 2) if self.segment_count else None,
+            'bandwidth_hz': int(round(bandwidth)),
+            'cutoff_hz': spectral_cutoff(self.frequencies, encoded, cutoff_db),
+            'reference_cutoff_hz': spectral_cutoff(self.frequencies, self.reference_power / self.stft_frames, cutoff_db),
+            'clipped_samples': self.clipped,
+            'clipped_ratio': self.clipped / float(self.samples) if self.samples else 0.0,
+            'windows': self.windows,
+            'analyzed_seconds': round(self.frames / float(self.sample_rate), 2)
+        }
+
+
+def _best_lag(reference, decoded, max_lag):
+    """
+    Atraso do descodificado em relação à referência (correlação cruzada por FFT)
+    
+    Args:
+        reference (numpy.ndarray): Referência mono
+        decoded (numpy.ndarray): Descodificado mono com max_lag frames extra
+        max_lag (int): Maior atraso procurado
+    
+    Returns:
+        int: Atraso em frames, entre 0 e max_lag
+    """
+    max_lag = min(max_lag, max(0, decoded.shape[0] - reference.shape[0]))
+    if max_lag == 0 or not np.any(reference):
+        # Sem sinal para alinhar: assumir margens iguais
+        return max_lag // 2
+    
+    size = 1 << int(math.ceil(math.log2(reference.shape[0] + decoded.shape[0])))
+    correlation = np.fft.irfft(np.fft.rfft(decoded, size) * np.conj(np.fft.rfft(reference, size)), size)
+    return int(np.argmax(correlation[:max_lag + 1]))
+
@@ -0,0 +1,127 @@
+"""
+stage_pipeline.py
+Execução sobreposta de etapas: cada etapa tem as suas threads e filas limitadas
+"""
+
+import logging
+import queue
+import threading
+
+
+# Marca de fim enviada a cada thread das etapas
+_STOP = object()
+
+
+class StagePipeline:
+    """
+    Encadeia etapas com filas de tamanho limitado entre elas
+    
+    Enquanto um trabalho está numa etapa, os seguintes podem já estar nas
+    etapas anteriores. Cada etapa recebe o trabalho (dict) e devolve True
+    para o passar à etapa seguinte, ou False se terminou (falha ou concluído).
+    """
+    
+    def __init__(self, queue_depth=2):
+        """
+        Args:
+            queue_depth (int): Trabalhos em espera antes de cada etapa
+        """
+        self.queue_depth = max(1, queue_depth)
+        self.stages = []
+    
+    def add_stage(self, name, handler, workers=1):
+        """
+        Acrescenta uma etapa ao fim da sequência
+        
+        Args:
+            name (str): Nome da etapa (threads e log)
+            handler (callable): handler(trabalho) -> bool
+            workers (int): Threads dedicadas à etapa
+        """
+        self.stages.append((name, handler, max(1, workers)))
+    
+    def run(self, jobs, on_done):
+        """
+        Processa todos os trabalhos e aguarda o fim
+        
+        Args:
+            jobs (iterable): Trabalhos (dict) pela ordem de entrada; pode ser
+                             um gerador (ex: vídeos a chegar à pasta)
+            on_done (callable): Chamado na thread atual para cada trabalho
+                                que sai da sequência, pela ordem de conclusão
+        """
+        inboxes = [queue.Queue(maxsize=self.queue_depth) for _ in self.stages]
+        done = queue.Queue()
+        threads = []
+        
+        for index, (name, _, workers) in enumerate(self.stages):
+            for number in range(workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(index, inboxes, done),
+                    name=f"{name}-{number + 1}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+        
+        # Alimentação numa thread própria: a primeira fila também é limitada;
+        # no fim envia o número de trabalhos entregues
+        def feed():
+            count = 0
+            try:
+                for job in jobs:
+                    inboxes[0].put(job)
+                    count += 1
+            finally:
+                done.put((_STOP, count))
+        
+        feeder = threading.Thread(target=feed, name='entrada', daemon=True)
+        feeder.start()
+        
+        finished = 0
+        total = None
+        while total is None or finished < total:
+            item = done.get()
+            if isinstance(item, tuple) and item[0] is _STOP:
+                total = item[1]
+                continue
+            on_done(item)
+            finished += 1
+        
+        # Todos os trabalhos terminaram: as filas estão vazias
+        feeder.join()
+        for index, (_, _, workers) in enumerate(self.stages):
+            for _ in range(workers):
+                inboxes[index].put(_STOP)
+        for thread in threads:
+            thread.join()
+    
+    def _worker(self, index, inboxes, done):
+        """
+        Ciclo de uma thread de etapa
+        
+        Args:
+            index (int): Posição da etapa
+            inboxes (list): Filas de entrada de cada etapa
+            done (queue.Queue): Trabalhos terminados
+        """
+        name, handler, _ = self.stages[index]
+        last = index == len(self.stages) - 1
+        
+        while True:
+            job = inboxes[index].get()
+            if job is _STOP:
+                break
+            
+            try:
+                proceed = handler(job)
+            except Exception as e:
+                logging.error(f"Erro na etapa {name}: {str(e)}")
+                job['success'] = False
+                proceed = False
+            
+            if proceed and not last:
+                inboxes[index + 1].put(job)
+            else:
+                done.put(job)
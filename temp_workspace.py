@@ -0,0 +1,138 @@
+"""
+temp_workspace.py
+Pastas temporárias isoladas por tarefa de conversão
+"""
+
+import logging
+import os
+import shutil
+import socket
+import uuid
+from pathlib import Path
+
+
+class TempWorkspace:
+    """Gere pastas temporárias únicas para cada vídeo em processamento"""
+    
+    # Subpasta criada dentro de temp_folder
+    ROOT_NAME = '_temp_conversor'
+    
+    def __init__(self, config):
+        self.config = config
+        self.root = os.path.join(config.get_temp_folder(), self.ROOT_NAME)
+        self.hostname = socket.gethostname()
+    
+    def setup(self):
+        """Cria pasta raiz e remove restos de execuções interrompidas"""
+        Path(self.root).mkdir(parents=True, exist_ok=True)
+        self.cleanup_orphans()
+        logging.info(f"Pasta temporária: {self.root}")
+    
+    def create_job(self):
+        """
+        Cria pasta temporária exclusiva para uma tarefa
+        
+        O nome inclui máquina e PID do processo dono, o que permite
+        distinguir tarefas ativas de restos de execuções que falharam.
+        
+        Returns:
+            str: Caminho da pasta criada
+        """
+        name = f"{self.hostname}.{os.getpid()}.{uuid.uuid4().hex[:12]}"
+        job_dir = os.path.join(self.root, name)
+        Path(job_dir).mkdir(parents=True)
+        logging.debug(f"Pasta temporária criada: {job_dir}")
+        return job_dir
+    
+    def release(self, job_dir):
+        """
+        Remove pasta temporária de uma tarefa
+        
+        Args:
+            job_dir (str): Caminho devolvido por create_job
+        """
+        if job_dir and os.path.exists(job_dir):
+            shutil.rmtree(job_dir, ignore_errors=True)
+            logging.debug("Pasta temporária removida")
+    
+    def cleanup_orphans(self):
+        """
+        Remove pastas de tarefas cujo processo já não existe
+        
+        Returns:
+            int: Número de pastas removidas
+        """
+        removed = 0
+        
+        if not os.path.exists(self.root):
+            return removed
+        
+        for entry in os.scandir(self.root):
+            owner = self._parse_owner(entry.name)
+            
+            # Ignorar ficheiros desconhecidos e tarefas de outras máquinas
+            if owner is None or owner[0] != self.hostname:
+                continue
+            
+            if process_alive(owner[1]):
+                continue
+            
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+                removed += 1
+            except OSError as e:
+                logging.warning(f"Não foi possível remover temporário órfão {entry.path}: {e}")
+        
+        if removed:
+            logging.info(f"Temporários órfãos removidos: {removed}")
+        
+        return removed
+    
+    def _parse_owner(self, name):
+        """
+        Extrai (máquina, PID) do nome de uma pasta de tarefa
+        
+        Returns:
+            tuple: (máquina, pid) ou None se o nome não for reconhecido
+        """
+        parts = name.rsplit('.', 2)
+        if len(parts) != 3 or not parts[1].isdigit():
+            return None
+        return parts[0], int(parts[1])
+
+
+def process_alive(pid):
+    """
+    Verifica se um processo local ainda está em execução
+    
+    Args:
+        pid (int): Identificador do processo
+    
+    Returns:
+        bool: True se o processo existe
+    """
+    if pid == os.getpid():
+        return True
+    
+    if os.name == 'nt':
+        import ctypes
+        
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Processo existe mas pertence a outro utilizador
+        return True
+    
+    return True
@@ -0,0 +1,115 @@
+"""
+test_conversion_cache.py
+Testes da cache de conversões (chave, reutilização, limite de tamanho, índice corrompido)
+"""
+
+import configparser
+import itertools
+import os
+
+import conversion_cache
+from config_loader import ConfigLoader
+from conversion_cache import EVICT_TARGET, ConversionCache
+
+
+def _config(tmp_path, name='config.ini', max_size_mb=2048, profile='media'):
+    """config.ini do projeto com a cache numa pasta temporária"""
+    parser = configparser.ConfigParser()
+    parser.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'), encoding='utf-8')
+    parser['PATHS']['input_folder'] = str(tmp_path / 'entrada')
+    parser['PATHS']['output_folder'] = str(tmp_path / 'saida')
+    parser['PROFILE']['active_profile'] = profile
+    parser['CACHE']['enabled'] = 'true'
+    parser['CACHE']['folder'] = str(tmp_path / 'cache')
+    parser['CACHE']['max_size_mb'] = str(max_size_mb)
+    
+    path = tmp_path / name
+    with open(path, 'w', encoding='utf-8') as f:
+        parser.write(f)
+    return ConfigLoader(str(path))
+
+
+def _cache(config):
+    """Cache com as pastas criadas"""
+    cache = ConversionCache(config)
+    cache.setup()
+    return cache
+
+
+def _write(path, size, fill=b'x'):
+    """Ficheiro com size bytes (vídeo ou áudio de teste)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(fill * size)
+    return str(path)
+
+
+def test_key_changes_with_settings(tmp_path):
+    """O mesmo vídeo tem outra chave quando as configurações da saída mudam"""
+    video = _write(tmp_path / 'entrada' / 'a.mp4', 4096)
+    
+    media = _cache(_config(tmp_path, 'media.ini', profile='media'))
+    alta = _cache(_config(tmp_path, 'alta.ini', profile='alta'))
+    
+    assert media.key_for(video) == _cache(_config(tmp_path, 'media2.ini', profile='media')).key_for(video)
+    assert media.key_for(video) != alta.key_for(video)
+
+
+def test_restore_links_stored_audio(tmp_path):
+    """Uma entrada existente é ligada (hard link) num novo ficheiro de saída"""
+    cache = _cache(_config(tmp_path))
+    video = _write(tmp_path / 'entrada' / 'a.mp4', 4096)
+    output = _write(tmp_path / 'saida' / 'a.mp3', 1000, b'a')
+    key = cache.key_for(video)
+    cache.store(key, output, video)
+    
+    # Saída intacta: nada é escrito
+    assert cache.restore(key, output, lambda: None) == (output, False)
+    
+    os.remove(output)
+    target = str(tmp_path / 'saida' / 'a_001.mp3')
+    assert cache.restore(key, output, lambda: target) == (target, True)
+    assert os.path.samefile(target, os.path.join(cache.objects, f"{key}.mp3"))
+
+
+def test_evict_removes_least_recently_used(tmp_path, monkeypatch):
+    """Acima do limite, as entradas usadas há mais tempo saem até EVICT_TARGET"""
+    clock = itertools.count(1000)
+    monkeypatch.setattr(conversion_cache.time, 'time', lambda: float(next(clock)))
+    
+    cache = _cache(_config(tmp_path, max_size_mb=10000 / (1024 * 1024)))
+    outputs = {}
+    for index in range(10):
+        key = f"{index:064x}"
+        outputs[key] = _write(tmp_path / 'saida' / f"{index}.mp3", 1000, bytes([65 + index]))
+        cache.store(key, outputs[key])
+    
+    # A primeira entrada volta a ser usada: deixa de ser a mais antiga
+    first = f"{0:064x}"
+    cache.restore(first, outputs[first], lambda: None)
+    
+    cache.store(f"{10:064x}", _write(tmp_path / 'saida' / '10.mp3', 1000, b'z'))
+    
+    remaining = sorted(name[:-5] for name in os.listdir(cache.index))
+    assert first in remaining
+    assert f"{1:064x}" not in remaining and f"{2:064x}" not in remaining
+    assert len(remaining) * 1000 <= cache.max_bytes * EVICT_TARGET
+    assert cache._size == len(remaining) * 1000
+    assert len(os.listdir(cache.objects)) == len(remaining)
+
+
+def test_corrupted_index_entry_is_ignored(tmp_path):
+    """Uma entrada do índice ilegível conta como inexistente"""
+    cache = _cache(_config(tmp_path))
+    video = _write(tmp_path / 'entrada' / 'a.mp4', 4096)
+    key = cache.key_for(video)
+    
+    with open(os.path.join(cache.index, f"{key}.json"), 'w', encoding='utf-8') as f:
+        f.write('{"object": "')
+    
+    assert cache.restore(key, str(tmp_path / 'saida' / 'a.mp3'), lambda: None) == (None, False)
+    assert cache.evict() == 0
+    
+    # Nova conversão substitui a entrada corrompida
+    output = _write(tmp_path / 'saida' / 'a.mp3', 1000)
+    cache.store(key, output, video)
+    assert cache.restore(key, output, lambda: None) == (output, False)
@@ -0,0 +1,94 @@
+"""
+test_dsp.py
+Testes da medição de loudness (dsp.LoudnessMeter) e da reamostragem (dsp.Resampler)
+"""
+
+import numpy as np
+import pytest
+
+from dsp import LoudnessMeter, Resampler
+
+# Razões testadas: comuns (matriz polifásica) e pouco comum (fase a fase)
+RATES = ((48000, 44100), (44100, 48000), (44100, 22050), (44056, 44100))
+
+# SNR mínimo de um seno de 1 kHz por qualidade (medido: ~68, ~94 e ~129 dB)
+MIN_SNR_DB = {'low': 65.0, 'medium': 90.0, 'high': 125.0}
+
+
+def _tone_loudness(seconds, sample_rate=48000, block_frames=4096):
+    """Loudness integrada de um tom de 1 kHz stereo com amplitude 0.5"""
+    t = np.arange(int(seconds * sample_rate)) / float(sample_rate)
+    tone = 0.5 * np.sin(2 * np.pi * 1000 * t)
+    signal = np.stack([tone, tone], axis=1)
+    
+    meter = LoudnessMeter(sample_rate, 2)
+    for start in range(0, signal.shape[0], block_frames):
+        meter.process(signal[start:start + block_frames])
+    return meter.integrated_loudness()
+
+
+def test_short_tone_matches_long_tone():
+    """Áudio mais curto que 400ms mede o mesmo que um tom longo ao mesmo nível"""
+    reference = _tone_loudness(1.0)
+    for seconds in (0.25, 0.35):
+        assert abs(_tone_loudness(seconds) - reference) < 0.1
+
+
+def _sine(frames, sample_rate, channels=1, freq=1000.0):
+    """Seno com amplitude 0.5, igual em todos os canais"""
+    t = np.arange(frames) / float(sample_rate)
+    tone = 0.5 * np.sin(2 * np.pi * freq * t)
+    return np.repeat(tone[:, None], channels, axis=1)
+
+
+def _resample(signal, input_rate, output_rate, quality='medium', block_frames=None):
+    """Reamostra em blocos de block_frames (None = bloco único) e junta o flush"""
+    resampler = Resampler(input_rate, output_rate, signal.shape[1], quality)
+    step = block_frames or signal.shape[0]
+    blocks = [resampler.process(signal[start:start + step]) for start in range(0, signal.shape[0], step)]
+    return np.concatenate(blocks + [resampler.flush()]), resampler
+
+
+@pytest.mark.parametrize('input_rate, output_rate', RATES)
+def test_resampler_blocks_match_single_pass(input_rate, output_rate):
+    """O resultado não depende da divisão em blocos"""
+    rng = np.random.default_rng(7)
+    signal = (0.3 * rng.standard_normal((input_rate // 4, 2))).astype(np.float32)
+    
+    reference, _ = _resample(signal, input_rate, output_rate)
+    for block_frames in (1, 97, 1000, 4096):
+        blocks, _ = _resample(signal, input_rate, output_rate, block_frames=block_frames)
+        assert blocks.shape == reference.shape
+        np.testing.assert_allclose(blocks, reference, atol=1e-6)
+
+
+@pytest.mark.parametrize('input_rate, output_rate', RATES)
+def test_resampler_length_and_delay(input_rate, output_rate):
+    """ceil(n * saída / entrada) amostras, sem atraso: a saída n corresponde a n / saída segundos"""
+    frames = input_rate // 2 + 13
+    signal = _sine(frames, input_rate)
+    output, resampler = _resample(signal, input_rate, output_rate, block_frames=4096)
+    
+    assert output.shape[0] == -(-frames * output_rate // input_rate)
+    
+    # Um atraso de uma amostra daria um erro de ~-20 dB neste seno
+    ideal = _sine(output.shape[0], output_rate)
+    margin = 2 * resampler.half * output_rate // input_rate + 1
+    error = output[margin:-margin] - ideal[margin:-margin]
+    assert np.abs(error).max() < 1e-3
+
+
+@pytest.mark.parametrize('quality', sorted(MIN_SNR_DB))
+@pytest.mark.parametrize('input_rate, output_rate', ((48000, 44100), (44100, 48000)))
+def test_resampler_quality_snr(quality, input_rate, output_rate):
+    """Cada qualidade mantém o SNR de um seno acima do mínimo"""
+    signal = _sine(input_rate, input_rate)
+    output, resampler = _resample(signal, input_rate, output_rate, quality)
+    output = output[:, 0].astype(np.float64)
+    
+    ideal = _sine(output.shape[0], output_rate)[:, 0]
+    margin = 2 * resampler.half * output_rate // input_rate + 10
+    error = output[margin:-margin] - ideal[margin:-margin]
+    snr = 10 * np.log10(np.mean(ideal[margin:-margin] ** 2) / np.mean(error ** 2))
+    
+    assert snr >= MIN_SNR_DB[quality]
@@ -0,0 +1,90 @@
+"""
+test_job_journal.py
+Testes da retoma de lotes (diário de trabalhos e saídas incompletas)
+"""
+
+import configparser
+import os
+import socket
+import subprocess
+import sys
+
+from config_loader import ConfigLoader
+from file_manager import FileManager
+from job_journal import JobJournal
+
+
+def _output(tmp_path, name):
+    """Saída convertida existente"""
+    path = tmp_path / name
+    path.write_bytes(b'mp3')
+    return str(path)
+
+
+def _dead_pid():
+    """PID de um processo que já terminou"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_truncated_last_line_is_ignored_and_resumed(tmp_path):
+    """Uma linha cortada por uma interrupção não conta nem se junta ao registo seguinte"""
+    journal = JobJournal(str(tmp_path / 'jobs.jsonl'), 'abc')
+    journal.start_batch()
+    journal.record('a.mp4', 'done', _output(tmp_path, 'a.mp3'))
+    journal.record('b.mp4', 'converting')
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"video": "' + os.path.abspath('b.mp4') + '", "state": "do')
+    
+    assert journal.completed() == {os.path.abspath('a.mp4'): str(tmp_path / 'a.mp3')}
+    
+    # Retoma: b.mp4 estava a meio e é convertido de novo
+    resumed = JobJournal(journal.path, 'abc')
+    resumed.start_batch(resume=True)
+    resumed.record('b.mp4', 'done', _output(tmp_path, 'b.mp3'))
+    
+    assert set(resumed.completed()) == {os.path.abspath('a.mp4'), os.path.abspath('b.mp4')}
+
+
+def test_done_with_other_settings_is_redone(tmp_path):
+    """Vídeos concluídos com outras configurações (ou sem saída) não são saltados"""
+    path = str(tmp_path / 'jobs.jsonl')
+    old = JobJournal(path, 'old')
+    old.start_batch()
+    old.record('a.mp4', 'done', _output(tmp_path, 'a.mp3'))
+    
+    resumed = JobJournal(path, 'new')
+    resumed.start_batch(resume=True)
+    assert resumed.completed() == {}
+    
+    resumed.record('a.mp4', 'done', str(tmp_path / 'apagado.mp3'))
+    assert resumed.completed() == {}
+
+
+def test_cleanup_only_removes_parts_of_dead_processes(tmp_path):
+    """Saídas incompletas de processos vivos (ou de outra máquina) ficam intactas"""
+    parser = configparser.ConfigParser()
+    parser.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'), encoding='utf-8')
+    parser['PATHS']['output_folder'] = str(tmp_path / 'saida')
+    config_path = tmp_path / 'config.ini'
+    with open(config_path, 'w', encoding='utf-8') as f:
+        parser.write(f)
+    
+    manager = FileManager(ConfigLoader(str(config_path)))
+    os.makedirs(manager.output_folder)
+    hostname = socket.gethostname()
+    dead = _dead_pid()
+    
+    names = {
+        'live': f".a.mp3.1a2b3c4d.{os.getpid()}@{hostname}.part",
+        'dead': f".b.mp3.1a2b3c4d.{dead}@{hostname}.part",
+        'other_host': f".c.mp3.1a2b3c4d.{dead}@outra-maquina.part",
+        'output': 'd.mp3'
+    }
+    for name in names.values():
+        open(os.path.join(manager.output_folder, name), 'wb').close()
+    
+    assert manager.cleanup_partial_outputs() == 1
+    remaining = set(os.listdir(manager.output_folder))
+    assert remaining == {names['live'], names['other_host'], names['output']}
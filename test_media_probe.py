@@ -0,0 +1,65 @@
+"""
+test_media_probe.py
+Testes da leitura do cabeçalho MP3 (media_probe.read_mp3_header) contra o ffmpeg
+"""
+
+import subprocess
+
+import pytest
+
+from media_probe import MediaProbe, read_mp3_header
+
+# Diferença máxima de duração: o ffmpeg arredonda a centésimas e conta o atraso do encoder
+DURATION_TOLERANCE = 0.03
+
+ENCODINGS = {
+    'cbr': ['-ac', '2', '-b:a', '128k'],
+    'cbr_sem_tag': ['-ac', '1', '-ar', '22050', '-b:a', '64k', '-write_xing', '0'],
+    'vbr': ['-ac', '2', '-q:a', '2'],
+    'id3': ['-ac', '2', '-b:a', '192k', '-id3v2_version', '3', '-write_id3v1', '1',
+            '-metadata', 'title=Teste', '-metadata', 'comment=' + 'x' * 3000]
+}
+
+
+def _encode(path, options):
+    """MP3 de 7 segundos de ruído codificado pelo libmp3lame"""
+    subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostdin', '-v', 'error', '-y',
+         '-f', 'lavfi', '-i', 'anoisesrc=d=7:sample_rate=44100:amplitude=0.2',
+         '-c:a', 'libmp3lame', *options, str(path)],
+        check=True
+    )
+    return str(path)
+
+
+@pytest.mark.parametrize('name', sorted(ENCODINGS))
+def test_header_matches_ffmpeg(tmp_path, name):
+    """Bitrate, duração, sample rate e canais iguais aos do ffmpeg"""
+    path = _encode(tmp_path / f"{name}.mp3", ENCODINGS[name])
+    reference = MediaProbe().probe(path)
+    header = read_mp3_header(path)
+    
+    assert header['vbr'] == (name == 'vbr')
+    assert header['sample_rate'] == reference['audio']['sample_rate']
+    assert header['channels'] == reference['audio']['channels']
+    assert abs(header['duration'] - reference['duration']) <= DURATION_TOLERANCE
+    
+    # CBR: o bitrate nominal exato, mesmo com tags ID3 antes e depois do áudio
+    tolerance = 1 if header['vbr'] else 0
+    assert abs(header['bitrate_kbps'] - reference['audio']['bitrate_kbps']) <= tolerance
+
+
+def test_id3_tags_are_skipped(tmp_path):
+    """As tags ID3v2 e ID3v1 não contam como áudio"""
+    tagged = read_mp3_header(_encode(tmp_path / 'id3.mp3', ENCODINGS['id3']))
+    plain = read_mp3_header(_encode(tmp_path / 'plain.mp3', ['-ac', '2', '-b:a', '192k']))
+    
+    assert tagged == plain
+
+
+def test_not_mp3_returns_none(tmp_path):
+    """Um ficheiro sem frames MPEG Layer III não é interpretado"""
+    path = tmp_path / 'texto.mp3'
+    path.write_bytes(b'ID3' + b'\x00' * 7 + b'sem audio' * 100)
+    
+    assert read_mp3_header(str(path)) is None
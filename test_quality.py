@@ -0,0 +1,66 @@
+"""
+test_quality.py
+Testes do perfil auto: o score final atinge o score previsto na escolha do bitrate
+"""
+
+import configparser
+import os
+import wave
+
+import numpy as np
+
+from audio_converter import AudioConverter
+from config_loader import ConfigLoader
+from quality_analyzer import QualityAnalyzer
+
+
+def _auto_config(tmp_path):
+    """config.ini do projeto com o perfil auto e as métricas de sinal desligadas"""
+    parser = configparser.ConfigParser()
+    parser.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.ini'), encoding='utf-8')
+    parser['PATHS']['input_folder'] = str(tmp_path)
+    parser['PATHS']['output_folder'] = str(tmp_path)
+    parser['PROFILE']['active_profile'] = 'auto'
+    parser['QUALITY_ANALYSIS']['signal_metrics'] = 'false'
+    
+    path = tmp_path / 'config.ini'
+    with open(path, 'w', encoding='utf-8') as f:
+        parser.write(f)
+    return ConfigLoader(str(path))
+
+
+def _write_music(path, seconds=6.0, sample_rate=44100):
+    """WAV stereo com acordes e ruído (canais diferentes)"""
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds * sample_rate)) / float(sample_rate)
+    chord = sum(np.sin(2 * np.pi * freq * t) for freq in (220.0, 277.2, 329.6, 1760.0, 5274.0)) / 5
+    left = 0.4 * chord + 0.01 * rng.standard_normal(t.shape[0])
+    right = 0.4 * np.roll(chord, 441) + 0.01 * rng.standard_normal(t.shape[0])
+    
+    pcm = (np.clip(np.stack([left, right], axis=1), -1, 1) * 32767).astype('<i2')
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return seconds
+
+
+def test_auto_profile_meets_target_score(tmp_path):
+    """Sem signal_metrics no config.ini, o score reportado usa a mesma base que a previsão"""
+    config = _auto_config(tmp_path)
+    assert config.get_signal_metrics_enabled()
+    
+    wav_path = tmp_path / 'musica.wav'
+    duration = _write_music(wav_path)
+    mp3_path = str(tmp_path / 'musica.mp3')
+    
+    converter = AudioConverter(config)
+    success, message = converter.convert_audio(str(wav_path), mp3_path, str(tmp_path / 'referencia.pcm'))
+    assert success, message
+    
+    analysis = QualityAnalyzer(config).analyze_conversion(
+        str(wav_path), mp3_path, duration, converted_stats=converter.output_stats)
+    
+    assert analysis['signal'] is not None
+    assert analysis['quality_score']['score'] >= config.get_profile_settings()['target_score']
@@ -0,0 +1,125 @@
+"""
+throughput_history.py
+Velocidade de conversão observada em lotes anteriores, para estimar o tempo restante
+"""
+
+import json
+import logging
+import os
+
+
+class ThroughputHistory:
+    """
+    Fator de tempo real observado, por perfil de conversão
+    
+    O fator é o número de segundos de áudio convertidos por segundo de
+    trabalho num vídeo (ex: 40 = um vídeo de 40 minutos demora 1 minuto).
+    É mantido como média móvel num ficheiro JSON na pasta de logs, com
+    uma entrada por perfil e formato de saída.
+    """
+    
+    # Peso de cada nova observação na média móvel
+    SMOOTHING = 0.3
+    
+    def __init__(self, path, profile):
+        """
+        Args:
+            path (str): Ficheiro JSON do histórico (None = só em memória)
+            profile (str): Identificador do perfil (ex: "podcast:mp3")
+        """
+        self.path = path
+        self.profile = profile
+        self._factors = self._load()
+        self._changed = False
+    
+    @classmethod
+    def for_config(cls, config):
+        """
+        Cria histórico com o ficheiro e o perfil da configuração
+        
+        Args:
+            config (ConfigLoader): Configuração carregada
+        
+        Returns:
+            ThroughputHistory: Histórico de velocidade
+        """
+        name = config.get_throughput_file()
+        path = os.path.join(config.get_log_folder(), name) if name else None
+        return cls(path, f"{config.get_active_profile()}:{config.get_output_format()}")
+    
+    def factor(self):
+        """
+        Fator de tempo real do perfil
+        
+        Returns:
+            float: Segundos de áudio por segundo de trabalho (None se desconhecido)
+        """
+        return self._factors.get(self.profile)
+    
+    def record(self, audio_seconds, work_seconds):
+        """
+        Acrescenta uma observação (um vídeo convertido)
+        
+        Args:
+            audio_seconds (float): Duração do áudio convertido
+            work_seconds (float): Tempo de trabalho no vídeo
+        """
+        if not audio_seconds or not work_seconds or audio_seconds <= 0 or work_seconds <= 0:
+            return
+        
+        observed = audio_seconds / work_seconds
+        previous = self.factor()
+        self._factors[self.profile] = observed if previous is None else previous + self.SMOOTHING * (observed - previous)
+        self._changed = True
+    
+    def save(self):
+        """Guarda o fator do perfil (mantendo os restantes perfis do ficheiro)"""
+        if not self.path or not self._changed:
+            return
+        
+        factors = self._load()
+        factors[self.profile] = round(self._factors[self.profile], 4)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(factors, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self._changed = False
+        except OSError as e:
+            logging.warning(f"Não foi possível guardar o histórico de velocidade: {e}")
+    
+    def _load(self):
+        """Lê o histórico (vazio se não existir ou estiver corrompido)"""
+        if not self.path:
+            return {}
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        
+        return {profile: float(factor) for profile, factor in data.items()
+                if isinstance(factor, (int, float)) and factor > 0}
+
+
+def format_duration(seconds):
+    """
+    Formata duração para a consola
+    
+    Args:
+        seconds (float): Duração em segundos
+    
+    Returns:
+        str: Ex: "1h05m", "12m30s", "45s"
+    """
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{secs}s"
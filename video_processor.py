@@ -1,11 +1,15 @@
 """
 video_processor.py
-Extrai áudio de vídeos MP4 usando moviepy
+Extrai áudio de vídeos MP4 usando FFmpeg ou moviepy
 """
 
 import logging
 from moviepy.editor import VideoFileClip
 import os
+import wave
+
+from ffmpeg_utils import OUTPUT_FORMATS, run_ffmpeg, parse_duration, last_error_line
+from media_probe import MediaProbe
 
 
 class VideoProcessor:
@@ -13,11 +17,166 @@ class VideoProcessor:
     
     def __init__(self, config):
         self.config = config
+        self.engine = config.get_extraction_engine()
+        self.profile = config.get_profile_settings()
+        self.probe = MediaProbe.for_config(config)
+        self.resampler = config.get_resampler()
     
     def extract_audio(self, video_path, temp_audio_path):
         """
         Extrai áudio do vídeo MP4
         
+        Args:
+            video_path (str): Caminho do vídeo MP4
+            temp_audio_path (str): Caminho temporário para salvar áudio bruto
+            
+        Returns:
+            tuple: (sucesso, duração, mensagem)
+        """
+        if self.engine == 'moviepy':
+            return self._extract_audio_moviepy(video_path, temp_audio_path)
+        
+        return self._extract_audio_ffmpeg(video_path, temp_audio_path)
+    
+    def _extract_audio_ffmpeg(self, video_path, temp_audio_path):
+        """
+        Extrai apenas a faixa de áudio com um único processo ffmpeg
+        
+        O vídeo não é descodificado e o áudio é convertido diretamente
+        para os canais do perfil ativo; o sample rate é o do perfil ou, com
+        resampler = numpy, o original (uma só reamostragem, na conversão).
+        
+        Args:
+            video_path (str): Caminho do vídeo MP4
+            temp_audio_path (str): Caminho temporário para salvar áudio bruto
+            
+        Returns:
+            tuple: (sucesso, duração, mensagem)
+        """
+        try:
+            logging.info(f"Extraindo áudio de: {os.path.basename(video_path)}")
+            
+            sample_rate = self.extraction_rate(video_path)
+            channels = 1 if self.profile['channels'] == 'mono' else 2
+            
+            result = run_ffmpeg([
+                '-i', video_path,
+                '-map', '0:a:0',
+                '-vn', '-sn', '-dn',
+                '-acodec', 'pcm_s16le',
+                '-ar', str(sample_rate),
+                '-ac', str(channels),
+                '-f', 'wav',
+                temp_audio_path
+            ])
+            
+            if result.returncode != 0:
+                if 'matches no streams' in result.stderr:
+                    logging.error(f"Vídeo não contém áudio: {video_path}")
+                    return False, 0, "Vídeo sem áudio"
+                
+                message = last_error_line(result.stderr)
+                logging.error(f"Erro ao extrair áudio de {video_path}: {message}")
+                return False, 0, message
+            
+            # Duração do contentor; na falta desta, duração do áudio extraído
+            duration = parse_duration(result.stderr)
+            if duration is None:
+                with wave.open(temp_audio_path, 'rb') as wav_file:
+                    duration = wav_file.getnframes() / float(wav_file.getframerate())
+            
+            logging.info(f"Duração do vídeo: {duration:.2f}s ({self._format_duration(duration)})")
+            logging.info(f"Áudio extraído com sucesso: {os.path.basename(temp_audio_path)} "
+                         f"({sample_rate}Hz, {channels} canal(is))")
+            
+            return True, duration, "Áudio extraído"
+            
+        except Exception as e:
+            logging.error(f"Erro ao extrair áudio de {video_path}: {str(e)}")
+            return False, 0, str(e)
+    
+    def extraction_rate(self, video_path):
+        """
+        Sample rate do áudio extraído
+        
+        Com resampler = numpy o áudio mantém a frequência original e é
+        reamostrado uma única vez no grafo da conversão; com ffmpeg é
+        convertido logo na extração para a frequência do perfil.
+        
+        Args:
+            video_path (str): Caminho do vídeo
+            
+        Returns:
+            int: Sample rate em Hz
+        """
+        if self.resampler == 'numpy':
+            stream_info = self.probe_audio_stream(video_path)
+            if stream_info and stream_info['sample_rate']:
+                return stream_info['sample_rate']
+        
+        return self.profile['sample_rate']
+    
+    def probe_audio_stream(self, video_path):
+        """
+        Lê codec, bitrate, sample rate e canais do áudio do vídeo
+        
+        Args:
+            video_path (str): Caminho do vídeo
+            
+        Returns:
+            dict: Características do áudio ou None se indisponível
+        """
+        record = self.probe.probe(video_path)
+        if not record or not record['audio']:
+            return None
+        
+        return dict(record['audio'], duration=record['duration'])
+    
+    def copy_audio_stream(self, video_path, output_path, output_format):
+        """
+        Copia a faixa de áudio para o contentor de saída sem recodificar
+        
+        Args:
+            video_path (str): Caminho do vídeo MP4
+            output_path (str): Caminho do ficheiro de saída
+            output_format (str): Formato de saída (mp3, m4a, aac)
+            
+        Returns:
+            tuple: (sucesso, duração, mensagem)
+        """
+        try:
+            logging.info(f"Copiando faixa de áudio de: {os.path.basename(video_path)}")
+            
+            result = run_ffmpeg([
+                '-i', video_path,
+                '-map', '0:a:0',
+                '-vn', '-sn', '-dn',
+                '-c:a', 'copy',
+                '-f', OUTPUT_FORMATS[output_format]['muxer'],
+                output_path
+            ])
+            
+            if result.returncode != 0:
+                message = last_error_line(result.stderr)
+                logging.error(f"Erro ao copiar áudio de {video_path}: {message}")
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                return False, 0, message
+            
+            duration = parse_duration(result.stderr) or 0
+            logging.info(f"Áudio copiado sem recodificação: {os.path.basename(output_path)}")
+            
+            return True, duration, "Áudio copiado"
+            
+        except Exception as e:
+            logging.error(f"Erro ao copiar áudio de {video_path}: {str(e)}")
+            return False, 0, str(e)
+    
+    def _extract_audio_moviepy(self, video_path, temp_audio_path):
+        """
+        Extrai áudio através do VideoFileClip do moviepy (16 bits, sample
+        rate de extraction_rate em vez dos 44.1kHz predefinidos do moviepy)
+        
         Args:
             video_path (str): Caminho do vídeo MP4
             temp_audio_path (str): Caminho temporário para salvar áudio bruto
@@ -30,8 +189,9 @@ class VideoProcessor:
         try:
             logging.info(f"Extraindo áudio de: {os.path.basename(video_path)}")
             
-            # Carregar vídeo
-            video_clip = VideoFileClip(video_path)
+            # Carregar vídeo (o leitor de áudio reamostra para audio_fps)
+            sample_rate = self.extraction_rate(video_path)
+            video_clip = VideoFileClip(video_path, audio_fps=sample_rate)
             
             # Verificar se vídeo tem áudio
             if video_clip.audio is None:
@@ -49,13 +209,14 @@ class VideoProcessor:
             audio_clip.write_audiofile(
                 temp_audio_path,
                 codec='pcm_s16le',  # WAV sem compressão
-                fps=44100,
+                fps=sample_rate,
                 nbytes=2,
                 verbose=False,
                 logger=None
             )
             
-            logging.info(f"Áudio extraído com sucesso: {os.path.basename(temp_audio_path)}")
+            logging.info(f"Áudio extraído com sucesso: {os.path.basename(temp_audio_path)} "
+                         f"({sample_rate}Hz)")
             
             return True, duration, "Áudio extraído"
             
@@ -70,7 +231,7 @@ class VideoProcessor:
     
     def get_video_info(self, video_path):
         """
-        Obtém informações do vídeo
+        Obtém informações do vídeo (metadados, sem abrir o vídeo)
         
         Args:
             video_path (str): Caminho do vídeo
@@ -78,32 +239,28 @@ class VideoProcessor:
         Returns:
             dict: Informações do vídeo
         """
-        video_clip = None
-        
-        try:
-            video_clip = VideoFileClip(video_path)
-            
-            info = {
-                'duration': video_clip.duration,
-                'duration_formatted': self._format_duration(video_clip.duration),
-                'fps': video_clip.fps,
-                'size': video_clip.size,
-                'has_audio': video_clip.audio is not None
-            }
-            
-            if video_clip.audio:
-                info['audio_fps'] = video_clip.audio.fps
-                info['audio_channels'] = video_clip.audio.nchannels
-            
-            return info
-            
-        except Exception as e:
-            logging.error(f"Erro ao obter informações do vídeo {video_path}: {str(e)}")
+        record = self.probe.probe(video_path)
+        if record is None:
+            logging.error(f"Erro ao obter informações do vídeo {video_path}")
             return None
         
-        finally:
-            if video_clip:
-                video_clip.close()
+        duration = record['duration'] or 0
+        video = record['video'] or {}
+        audio = record['audio']
+        
+        info = {
+            'duration': duration,
+            'duration_formatted': self._format_duration(duration),
+            'fps': video.get('fps'),
+            'size': [video.get('width'), video.get('height')] if video else None,
+            'has_audio': audio is not None
+        }
+        
+        if audio:
+            info['audio_fps'] = audio['sample_rate']
+            info['audio_channels'] = audio['channels']
+        
+        return info
     
     def _format_duration(self, seconds):
         """
@@ -134,22 +291,15 @@ class VideoProcessor:
         Returns:
             tuple: (válido, mensagem)
         """
-        video_clip = None
+        record = self.probe.probe(video_path)
         
-        try:
-            video_clip = VideoFileClip(video_path)
-            
-            if video_clip.audio is None:
-                return False, "Vídeo não contém áudio"
-            
-            if video_clip.duration <= 0:
-                return False, "Vídeo com duração inválida"
-            
-            return True, "Vídeo válido"
-            
-        except Exception as e:
-            return False, f"Erro ao validar vídeo: {str(e)}"
+        if record is None:
+            return False, "Erro ao validar vídeo: ficheiro ilegível ou corrompido"
         
-        finally:
-            if video_clip:
-                video_clip.close()
+        if record['audio'] is None:
+            return False, "Vídeo não contém áudio"
+        
+        if not record['duration'] or record['duration'] <= 0:
+            return False, "Vídeo com duração inválida"
+        
+        return True, "Vídeo válido"